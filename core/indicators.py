@@ -4,9 +4,9 @@ Technical Indicators — 通用技术指标（纯数学，与策略/交易所无
 所有交易系统统一从这里 import。
 绝对禁止在策略文件或回测文件中重新实现这些函数。
 
-Canonical source for: ema, rsi, bollinger_bands
+Canonical source for: ema, ema_step, rsi, bollinger_bands, bollinger_from_sums
 """
-from typing import List, Optional, Tuple
+from typing import List, Optional, Sequence, Tuple
 import math
 
 
@@ -20,13 +20,24 @@ def ema(data: List[float], period: int) -> List[float]:
     """
     if not data:
         return []
-    result = [data[0]]
     k = 2 / (period + 1)
-    for i in range(1, len(data)):
-        result.append(data[i] * k + result[-1] * (1 - k))
+    k1 = 1 - k
+    it = iter(data)
+    prev = next(it)
+    result = [prev]
+    append = result.append
+    for x in it:
+        prev = x * k + prev * k1
+        append(prev)
     return result
 
 
+def ema_step(prev: float, value: float, period: int) -> float:
+    """Advance an EMA by one value — same formula as ema(), for streaming use."""
+    k = 2 / (period + 1)
+    return value * k + prev * (1 - k)
+
+
 def rsi(data: List[float], period: int = 14) -> List[float]:
     """Relative Strength Index.
 
@@ -71,3 +82,32 @@ def bollinger_bands(closes: List[float], period: int, multiplier: float,
     upper = mid + multiplier * std
     lower = mid - multiplier * std
     return (mid, upper, lower)
+
+
+def bollinger_from_sums(total: float, total_sq: float, period: int,
+                        multiplier: float, window: Optional[Sequence[float]] = None
+                        ) -> Optional[Tuple[float, float, float]]:
+    """Bollinger Bands from a running sum / sum of squares over `period` closes.
+
+    Streaming counterpart of bollinger_bands(): the caller maintains the
+    sums over the same PRIOR-bar window. Same (mid, upper, lower) / None
+    contract, including flat-market protection.
+
+    E[x²] - mid² cancels catastrophically when the band is tiny relative to
+    price (a flat 2116.81 window leaves std ~1e-5, not 0). If the caller
+    passes the window itself, such a near-zero variance is recomputed exactly
+    so the result matches bollinger_bands().
+    """
+    mid = total / period
+    variance = max(0.0, total_sq / period - mid * mid)
+    if window is not None and variance <= 1e-12 * mid * mid:
+        mid = sum(window) / period
+        variance = sum((x - mid) ** 2 for x in window) / period
+    std = math.sqrt(variance)
+
+    if std < 1e-10:
+        return None  # flat market protection
+
+    upper = mid + multiplier * std
+    lower = mid - multiplier * std
+    return (mid, upper, lower)
@@ -13,34 +13,38 @@ FEE_ROUND_TRIP_PCT = FEE_ROUND_TRIP_BPS / 10000  # 0.000864
 
 
 def simulate_trade(direction, entry, entry_idx, highs, lows, closes, stop_pct, tp_pct, max_hold):
+    fee = FEE_ROUND_TRIP_PCT * 100  # 转为百分比单位
+    stop_pnl = -stop_pct * 100 - fee
+    tp_pnl = tp_pct * 100 - fee
+
+    # optimize 扫参数时每组参数都要跑一遍：方向分支提到循环外，
+    # 用 zip 切片代替逐 bar 下标访问
+    start = entry_idx + 1
+    end = entry_idx + min(max_hold + 1, len(closes) - entry_idx)
+    bars = zip(highs[start:end], lows[start:end])
     if direction == 'LONG':
         stop = entry * (1 - stop_pct)
         tp = entry * (1 + tp_pct)
+        for j, (h, l) in enumerate(bars, 1):
+            if l <= stop:
+                return {'dir': direction, 'pnl_pct': stop_pnl, 'bars': j, 'reason': 'STOP'}
+            if h >= tp:
+                return {'dir': direction, 'pnl_pct': tp_pnl, 'bars': j, 'reason': 'TP'}
     else:
         stop = entry * (1 + stop_pct)
         tp = entry * (1 - tp_pct)
-
-    fee = FEE_ROUND_TRIP_PCT * 100  # 转为百分比单位
-
-    for j in range(1, min(max_hold + 1, len(closes) - entry_idx)):
-        idx = entry_idx + j
-        if direction == 'LONG':
-            if lows[idx] <= stop:
-                return {'dir': direction, 'pnl_pct': -stop_pct * 100 - fee, 'bars': j, 'reason': 'STOP'}
-            if highs[idx] >= tp:
-                return {'dir': direction, 'pnl_pct': tp_pct * 100 - fee, 'bars': j, 'reason': 'TP'}
-        else:
-            if highs[idx] >= stop:
-                return {'dir': direction, 'pnl_pct': -stop_pct * 100 - fee, 'bars': j, 'reason': 'STOP'}
-            if lows[idx] <= tp:
-                return {'dir': direction, 'pnl_pct': tp_pct * 100 - fee, 'bars': j, 'reason': 'TP'}
+        for j, (h, l) in enumerate(bars, 1):
+            if h >= stop:
+                return {'dir': direction, 'pnl_pct': stop_pnl, 'bars': j, 'reason': 'STOP'}
+            if l <= tp:
+                return {'dir': direction, 'pnl_pct': tp_pnl, 'bars': j, 'reason': 'TP'}
 
     exit_idx = min(entry_idx + max_hold, len(closes) - 1)
     if direction == 'LONG':
         pnl = (closes[exit_idx] - entry) / entry * 100
     else:
         pnl = (entry - closes[exit_idx]) / entry * 100
-    return {'dir': direction, 'pnl_pct': pnl - FEE_ROUND_TRIP_PCT * 100, 'bars': exit_idx - entry_idx, 'reason': 'TIMEOUT'}
+    return {'dir': direction, 'pnl_pct': pnl - fee, 'bars': exit_idx - entry_idx, 'reason': 'TIMEOUT'}
 
 
 def run_backtest(candles_30m, candles_4h, stop_pct, tp_pct, max_hold,
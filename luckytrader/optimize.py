@@ -26,8 +26,26 @@ CURRENT = {
     "hold": _cfg.risk.max_hold_hours * 2,  # convert hours to 30m bars
 }
 
-def run_backtest(candles_30m, sl, tp, hold, candles_4h=None, cfg=None):
-    """参数扫描回测 — 使用 strategy.detect_signal() 生成信号"""
+def scan_signals(candles_30m, candles_4h=None, cfg=None):
+    """逐 bar 预先跑一遍 detect_signal()，结果与 SL/TP/持仓参数无关。
+
+    返回与 candles_30m 等长的列表（'LONG' | 'SHORT' | None），
+    供 run_backtest(signals=...) 在整个参数网格中复用。
+    """
+    if cfg is None:
+        cfg = _cfg
+    start = max(cfg.strategy.range_bars, cfg.strategy.lookback_bars) + 2
+    signals = [None] * len(candles_30m)
+    for i in range(start, len(candles_30m) - 1):
+        signals[i] = detect_signal(candles_30m, candles_4h or [], i, cfg)
+    return signals
+
+
+def run_backtest(candles_30m, sl, tp, hold, candles_4h=None, cfg=None, signals=None):
+    """参数扫描回测 — 使用 strategy.detect_signal() 生成信号
+
+    signals: 可选，scan_signals() 的预计算结果；传入时不再逐 bar 调 detect_signal
+    """
     if cfg is None:
         cfg = _cfg
     closes = [float(c['c']) for c in candles_30m]
@@ -43,7 +61,10 @@ def run_backtest(candles_30m, sl, tp, hold, candles_4h=None, cfg=None):
         if i <= in_trade_until:
             continue
 
-        signal = detect_signal(candles_30m, candles_4h or [], i, cfg)
+        if signals is not None:
+            signal = signals[i]
+        else:
+            signal = detect_signal(candles_30m, candles_4h or [], i, cfg)
         if signal:
             entry_price = opens[i + 1]
             t = simulate_trade(signal, entry_price, i + 1, highs, lows, closes, sl, tp, hold)
@@ -75,8 +96,12 @@ def optimize():
     tps = [0.03, 0.04, 0.05, 0.06, 0.07, 0.10]
     holds = [24, 48, 72, 96, 144]  # 12h, 24h, 36h, 48h, 72h
     
+    # 信号只依赖 K 线，整个参数网格共用一份
+    signals = scan_signals(candles, candles_4h)
+
     # 当前参数表现
-    current_result = run_backtest(candles, CURRENT["sl"], CURRENT["tp"], CURRENT["hold"], candles_4h=candles_4h)
+    current_result = run_backtest(candles, CURRENT["sl"], CURRENT["tp"], CURRENT["hold"],
+                                  candles_4h=candles_4h, signals=signals)
     print(f"当前参数 (SL{CURRENT['sl']*100}% TP{CURRENT['tp']*100}% {CURRENT['hold']*0.5:.0f}h):")
     print(f"  {current_result['count']}笔 | 胜率{current_result['winrate']}% | 总{current_result['total']:+.1f}% | 每笔{current_result['avg']:+.3f}%")
     
@@ -89,7 +114,7 @@ def optimize():
             if tp <= sl:
                 continue
             for hold in holds:
-                r = run_backtest(candles, sl, tp, hold, candles_4h=candles_4h)
+                r = run_backtest(candles, sl, tp, hold, candles_4h=candles_4h, signals=signals)
                 if r["count"] >= 20:
                     all_results.append({"sl": sl, "tp": tp, "hold": hold, **r})
                     if r["avg"] > best["avg"]:
@@ -569,10 +569,12 @@ class TradeExecutor:
                 # ─── 1小时方向确认（早期验证）───
                 # ─── Per-coin early validation ───
                 try:
+                    # 一次读出全部币种的 state，而不是每个币各读一次文件
+                    all_state = await asyncio.to_thread(execute.load_state)
                     for ev_coin in execute.TRADING_COINS:
                         if self._early_validation_done.get(ev_coin):
                             continue
-                        coin_state = await asyncio.to_thread(execute.load_state, ev_coin)
+                        coin_state = all_state.get(ev_coin)
                         pos = coin_state.get("position") if coin_state else None
                         if not (pos and pos.get("entry_time")):
                             continue
@@ -647,9 +649,14 @@ class TradeExecutor:
                 now_ts = time.time()
                 if now_ts - self._last_regime_check >= self._regime_check_interval:
                     self._last_regime_check = now_ts
+                    try:
+                        all_state = await asyncio.to_thread(execute.load_state)
+                    except Exception as e:
+                        logger.error(f"Regime re-eval: load_state failed: {e}")
+                        all_state = {}
                     for rr_coin in execute.TRADING_COINS:
                         try:
-                            coin_state = await asyncio.to_thread(execute.load_state, rr_coin)
+                            coin_state = all_state.get(rr_coin) or {}
                             pos = coin_state.get("position")
                             if not (pos and pos.get("regime_tp_pct", 0) > 0.02):
                                 continue
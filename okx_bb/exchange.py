@@ -17,6 +17,8 @@ from typing import Any, Dict, List, Optional, Tuple
 from urllib.parse import urlencode
 
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 
 logger = logging.getLogger(__name__)
 
@@ -27,6 +29,10 @@ API_PREFIX = "/api/v5"
 RETRY_BASE_DELAY = 5
 MAX_RETRIES = 3
 
+# Shared keep-alive pool: one Session serves every REST worker thread
+POOL_CONNECTIONS = 10
+POOL_MAXSIZE = 20
+
 
 class OKXClient:
     """OKX REST API client for futures trading."""
@@ -45,16 +51,22 @@ class OKXClient:
         self.passphrase = passphrase
         self.simulated = simulated
         self.session = requests.Session()
+        # Connect-level retries only: a request that never reached OKX is
+        # safe to resend; anything past that goes through the chain-first
+        # retry logic in _request / the executor.
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE,
+            max_retries=Retry(total=2, read=False, status=False, backoff_factor=0.2)))
+        # Keyed HMAC context; copied per request to skip re-keying
+        self._hmac_template = hmac.new(secret_key.encode('utf-8'),
+                                       digestmod=hashlib.sha256)
 
     def _sign(self, timestamp: str, method: str, path: str,
               body: str = "") -> str:
         """Generate HMAC-SHA256 signature for OKX API."""
         message = timestamp + method.upper() + path + body
-        mac = hmac.new(
-            self.secret_key.encode('utf-8'),
-            message.encode('utf-8'),
-            hashlib.sha256
-        )
+        mac = self._hmac_template.copy()
+        mac.update(message.encode('utf-8'))
         return base64.b64encode(mac.digest()).decode('utf-8')
 
     def _headers(self, method: str, path: str, body: str = "") -> dict:
@@ -125,6 +137,10 @@ class OKXClient:
 
         return {"code": "-1", "msg": "Max retries exceeded"}
 
+    def close(self):
+        """Release the pooled keep-alive connections."""
+        self.session.close()
+
     # === Account ===
 
     def get_balance(self) -> Dict[str, Any]:
@@ -278,6 +294,23 @@ class OKXClient:
         logger.info(f"ALGO trigger result: code={result.get('code')} data={result.get('data', [{}])[0] if result.get('data') else 'none'}")
         return result
 
+    def close_position(self, instId: str, mgnMode: str = "isolated",
+                       posSide: Optional[str] = None) -> dict:
+        """Close the entire position server-side (market).
+
+        Unlike a reduceOnly market order this needs no size, so a retry
+        can never flip the position. posSide only for long/short mode.
+        autoCxl: OKX rejects close-position while close orders (our TP
+        limit, SL algo) are pending unless it may cancel them itself.
+        """
+        body = {"instId": instId, "mgnMode": mgnMode, "autoCxl": "true"}
+        if posSide:
+            body["posSide"] = posSide
+        logger.info(f"CLOSE position {instId} mgnMode={mgnMode} posSide={posSide}")
+        result = self._request("POST", "/trade/close-position", body=body)
+        logger.info(f"CLOSE result: code={result.get('code')} msg={result.get('msg', '')}")
+        return result
+
     def cancel_order(self, instId: str, ordId: str) -> dict:
         """Cancel a regular order."""
         logger.info(f"CANCEL order {ordId} {instId}")
@@ -9,9 +9,10 @@ Runs on 30m candle close (cron or WS trigger).
 import logging
 import sys
 import time
+from collections import deque
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional
+from typing import Optional, Tuple
 
 _parent = str(Path(__file__).parent.parent)
 if _parent not in sys.path:
@@ -31,6 +32,13 @@ logger = logging.getLogger(__name__)
 STATE_DIR = Path(__file__).parent / "state"
 POSITION_STATE_FILE = STATE_DIR / "position_state.json"
 TRADE_LOG_FILE = STATE_DIR / "trade_log.json"
+CANDLE_BUFFER_FILE = STATE_DIR / "candle_buffer.json"
+
+# Emergency close backoff: 0.2s, 0.6s, 1.8s
+EMERGENCY_CLOSE_BASE_DELAY = 0.2
+
+# Rolling window of 30m bars kept on disk between run_once cycles
+CANDLE_BUFFER_SIZE = 300
 
 
 class BBExecutor:
@@ -43,17 +51,34 @@ class BBExecutor:
         )
         self.instId = self.cfg.instId
         self._inst_cache = None  # Cached instrument info
+        # (file stat key, position) — single tuple so thread-pool readers never
+        # see a key/value mismatch
+        self._position_cache: Tuple[Optional[tuple], Optional[dict]] = (None, None)
 
     # === State Management ===
 
+    @staticmethod
+    def _position_file_key() -> Optional[tuple]:
+        try:
+            st = POSITION_STATE_FILE.stat()
+        except OSError:
+            return None
+        return (st.st_ino, st.st_mtime_ns, st.st_size)
+
     def load_position(self) -> Optional[dict]:
-        """Load persisted position state."""
-        state = load_state(POSITION_STATE_FILE)
-        return state.get("position")
+        """Load persisted position state (re-parsed only when the file changes)."""
+        key = self._position_file_key()
+        cached_key, pos = self._position_cache
+        if key is None or key != cached_key:
+            pos = load_state(POSITION_STATE_FILE).get("position")
+            self._position_cache = (key, pos)
+        return dict(pos) if pos is not None else None
 
     def save_position(self, pos: Optional[dict]):
         """Persist position state."""
         save_state(POSITION_STATE_FILE, {"position": pos})
+        self._position_cache = (self._position_file_key(),
+                                dict(pos) if pos is not None else None)
 
     # === Market Data ===
 
@@ -65,6 +90,46 @@ class BBExecutor:
         """Extract close prices from candles."""
         return [c["c"] for c in candles]
 
+    def fetch_recent_candles(self) -> list:
+        """Return the last CANDLE_BUFFER_SIZE candles (oldest first).
+
+        Keeps a sliding window in CANDLE_BUFFER_FILE so each cycle only
+        fetches the 2 newest bars. The newest bar is still in progress,
+        so it is overwritten in place until the next bar opens.
+        Falls back to a full fetch when the buffer is missing or has a gap.
+        """
+        state = load_state(CANDLE_BUFFER_FILE)
+        buf = deque(state.get("candles", []), maxlen=CANDLE_BUFFER_SIZE)
+
+        if len(buf) >= 120:
+            latest = self.fetch_candles(limit=2)
+            if len(latest) == 2:
+                prev, cur = latest
+                if cur["ts"] == buf[-1]["ts"]:
+                    # Same bar still forming — refresh it (and its predecessor)
+                    if len(buf) >= 2 and buf[-2]["ts"] == prev["ts"]:
+                        buf[-2] = prev
+                    buf[-1] = cur
+                    return self._save_candle_buffer(buf)
+                if prev["ts"] == buf[-1]["ts"]:
+                    # One new bar opened — finalize the old one, append the new
+                    buf[-1] = prev
+                    buf.append(cur)
+                    return self._save_candle_buffer(buf)
+            logger.info("Candle buffer out of sync, refetching full window")
+
+        candles = self.fetch_candles(limit=CANDLE_BUFFER_SIZE)
+        if not candles:
+            return []
+        return self._save_candle_buffer(
+            deque(candles, maxlen=CANDLE_BUFFER_SIZE))
+
+    def _save_candle_buffer(self, buf: deque) -> list:
+        """Persist the sliding window and return it as a list."""
+        candles = list(buf)
+        save_state(CANDLE_BUFFER_FILE, {"candles": candles})
+        return candles
+
     # === Signal Detection ===
 
     def check_signal(self) -> Optional[str]:
@@ -72,9 +137,9 @@ class BBExecutor:
 
         Returns 'LONG', 'SHORT', or None.
         """
-        candles = self.fetch_candles(limit=300)
+        candles = self.fetch_recent_candles()
         if len(candles) < 120:
-            logger.warning(f"Insufficient candles: {len(candles)}")
+            logger.warning("Insufficient candles: %d", len(candles))
             return None
 
         closes = self.get_closes(candles)
@@ -90,7 +155,7 @@ class BBExecutor:
         )
 
         if signal:
-            logger.info(f"Signal detected: {signal} at price {closes[-1]:.2f}")
+            logger.info("Signal detected: %s at price %.2f", signal, closes[-1])
         return signal
 
     # === Position Sizing ===
@@ -140,14 +205,13 @@ class BBExecutor:
             min_notional = minSz * ctVal * price
             min_loss = min_notional * self.cfg.risk.stop_loss_pct
             if min_loss > self.cfg.risk.max_single_loss:
-                logger.warning(f"minSz ${min_notional:.2f} exceeds max_single_loss "
-                               f"(loss=${min_loss:.2f} > ${self.cfg.risk.max_single_loss})")
+                logger.warning("minSz $%.2f exceeds max_single_loss (loss=$%.2f > $%s)",
+                               min_notional, min_loss, self.cfg.risk.max_single_loss)
                 return None
             contracts = minSz
 
-        logger.info(f"Position sizing: equity=${equity:.2f}, "
-                     f"notional=${notional:.2f}, contracts={contracts}, "
-                     f"lotSz={lotSz}, ctVal={ctVal}")
+        logger.info("Position sizing: equity=$%.2f, notional=$%.2f, contracts=%s, "
+                    "lotSz=%s, ctVal=%s", equity, notional, contracts, lotSz, ctVal)
         return f"{contracts:.2f}"
 
     # === Order Execution ===
@@ -178,22 +242,22 @@ class BBExecutor:
         # Calling set_leverage when algo orders exist throws OKX error 59668.
 
         # 1. Market order
-        logger.info(f"Opening {direction} {sz} contracts on {self.instId}")
+        logger.info("Opening %s %s contracts on %s", direction, sz, self.instId)
         result = self.client.place_market_order(self.instId, side, sz)
 
         if result.get("code") != "0":
-            logger.error(f"Market order failed: {result}")
+            logger.error("Market order failed: %s", result)
             send_discord(f"{MSG_PREFIX}❌ OKX BB: 开仓失败\n{result.get('msg', 'unknown')}", mention=True)
             return False
 
         if not result.get("data") or not result["data"]:
-            logger.error(f"Market order returned empty data: {result}")
+            logger.error("Market order returned empty data: %s", result)
             send_discord(f"{MSG_PREFIX}❌ OKX BB: 开仓返回空数据\n{result}", mention=True)
             return False
 
         ordId = result["data"][0].get("ordId", "")
         if not ordId:
-            logger.error(f"No ordId in response: {result}")
+            logger.error("No ordId in response: %s", result)
             return False
 
         time.sleep(2)  # wait for fill
@@ -208,12 +272,12 @@ class BBExecutor:
             # Fallback to ticker (shouldn't happen for market order)
             ticker = self.client.get_ticker(self.instId)
             entry_price = ticker["last"] if ticker else 0
-            logger.warning(f"Using ticker price as fallback: {entry_price}")
+            logger.warning("Using ticker price as fallback: %s", entry_price)
 
         if entry_price <= 0:
             # CRITICAL: Cannot calculate SL/TP with price=0
             logger.error("CRITICAL: entry_price=0, cannot set SL/TP. Emergency close!")
-            self._emergency_close(close_side, sz)
+            self._emergency_close()
             send_discord(f"{MSG_PREFIX}🚨 OKX BB: 无法获取入场价格，紧急平仓", mention=True)
             return False
 
@@ -232,14 +296,15 @@ class BBExecutor:
         )
 
         if sl_result.get("code") != "0" or not sl_result.get("data"):
-            logger.error(f"SL order failed: {sl_result}")
+            logger.error("SL order failed: %s", sl_result)
             logger.error("EMERGENCY: SL failed, closing position immediately")
-            self._emergency_close(close_side, sz)
+            self._emergency_close()
             send_discord(f"{MSG_PREFIX}🚨 OKX BB: 止损设置失败，紧急平仓\n{sl_result.get('msg')}", mention=True)
             return False
 
         sl_algo_id = sl_result["data"][0].get("algoId", "") if sl_result["data"] else ""
-        logger.info(f"✅ SL placed: algoId={sl_algo_id} triggerPx=${sl_price:.2f} side={close_side} sz={sz}")
+        logger.info("✅ SL placed: algoId=%s triggerPx=$%.2f side=%s sz=%s",
+                    sl_algo_id, sl_price, close_side, sz)
 
         # 3. Take-profit (limit order, reduceOnly to prevent accidental opens)
         tp_result = self.client.place_limit_order(
@@ -249,16 +314,17 @@ class BBExecutor:
         )
 
         if tp_result.get("code") != "0" or not tp_result.get("data"):
-            logger.error(f"TP order failed: {tp_result}")
+            logger.error("TP order failed: %s", tp_result)
             # TP failure is less critical — warn but keep position with SL
             send_discord(f"{MSG_PREFIX}⚠️ OKX BB: TP设置失败，仅有SL保护\n{tp_result.get('msg')}")
             tp_ord_id = ""
         else:
             tp_ord_id = tp_result["data"][0].get("ordId", "") if tp_result["data"] else ""
-            logger.info(f"✅ TP placed: ordId={tp_ord_id} px=${tp_price:.2f} side={close_side} sz={sz}")
+            logger.info("✅ TP placed: ordId=%s px=$%.2f side=%s sz=%s",
+                        tp_ord_id, tp_price, close_side, sz)
 
         # Save position state
-        now = datetime.now(timezone.utc).isoformat()
+        now = datetime.now(timezone.utc).isoformat(timespec="seconds")
         pos_state = {
             "direction": direction,
             "entry_price": entry_price,
@@ -282,31 +348,35 @@ class BBExecutor:
             mention=True,
         )
 
-        logger.info(f"Position opened: {direction} @ {entry_price:.2f}, "
-                     f"SL={sl_price:.2f}, TP={tp_price:.2f}")
+        logger.info("Position opened: %s @ %.2f, SL=%.2f, TP=%.2f",
+                    direction, entry_price, sl_price, tp_price)
         return True
 
-    def _emergency_close(self, side: str, sz: str) -> bool:
-        """Emergency market close — verify position actually closed."""
+    def _emergency_close(self) -> bool:
+        """Emergency close via close-position — verify position actually closed.
+
+        First attempt closes blind (close-position is idempotent); retries
+        re-check the exchange first. Backoff: 0.2s, 0.6s, 1.8s.
+        """
         for attempt in range(3):
-            # Check if already closed
-            positions = self.client.get_positions(self.instId)
-            if positions is not None and not any(
-                float(p.get("pos", 0)) != 0 for p in positions
-            ):
-                logger.info("Position already closed")
-                self.save_position(None)
-                return True
-
-            if positions is None:
-                logger.warning(f"Cannot verify position (API error), trying close anyway")
-
-            result = self.client.place_market_order(
-                self.instId, side, sz, reduceOnly=True
-            )
-            logger.info(f"Emergency close attempt {attempt + 1}: side={side} sz={sz} result={result.get('code')} msg={result.get('msg', '')}")
+            if attempt > 0:
+                # Chain-first: check if already closed before retrying
+                positions = self.client.get_positions(self.instId)
+                if positions is not None and not any(
+                    float(p.get("pos", 0)) != 0 for p in positions
+                ):
+                    logger.info("Position already closed")
+                    self.save_position(None)
+                    return True
+                if positions is None:
+                    logger.warning("Cannot verify position (API error), trying close anyway")
+
+            delay = EMERGENCY_CLOSE_BASE_DELAY * (3 ** attempt)
+            result = self.client.close_position(self.instId)
+            logger.info("Emergency close attempt %d: result=%s msg=%s",
+                        attempt + 1, result.get('code'), result.get('msg', ''))
             if result.get("code") == "0":
-                time.sleep(2)
+                time.sleep(delay)
                 # Verify
                 positions = self.client.get_positions(self.instId)
                 if positions is not None and not any(
@@ -315,8 +385,9 @@ class BBExecutor:
                     logger.info("Emergency close successful")
                     self.save_position(None)
                     return True
-            logger.warning(f"Emergency close attempt {attempt + 1} failed")
-            time.sleep(3)
+            logger.warning("Emergency close attempt %d failed", attempt + 1)
+            if attempt < 2:
+                time.sleep(delay)
 
         logger.error("CRITICAL: Emergency close failed after 3 attempts!")
         send_discord(f"{MSG_PREFIX}🚨🚨 OKX BB: 紧急平仓失败！需要手动干预！", mention=True)
@@ -348,9 +419,9 @@ class BBExecutor:
 
         if not has_position:
             # Position closed by SL/TP order — determine which one
-            exit_reason = self._determine_exit_reason(pos)
-            logger.info(f"Position closed by exchange order ({exit_reason})")
-            result = self._record_closed_position(pos, exit_reason)
+            exit_reason, exit_price = self._resolve_exit(pos)
+            logger.info("Position closed by exchange order (%s)", exit_reason)
+            result = self._record_closed_position(pos, exit_reason, exit_price)
             self.save_position(None)
 
             # Also clean up any remaining orders
@@ -364,12 +435,10 @@ class BBExecutor:
         elapsed = (now - entry_time).total_seconds()
 
         if elapsed >= max_hold_seconds:
-            logger.info(f"Position timeout after {elapsed/3600:.1f}h")
-            close_side = "sell" if pos["direction"] == "LONG" else "buy"
-
+            logger.info("Position timeout after %.1fh", elapsed / 3600)
             # IMPORTANT: Close position FIRST, then cancel remaining orders.
             # If we cancel SL/TP first and close fails → naked position!
-            closed = self._emergency_close(close_side, pos["size"])
+            closed = self._emergency_close()
             if not closed:
                 logger.error("Timeout close failed — position still open with SL/TP intact")
                 # DO NOT cancel SL/TP — they are still protecting the position!
@@ -393,7 +462,42 @@ class BBExecutor:
 
         return None
 
-    def _determine_exit_reason(self, pos: dict) -> str:
+    def _resolve_exit(self, pos: dict) -> Tuple[str, float]:
+        """Determine exit reason and exit price from a single fills query.
+
+        TP is matched by ordId, SL by fill price vs the SL target.
+        Algo/order history is only queried when the fills are inconclusive.
+
+        Returns (reason, exit_price), reason is 'sl', 'tp', or 'unknown'.
+        """
+        fills = self.client.get_fills(instId=self.instId, limit=10)
+        tp_id = pos.get("tp_order_id")
+        if tp_id:
+            for fill in fills:
+                if fill.get("ordId") == tp_id:
+                    fill_price = float(fill.get("fillPx", 0))
+                    if fill_price > 0:
+                        return "tp", fill_price
+
+        exit_price = self._get_actual_exit_price(pos, fills)
+        reason = self._reason_from_fill_price(pos, exit_price)
+        if reason == "unknown":
+            reason = self._determine_exit_reason(pos, fills)
+        return reason, exit_price
+
+    def _reason_from_fill_price(self, pos: dict, fill_price: float) -> str:
+        """Classify exit as 'sl'/'tp' if fill is within 0.5% of the target."""
+        if fill_price > 0:
+            sl = pos.get("sl_price", 0)
+            tp = pos.get("tp_price", 0)
+            if sl and abs(fill_price - sl) / sl < 0.005:
+                return "sl"
+            if tp and abs(fill_price - tp) / tp < 0.005:
+                return "tp"
+        return "unknown"
+
+    def _determine_exit_reason(self, pos: dict,
+                               fills: Optional[list] = None) -> str:
         """Check algo order history + regular order history to determine
         if exit was SL or TP.
 
@@ -420,18 +524,16 @@ class BBExecutor:
                 return "tp"
 
         # Fallback: check fills to see exit price vs SL/TP targets
-        fills = self.client.get_fills(instId=self.instId, limit=5)
+        if fills is None:
+            fills = self.client.get_fills(instId=self.instId, limit=5)
         if fills:
-            fill_price = float(fills[0].get("fillPx", 0))
-            if fill_price > 0:
-                sl = pos.get("sl_price", 0)
-                tp = pos.get("tp_price", 0)
-                if sl and abs(fill_price - sl) / sl < 0.005:
-                    return "sl"
-                if tp and abs(fill_price - tp) / tp < 0.005:
-                    return "tp"
-
-        logger.info(f"Exit reason: unknown (SL algo={pos.get('sl_algo_id')}, TP ord={pos.get('tp_order_id')})")
+            reason = self._reason_from_fill_price(
+                pos, float(fills[0].get("fillPx", 0)))
+            if reason != "unknown":
+                return reason
+
+        logger.info("Exit reason: unknown (SL algo=%s, TP ord=%s)",
+                    pos.get('sl_algo_id'), pos.get('tp_order_id'))
         return "unknown"
 
     def _cancel_remaining_orders(self, pos: dict):
@@ -440,17 +542,19 @@ class BBExecutor:
             if pos.get("sl_algo_id"):
                 self.client.cancel_algo_order(pos["sl_algo_id"], self.instId)
         except Exception as e:
-            logger.debug(f"SL cancel (may already be done): {e}")
+            logger.debug("SL cancel (may already be done): %s", e)
         try:
             if pos.get("tp_order_id"):
                 self.client.cancel_order(self.instId, pos["tp_order_id"])
         except Exception as e:
-            logger.debug(f"TP cancel (may already be done): {e}")
+            logger.debug("TP cancel (may already be done): %s", e)
 
-    def _get_actual_exit_price(self, pos: dict) -> float:
+    def _get_actual_exit_price(self, pos: dict,
+                               fills: Optional[list] = None) -> float:
         """Get actual exit price from fills or order history."""
         # Check recent fills
-        fills = self.client.get_fills(instId=self.instId, limit=5)
+        if fills is None:
+            fills = self.client.get_fills(instId=self.instId, limit=5)
         if fills:
             # Most recent fill for this instrument
             fill_price = float(fills[0].get("fillPx", 0))
@@ -470,13 +574,16 @@ class BBExecutor:
             return ticker["last"]
         return pos["entry_price"]
 
-    def _record_closed_position(self, pos: dict, reason: str) -> TradeResult:
+    def _record_closed_position(self, pos: dict, reason: str,
+                                exit_price: Optional[float] = None) -> TradeResult:
         """Record a closed trade to log file.
 
         Args:
             reason: 'sl', 'tp', 'timeout', 'unknown'
+            exit_price: Already-resolved exit price; looked up if None.
         """
-        exit_price = self._get_actual_exit_price(pos)
+        if exit_price is None:
+            exit_price = self._get_actual_exit_price(pos)
 
         if pos["direction"] == "LONG":
             pnl_pct = (exit_price - pos["entry_price"]) / pos["entry_price"]
@@ -526,7 +633,7 @@ class BBExecutor:
             try:
                 log = json.loads(log_path.read_text())
             except Exception as e:
-                logger.warning(f"Corrupt trade log, starting fresh: {e}")
+                logger.warning("Corrupt trade log, starting fresh: %s", e)
 
         log.append({
             "coin": result.coin,
@@ -1,16 +1,45 @@
 """Shared fixtures for OKX BB tests."""
+import asyncio
+import sys
 from unittest.mock import patch
 from pathlib import Path
 
 import pytest
 
+# Repo root on sys.path once for every test module (core/, okx_bb/)
+_REPO_ROOT = str(Path(__file__).resolve().parents[2])
+if _REPO_ROOT not in sys.path:
+    sys.path.insert(0, _REPO_ROOT)
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--force-rescan", action="store_true", default=False,
+        help="Ignore the mtime cache in test_no_duplication (use in CI)",
+    )
+
+
+def _discord_stub(*args, **kwargs):
+    return True
+
+
+@pytest.fixture(autouse=True)
+def _no_discord(monkeypatch):
+    """Stub send_discord wherever okx_bb imported it (not just core.notify).
+
+    Plain function via monkeypatch — undone after every test, no Mock
+    call recording on each notification.
+    """
+    for target in ("core.notify.send_discord",
+                   "okx_bb.executor.send_discord",
+                   "okx_bb.ws_monitor.send_discord"):
+        monkeypatch.setattr(target, _discord_stub)
+
 
 @pytest.fixture(autouse=True)
 def _block_okx_side_effects(tmp_path):
-    """Mock time.sleep, send_discord, network calls, and isolate state dir.
+    """Mock time.sleep, network calls, and isolate state dir.
 
-    Key: patch send_discord where it's imported (okx_bb.executor),
-    not just where it's defined (core.notify).
     State files go to tmp_path to avoid polluting production state.
     """
     import socket as _socket
@@ -27,11 +56,38 @@ def _block_okx_side_effects(tmp_path):
     with patch('time.sleep'), \
          patch('okx_bb.executor.time.sleep'), \
          patch('okx_bb.exchange.time.sleep'), \
-         patch('okx_bb.executor.send_discord', return_value=True), \
-         patch('core.notify.send_discord', return_value=True), \
          patch('okx_bb.executor.STATE_DIR', test_state_dir), \
          patch('okx_bb.executor.POSITION_STATE_FILE', test_state_dir / "position_state.json"), \
          patch('okx_bb.executor.TRADE_LOG_FILE', test_state_dir / "trade_log.json"), \
+         patch('okx_bb.executor.CANDLE_BUFFER_FILE', test_state_dir / "candle_buffer.json"), \
          patch('okx_bb.ws_monitor.PENDING_STATE_FILE', test_state_dir / "pending_orders.json"), \
          patch.object(_socket.socket, 'connect', _blocked_connect):
         yield
+
+
+@pytest.fixture(scope="session")
+def _shared_loop():
+    loop = asyncio.new_event_loop()
+    yield loop
+    loop.close()
+
+
+@pytest.fixture
+def loop(_shared_loop):
+    """One event loop for the whole session, drained after each test."""
+    yield _shared_loop
+    _shared_loop.run_until_complete(asyncio.sleep(0))
+
+
+@pytest.fixture(scope="module")
+def client():
+    """Shared OKXClient for read-only signing/header tests — don't mutate."""
+    from okx_bb.exchange import OKXClient
+    return OKXClient("k", "s", "p")
+
+
+@pytest.fixture(scope="module")
+def client_sim():
+    """Shared simulated-trading OKXClient — don't mutate."""
+    from okx_bb.exchange import OKXClient
+    return OKXClient("k", "s", "p", simulated=True)
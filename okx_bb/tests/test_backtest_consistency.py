@@ -1,9 +1,5 @@
 """Verify backtest uses exactly the same functions as production."""
 import inspect
-import sys
-from pathlib import Path
-
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
 
 
 class TestBacktestConsistency:
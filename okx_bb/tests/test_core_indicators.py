@@ -1,11 +1,11 @@
 """Tests for core.indicators — shared indicator library."""
-import sys
-from pathlib import Path
+import math
 
-# Add parent dirs to path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from core.indicators import ema, ema_step, rsi, bollinger_bands, bollinger_from_sums
 
-from core.indicators import ema, rsi, bollinger_bands
+# Sinusoidal closes, built once at import
+SINE_NARROW = tuple(100 + math.sin(i * 0.3) * 5 for i in range(50))
+SINE_WIDE = tuple(100 + math.sin(i * 0.5) * 10 for i in range(50))
 
 
 class TestEMA:
@@ -16,7 +16,7 @@ class TestEMA:
         assert ema([100.0], 10) == [100.0]
 
     def test_constant(self):
-        result = ema([50.0] * 20, 10)
+        result = ema((50.0,) * 20, 10)
         assert all(abs(v - 50.0) < 1e-10 for v in result)
 
     def test_trending_up(self):
@@ -31,10 +31,26 @@ class TestEMA:
         result = ema(data, 10)
         assert len(result) == 10
 
+    def test_matches_reference_recurrence(self):
+        from collections import deque
+        k = 2 / (10 + 1)
+        expected = [SINE_WIDE[0]]
+        for x in SINE_WIDE[1:]:
+            expected.append(x * k + expected[-1] * (1 - k))
+        assert ema(SINE_WIDE, 10) == expected
+        assert ema(deque(SINE_WIDE), 10) == expected  # any iterable works
+
+    def test_step_matches_batch(self):
+        result = ema(SINE_WIDE, 10)
+        value = SINE_WIDE[0]
+        for x in SINE_WIDE[1:]:
+            value = ema_step(value, x, 10)
+        assert abs(value - result[-1]) < 1e-9
+
 
 class TestRSI:
     def test_flat(self):
-        result = rsi([100.0] * 20, 14)
+        result = rsi((100.0,) * 20, 14)
         # Flat data → avg_gain=0, RSI ≈ 0
         assert result[-1] < 5
 
@@ -55,12 +71,11 @@ class TestBollingerBands:
 
     def test_flat_market(self):
         # All same price → std ≈ 0 → None
-        closes = [100.0] * 30
+        closes = (100.0,) * 30
         assert bollinger_bands(closes, 20, 2.0, 25) is None
 
     def test_normal(self):
-        import math
-        closes = [100 + math.sin(i * 0.3) * 5 for i in range(50)]
+        closes = SINE_NARROW
         result = bollinger_bands(closes, 20, 2.0, 30)
         assert result is not None
         mid, upper, lower = result
@@ -68,15 +83,36 @@ class TestBollingerBands:
 
     def test_no_lookahead(self):
         """BB at idx should not use closes[idx]."""
-        closes = [100.0] * 30
-        closes.append(200.0)  # spike at idx=30
+        closes = (100.0,) * 30 + (200.0,)  # spike at idx=30
         result = bollinger_bands(closes, 20, 2.0, 30)
         # Window is [10:30] — doesn't include idx=30
         assert result is None  # all 100.0 → flat → None
 
     def test_upper_lower_symmetric(self):
-        import math
-        closes = [100 + math.sin(i * 0.5) * 10 for i in range(50)]
+        closes = SINE_WIDE
         result = bollinger_bands(closes, 20, 2.0, 40)
         mid, upper, lower = result
         assert abs((upper - mid) - (mid - lower)) < 1e-10
+
+    def test_from_sums_matches_window(self):
+        window = SINE_WIDE[20:40]
+        result = bollinger_from_sums(sum(window), sum(x * x for x in window), 20, 2.0)
+        expected = bollinger_bands(SINE_WIDE, 20, 2.0, 40)
+        assert all(abs(a - b) < 1e-9 for a, b in zip(result, expected))
+
+    def test_from_sums_flat_market(self):
+        assert bollinger_from_sums(100.0 * 20, 100.0 ** 2 * 20, 20, 2.0) is None
+
+    def test_from_sums_flat_market_realistic_price(self):
+        # Sums slid bar by bar like ws_monitor does: cancellation leaves a
+        # nonzero variance unless the exact window recompute kicks in.
+        window = [2116.81] * 20
+        total, total_sq = 0.0, 0.0
+        for x in [2100.0 + i for i in range(20)] + window:
+            total += x
+            total_sq += x * x
+        for x in [2100.0 + i for i in range(20)]:
+            total -= x
+            total_sq -= x * x
+        assert bollinger_bands(window + [2116.81], 20, 2.0, 20) is None
+        assert bollinger_from_sums(total, total_sq, 20, 2.0, window) is None
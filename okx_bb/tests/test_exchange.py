@@ -1,7 +1,5 @@
 """Tests for OKX exchange API — signature and request handling."""
-import sys
-from pathlib import Path
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from unittest.mock import MagicMock, patch
 
 from okx_bb.exchange import OKXClient
 
@@ -31,44 +29,84 @@ class TestSignature:
         decoded = base64.b64decode(sig)
         assert len(decoded) == 32  # SHA-256 = 32 bytes
 
-    def test_signature_deterministic(self):
+    def test_signature_deterministic(self, client):
         """Same inputs → same signature."""
-        client = OKXClient("k", "s", "p")
         sig1 = client._sign("ts", "GET", "/path", "")
         sig2 = client._sign("ts", "GET", "/path", "")
         assert sig1 == sig2
 
-    def test_signature_changes_with_body(self):
+    def test_signature_matches_fresh_hmac(self, client):
+        """Reused keyed HMAC context must match a freshly keyed one."""
+        import base64
+        import hashlib
+        import hmac
+        for ts, method, path, body in [("ts", "GET", "/path", ""),
+                                       ("ts", "POST", "/path", '{"a":1}')]:
+            mac = hmac.new(b"s", (ts + method + path + body).encode(),
+                           hashlib.sha256)
+            expected = base64.b64encode(mac.digest()).decode()
+            assert client._sign(ts, method, path, body) == expected
+
+    def test_signature_changes_with_body(self, client):
         """Different body → different signature."""
-        client = OKXClient("k", "s", "p")
         sig1 = client._sign("ts", "POST", "/path", '{"a":1}')
         sig2 = client._sign("ts", "POST", "/path", '{"b":2}')
         assert sig1 != sig2
 
-    def test_signature_method_case(self):
+    def test_signature_method_case(self, client):
         """Method should be uppercased in signature."""
-        client = OKXClient("k", "s", "p")
         sig_lower = client._sign("ts", "get", "/path", "")
         sig_upper = client._sign("ts", "GET", "/path", "")
         assert sig_lower == sig_upper
 
 
 class TestHeaders:
-    def test_headers_contain_required_fields(self):
-        client = OKXClient("mykey", "mysecret", "mypass")
+    def test_headers_contain_required_fields(self, client):
         headers = client._headers("GET", "/api/v5/test", "")
-        assert headers["OK-ACCESS-KEY"] == "mykey"
-        assert headers["OK-ACCESS-PASSPHRASE"] == "mypass"
+        assert headers["OK-ACCESS-KEY"] == "k"
+        assert headers["OK-ACCESS-PASSPHRASE"] == "p"
         assert "OK-ACCESS-SIGN" in headers
         assert "OK-ACCESS-TIMESTAMP" in headers
         assert headers["Content-Type"] == "application/json"
 
-    def test_simulated_header(self):
-        client = OKXClient("k", "s", "p", simulated=True)
-        headers = client._headers("GET", "/test", "")
+    def test_simulated_header(self, client_sim):
+        headers = client_sim._headers("GET", "/test", "")
         assert headers["x-simulated-trading"] == "1"
 
-    def test_no_simulated_header_by_default(self):
-        client = OKXClient("k", "s", "p")
+    def test_no_simulated_header_by_default(self, client):
         headers = client._headers("GET", "/test", "")
         assert "x-simulated-trading" not in headers
+
+
+class TestClosePosition:
+    def test_close_position_body(self):
+        client = OKXClient("k", "s", "p")
+        client._request = MagicMock(return_value={"code": "0"})
+        client.close_position("ETH-USDT-SWAP")
+        client._request.assert_called_once_with(
+            "POST", "/trade/close-position",
+            body={"instId": "ETH-USDT-SWAP", "mgnMode": "isolated", "autoCxl": "true"})
+
+    def test_close_position_with_pos_side(self):
+        client = OKXClient("k", "s", "p")
+        client._request = MagicMock(return_value={"code": "0"})
+        client.close_position("ETH-USDT-SWAP", posSide="long")
+        body = client._request.call_args.kwargs["body"]
+        assert body["posSide"] == "long"
+
+
+class TestSessionPool:
+    def test_https_adapter_pooled_connect_retries_only(self, client):
+        from okx_bb.exchange import POOL_MAXSIZE
+        adapter = client.session.get_adapter("https://www.okx.com/api/v5/x")
+        assert adapter._pool_maxsize == POOL_MAXSIZE
+        retry = adapter.max_retries
+        assert retry.total == 2
+        assert retry.read is False and retry.status is False
+
+    def test_close_releases_session(self):
+        from okx_bb.exchange import OKXClient
+        c = OKXClient("k", "s", "p")
+        with patch.object(c.session, "close") as close:
+            c.close()
+        close.assert_called_once_with()
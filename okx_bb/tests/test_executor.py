@@ -1,11 +1,10 @@
 """Tests for BBExecutor — mock OKXClient to test execution logic."""
-import sys
+import copy
 import json
-from pathlib import Path
 from unittest.mock import MagicMock, patch
 from datetime import datetime, timezone, timedelta
 
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+import pytest
 
 from okx_bb.executor import BBExecutor, POSITION_STATE_FILE
 from okx_bb.config import OKXConfig, StrategyConfig, RiskConfig, FeeConfig
@@ -22,32 +21,35 @@ def make_config():
     )
 
 
-def make_executor(tmp_path=None):
-    """Create executor with mocked client."""
-    executor = BBExecutor(config=make_config())
+@pytest.fixture(scope="module")
+def executor_template():
+    """One fully-configured executor per module; copied per test."""
+    return BBExecutor(config=make_config())
+
+
+@pytest.fixture
+def ex(executor_template):
+    """Fresh executor (own attribute dict) with a mocked client."""
+    executor = copy.copy(executor_template)
     executor.client = MagicMock()
     return executor
 
 
 class TestOpenPosition:
-    def test_aborts_if_existing_position(self):
-        ex = make_executor()
+    def test_aborts_if_existing_position(self, ex):
         ex.client.get_positions.return_value = [{"pos": "1"}]
         assert ex.open_position("LONG") is False
 
-    def test_aborts_if_positions_api_fails(self):
-        ex = make_executor()
+    def test_aborts_if_positions_api_fails(self, ex):
         ex.client.get_positions.return_value = None  # API error
         assert ex.open_position("LONG") is False
 
-    def test_aborts_if_no_equity(self):
-        ex = make_executor()
+    def test_aborts_if_no_equity(self, ex):
         ex.client.get_positions.return_value = []
         ex.client.get_balance.return_value = {"total_equity": 0}
         assert ex.open_position("LONG") is False
 
-    def test_aborts_if_market_order_fails(self):
-        ex = make_executor()
+    def test_aborts_if_market_order_fails(self, ex):
         ex.client.get_positions.return_value = []
         ex.client.get_balance.return_value = {"total_equity": 100}
         ex.client.get_instrument.return_value = {"ctVal": "0.01"}
@@ -56,8 +58,7 @@ class TestOpenPosition:
         ex.client.place_market_order.return_value = {"code": "1", "msg": "fail"}
         assert ex.open_position("LONG") is False
 
-    def test_emergency_close_if_entry_price_zero(self):
-        ex = make_executor()
+    def test_emergency_close_if_entry_price_zero(self, ex):
         ex.client.get_positions.return_value = []
         ex.client.get_balance.return_value = {"total_equity": 100}
         ex.client.get_instrument.return_value = {"ctVal": "0.01"}
@@ -78,8 +79,7 @@ class TestOpenPosition:
         assert ex.open_position("LONG") is False
         ex._emergency_close.assert_called_once()
 
-    def test_emergency_close_if_sl_fails(self):
-        ex = make_executor()
+    def test_emergency_close_if_sl_fails(self, ex):
         ex.client.get_positions.return_value = []
         ex.client.get_balance.return_value = {"total_equity": 100}
         ex.client.get_instrument.return_value = {"ctVal": "0.01"}
@@ -98,19 +98,16 @@ class TestOpenPosition:
 
 
 class TestCheckPosition:
-    def test_returns_none_if_no_saved_position(self):
-        ex = make_executor()
+    def test_returns_none_if_no_saved_position(self, ex):
         ex.load_position = MagicMock(return_value=None)
         assert ex.check_position() is None
 
-    def test_returns_none_if_api_fails(self):
-        ex = make_executor()
+    def test_returns_none_if_api_fails(self, ex):
         ex.load_position = MagicMock(return_value={"direction": "LONG", "entry_time": "2026-01-01T00:00:00+00:00"})
         ex.client.get_positions.return_value = None  # API error
         assert ex.check_position() is None
 
-    def test_detects_sl_tp_close(self):
-        ex = make_executor()
+    def test_detects_sl_tp_close(self, ex):
         pos = {
             "direction": "LONG",
             "entry_price": 2000,
@@ -123,8 +120,7 @@ class TestCheckPosition:
         }
         ex.load_position = MagicMock(return_value=pos)
         ex.client.get_positions.return_value = []  # Position gone
-        ex._determine_exit_reason = MagicMock(return_value="tp")
-        ex._get_actual_exit_price = MagicMock(return_value=2060.0)
+        ex._resolve_exit = MagicMock(return_value=("tp", 2060.0))
         ex._cancel_remaining_orders = MagicMock()
         ex.save_position = MagicMock()
         ex._append_trade_log = MagicMock()
@@ -134,8 +130,7 @@ class TestCheckPosition:
         assert result.exit_reason == ExitReason.TP
         ex.save_position.assert_called_with(None)
 
-    def test_timeout_closes_position_then_cancels_orders(self):
-        ex = make_executor()
+    def test_timeout_closes_position_then_cancels_orders(self, ex):
         old_time = (datetime.now(timezone.utc) - timedelta(hours=100)).isoformat()
         pos = {
             "direction": "LONG",
@@ -164,9 +159,8 @@ class TestCheckPosition:
         ex.client.cancel_algo_order.assert_called_once()
         ex.client.cancel_order.assert_called_once()
 
-    def test_timeout_close_fails_preserves_sl_tp(self):
+    def test_timeout_close_fails_preserves_sl_tp(self, ex):
         """If timeout close fails, SL/TP should NOT be cancelled."""
-        ex = make_executor()
         old_time = (datetime.now(timezone.utc) - timedelta(hours=100)).isoformat()
         pos = {
             "direction": "LONG",
@@ -188,36 +182,98 @@ class TestCheckPosition:
         ex.client.cancel_order.assert_not_called()
 
 
+class TestTimeoutCloseWithLiveOrders:
+    @patch('time.sleep')
+    def test_timeout_closes_while_tp_and_sl_pending(self, mock_sleep, ex):
+        """OKX rejects close-position while close orders are pending unless
+        autoCxl is set; the timeout path closes with SL/TP still live."""
+        from okx_bb.exchange import OKXClient
+        state = {"pos": "1"}
+        live = {"sl": True, "tp": True}
+
+        def request(method, path, params=None, body=None):
+            if path == "/account/positions":
+                return {"code": "0",
+                        "data": [{"pos": state["pos"]}] if state["pos"] != "0" else []}
+            if path == "/trade/close-position":
+                if any(live.values()) and body.get("autoCxl") != "true":
+                    return {"code": "51169", "msg": "pending close orders"}
+                live.update(sl=False, tp=False)
+                state["pos"] = "0"
+                return {"code": "0", "data": [{}]}
+            return {"code": "0", "data": []}
+
+        client = OKXClient("k", "s", "p")
+        client._request = MagicMock(side_effect=request)
+        ex.client = client
+        pos = {
+            "direction": "LONG", "entry_price": 2000, "size": "1",
+            "sl_algo_id": "algo123", "tp_order_id": "ord456",
+            "entry_time": (datetime.now(timezone.utc) - timedelta(hours=100)).isoformat(),
+        }
+        ex.load_position = MagicMock(return_value=pos)
+        ex.save_position = MagicMock()
+        ex._get_actual_exit_price = MagicMock(return_value=1990.0)
+        ex._append_trade_log = MagicMock()
+
+        with patch('okx_bb.executor.send_discord') as discord:
+            result = ex.check_position()
+
+        assert result is not None
+        assert result.exit_reason == ExitReason.TIMEOUT
+        assert state["pos"] == "0"
+        closes = [c for c in client._request.call_args_list
+                  if c.args[1] == "/trade/close-position"]
+        assert len(closes) == 1
+        assert "手动干预" not in " ".join(str(c) for c in discord.call_args_list)
+
+
 class TestEmergencyClose:
     @patch('time.sleep')  # speed up tests
-    def test_already_closed(self, mock_sleep):
-        ex = make_executor()
+    def test_already_closed(self, mock_sleep, ex):
+        ex.client.close_position.return_value = {"code": "51023", "msg": "no position"}
         ex.client.get_positions.return_value = []
         ex.save_position = MagicMock()
-        assert ex._emergency_close("sell", "1") is True
+        assert ex._emergency_close() is True
+        ex.client.place_market_order.assert_not_called()
 
     @patch('time.sleep')
-    def test_closes_after_retry(self, mock_sleep):
-        ex = make_executor()
+    def test_happy_path_single_close_call(self, mock_sleep, ex):
+        """First attempt closes blind — no pre-close position read."""
+        ex.client.close_position.return_value = {"code": "0"}
+        ex.client.get_positions.return_value = []
+        ex.save_position = MagicMock()
+        assert ex._emergency_close() is True
+        ex.client.close_position.assert_called_once_with("ETH-USDT-SWAP")
+        ex.client.get_positions.assert_called_once()
+        mock_sleep.assert_called_once_with(0.2)
+
+    @patch('time.sleep')
+    def test_closes_after_retry(self, mock_sleep, ex):
+        ex.client.close_position.side_effect = [
+            {"code": "1", "msg": "fail"},
+            {"code": "0"},
+        ]
         ex.client.get_positions.side_effect = [
-            [{"pos": "1"}],         # before close
+            [{"pos": "1"}],         # before retry
             [],                      # after close
         ]
-        ex.client.place_market_order.return_value = {"code": "0"}
         ex.save_position = MagicMock()
-        assert ex._emergency_close("sell", "1") is True
+        assert ex._emergency_close() is True
+        assert ex.client.close_position.call_count == 2
 
     @patch('time.sleep')
-    def test_all_attempts_fail(self, mock_sleep):
-        ex = make_executor()
+    def test_all_attempts_fail(self, mock_sleep, ex):
         ex.client.get_positions.return_value = [{"pos": "1"}]
-        ex.client.place_market_order.return_value = {"code": "1", "msg": "fail"}
-        assert ex._emergency_close("sell", "1") is False
+        ex.client.close_position.return_value = {"code": "1", "msg": "fail"}
+        assert ex._emergency_close() is False
+        # No sleep after the last attempt — it would only delay the alert
+        delays = [c.args[0] for c in mock_sleep.call_args_list]
+        assert delays == pytest.approx([0.2, 0.6])
 
 
 class TestDetermineExitReason:
-    def test_sl_triggered(self):
-        ex = make_executor()
+    def test_sl_triggered(self, ex):
         pos = {"sl_algo_id": "algo1", "tp_order_id": "ord1",
                "sl_price": 1960, "tp_price": 2060}
         ex.client.get_algo_order_history.return_value = [
@@ -225,8 +281,7 @@ class TestDetermineExitReason:
         ]
         assert ex._determine_exit_reason(pos) == "sl"
 
-    def test_tp_filled(self):
-        ex = make_executor()
+    def test_tp_filled(self, ex):
         pos = {"sl_algo_id": "algo1", "tp_order_id": "ord1",
                "sl_price": 1960, "tp_price": 2060}
         ex.client.get_algo_order_history.return_value = [
@@ -235,11 +290,122 @@ class TestDetermineExitReason:
         ex.client.get_order_detail.return_value = {"state": "filled"}
         assert ex._determine_exit_reason(pos) == "tp"
 
-    def test_unknown_fallback_to_fills(self):
-        ex = make_executor()
+    def test_unknown_fallback_to_fills(self, ex):
         pos = {"sl_algo_id": "algo1", "tp_order_id": "ord1",
                "sl_price": 1960, "tp_price": 2060}
         ex.client.get_algo_order_history.return_value = []
         ex.client.get_order_detail.return_value = {"state": "live"}  # Not filled
         ex.client.get_fills.return_value = [{"fillPx": "1961"}]  # Close to SL
         assert ex._determine_exit_reason(pos) == "sl"
+
+
+def _candles(start_ts, n, step=1800_000):
+    return [{"ts": start_ts + i * step, "o": 1.0, "h": 1.0, "l": 1.0,
+             "c": 2000.0 + i, "vol": 1.0} for i in range(n)]
+
+
+class TestCandleBuffer:
+    def test_cold_start_fetches_full_window(self, ex):
+        ex.client.get_candles.return_value = _candles(0, 300)
+        candles = ex.fetch_recent_candles()
+        assert len(candles) == 300
+        ex.client.get_candles.assert_called_once_with(
+            "ETH-USDT-SWAP", bar="30m", limit=300)
+
+    def test_new_bar_fetches_only_two(self, ex):
+        full = _candles(0, 301)
+        ex.client.get_candles.return_value = full[:300]
+        ex.fetch_recent_candles()
+
+        ex.client.get_candles.reset_mock()
+        ex.client.get_candles.return_value = full[299:301]
+        candles = ex.fetch_recent_candles()
+        ex.client.get_candles.assert_called_once_with(
+            "ETH-USDT-SWAP", bar="30m", limit=2)
+        assert len(candles) == 300
+        assert [c["ts"] for c in candles] == [c["ts"] for c in full[1:301]]
+
+    def test_same_bar_refreshes_last_close(self, ex):
+        full = _candles(0, 300)
+        ex.client.get_candles.return_value = full
+        ex.fetch_recent_candles()
+
+        updated = dict(full[-1], c=9999.0)
+        ex.client.get_candles.return_value = [full[-2], updated]
+        candles = ex.fetch_recent_candles()
+        assert len(candles) == 300
+        assert candles[-1]["c"] == 9999.0
+
+    def test_gap_refetches_full_window(self, ex):
+        ex.client.get_candles.return_value = _candles(0, 300)
+        ex.fetch_recent_candles()
+
+        later = _candles(10_000 * 1800_000, 300)
+        ex.client.get_candles.side_effect = [later[-2:], later]
+        candles = ex.fetch_recent_candles()
+        assert ex.client.get_candles.call_args.kwargs["limit"] == 300
+        assert candles[-1]["ts"] == later[-1]["ts"]
+
+
+class TestResolveExit:
+    POS = {"sl_algo_id": "algo1", "tp_order_id": "ord1",
+           "entry_price": 2000, "sl_price": 1960, "tp_price": 2060}
+
+    def test_tp_matched_by_ord_id_single_call(self, ex):
+        ex.client.get_fills.return_value = [
+            {"ordId": "ord1", "fillPx": "2060.5"},
+        ]
+        assert ex._resolve_exit(self.POS) == ("tp", 2060.5)
+        ex.client.get_fills.assert_called_once()
+        ex.client.get_algo_order_history.assert_not_called()
+        ex.client.get_order_detail.assert_not_called()
+
+    def test_sl_matched_by_price_single_call(self, ex):
+        ex.client.get_fills.return_value = [
+            {"ordId": "sl_child", "fillPx": "1958"},
+        ]
+        assert ex._resolve_exit(self.POS) == ("sl", 1958.0)
+        ex.client.get_fills.assert_called_once()
+        ex.client.get_algo_order_history.assert_not_called()
+
+    def test_falls_back_to_history_when_inconclusive(self, ex):
+        """SL slipped past 0.5% — algo history resolves the reason."""
+        ex.client.get_fills.return_value = [
+            {"ordId": "sl_child", "fillPx": "1900"},
+        ]
+        ex.client.get_algo_order_history.return_value = [
+            {"algoId": "algo1", "state": "effective"}
+        ]
+        assert ex._resolve_exit(self.POS) == ("sl", 1900.0)
+        ex.client.get_fills.assert_called_once()
+
+
+class TestPositionCache:
+    """load_position re-parses the state file only when it changes."""
+
+    def test_repeat_loads_parse_once(self, ex):
+        ex.save_position({"direction": "LONG", "size": "1.00"})
+        with patch("okx_bb.executor.load_state") as load:
+            assert ex.load_position()["direction"] == "LONG"
+            assert ex.load_position()["direction"] == "LONG"
+        load.assert_not_called()
+
+    def test_external_write_is_picked_up(self, ex):
+        import okx_bb.executor as executor_mod
+        ex.save_position({"direction": "LONG"})
+        ex.load_position()
+        other = copy.copy(ex)  # e.g. another process writing the same file
+        other.save_position({"direction": "SHORT", "size": "12.34"})
+        assert executor_mod.POSITION_STATE_FILE.exists()
+        assert ex.load_position()["direction"] == "SHORT"
+
+    def test_returned_dict_is_a_copy(self, ex):
+        ex.save_position({"direction": "LONG", "entry_bar_count": 0})
+        pos = ex.load_position()
+        pos["entry_bar_count"] = 99
+        assert ex.load_position()["entry_bar_count"] == 0
+
+    def test_cleared_position(self, ex):
+        ex.save_position({"direction": "LONG"})
+        ex.save_position(None)
+        assert ex.load_position() is None
@@ -1,33 +1,66 @@
 """Enforce: no indicator implementations outside core/indicators.py."""
-import sys
+import os
 import re
 from pathlib import Path
 
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+OKX_ROOT = Path(__file__).resolve().parents[1]
 
-FORBIDDEN_DEFS = [
-    r'def\s+ema\s*\(',
-    r'def\s+rsi\s*\(',
-    r'def\s+bollinger_bands\s*\(',
-]
+# One alternation, one pass per file
+FORBIDDEN_DEFS = re.compile(rb'def\s+(?:ema|rsi|bollinger_bands)\s*\(')
+
+
+def _source_files(root: str) -> list:
+    """All non-test .py files under root, never descending into core/."""
+    found = []
+    for dirpath, dirs, files in os.walk(root):
+        # Prune in place so excluded dirs are never traversed
+        dirs[:] = [d for d in dirs if d != "core" and not d.startswith("__")]
+        for name in files:
+            if name.endswith(".py") and not name.startswith("test_"):
+                found.append(os.path.join(dirpath, name))
+    return sorted(found)
+
+
+# Walked once per session, not per test run; excluded paths never read
+SOURCE_FILES = _source_files(str(OKX_ROOT))
+
+# .pytest_cache key: {path: [mtime_ns, has_violation]}
+SCAN_CACHE_KEY = "okx_bb/no_dup/scan"
 
 
 class TestNoIndicatorDuplication:
-    def test_no_indicators_in_okx_bb(self):
-        """okx_bb/ should not define ema/rsi/bollinger_bands."""
-        okx_dir = Path(__file__).parent.parent
+    def test_no_indicators_in_okx_bb(self, pytestconfig):
+        """okx_bb/ should not define ema/rsi/bollinger_bands.
+
+        Files unchanged (same mtime) since a clean scan are skipped;
+        run with --force-rescan to ignore the cache.
+        """
+        assert SOURCE_FILES, "No okx_bb source files found to scan"
+        cache = getattr(pytestconfig, "cache", None)
+        use_cache = cache is not None and not pytestconfig.getoption(
+            "force_rescan", default=False)
+        previous = cache.get(SCAN_CACHE_KEY, {}) if use_cache else {}
+
+        scanned = {}
         violations = []
-        for py_file in okx_dir.rglob("*.py"):
-            if "core" in py_file.parts or "test" in py_file.name:
+        for py_file in SOURCE_FILES:
+            mtime = os.stat(py_file).st_mtime_ns
+            if previous.get(py_file) == [mtime, False]:
+                scanned[py_file] = [mtime, False]
                 continue
-            content = py_file.read_text()
-            for pattern in FORBIDDEN_DEFS:
-                if re.search(pattern, content):
-                    violations.append(f"{py_file.name}: {pattern}")
+            # Raw bytes: no UTF-8 decode needed for an ASCII pattern
+            with open(py_file, "rb") as f:
+                m = FORBIDDEN_DEFS.search(f.read())
+            scanned[py_file] = [mtime, m is not None]
+            if m:
+                violations.append(
+                    f"{os.path.basename(py_file)}: {m.group(0).decode()}")
+
+        if cache is not None:
+            cache.set(SCAN_CACHE_KEY, scanned)
         assert violations == [], f"Indicator duplication found: {violations}"
 
     def test_strategy_imports_from_core(self):
         """strategy.py must import from core.indicators."""
-        strategy_file = Path(__file__).parent.parent / "strategy.py"
-        content = strategy_file.read_text()
+        content = (OKX_ROOT / "strategy.py").read_text()
         assert "from core.indicators import" in content
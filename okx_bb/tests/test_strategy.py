@@ -1,27 +1,30 @@
 """Tests for okx_bb.strategy — BB breakout signal detection."""
-import sys
 import math
-from pathlib import Path
-
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from functools import lru_cache
 
 from okx_bb.strategy import detect_signal, get_bb_levels
 
 
+@lru_cache(maxsize=None)
+def _sine_series(n, base, slope, amp, freq):
+    """base + i*slope + sin(i*freq)*amp — generated once per argument set."""
+    return tuple(base + i * slope + math.sin(i * freq) * amp for i in range(n))
+
+
 class TestDetectSignal:
     def _make_uptrend(self, n=200, base=2000, slope=2):
         """Create uptrending price data."""
-        return [base + i * slope + math.sin(i * 0.3) * 20 for i in range(n)]
+        return list(_sine_series(n, base, slope, 20, 0.3))
 
     def _make_downtrend(self, n=200, base=4000, slope=2):
-        return [base - i * slope + math.sin(i * 0.3) * 20 for i in range(n)]
+        return list(_sine_series(n, base, -slope, 20, 0.3))
 
     def test_insufficient_data(self):
-        closes = [100.0] * 50
+        closes = (100.0,) * 50
         assert detect_signal(closes, 20, 2.5, 96, 8, 30) is None
 
     def test_flat_market_no_signal(self):
-        closes = [2000.0] * 200
+        closes = (2000.0,) * 200
         assert detect_signal(closes, 20, 2.5, 96, 8, 199) is None
 
     def test_long_on_breakout_above_upper(self):
@@ -52,7 +55,7 @@ class TestDetectSignal:
         assert signal != "LONG"
 
     def test_get_bb_levels(self):
-        closes = [2000 + math.sin(i * 0.5) * 50 for i in range(50)]
+        closes = _sine_series(50, 2000, 0, 50, 0.5)
         result = get_bb_levels(closes, 20, 2.0, 40)
         assert result is not None
         mid, upper, lower = result
@@ -0,0 +1,36 @@
+"""Tests for okx_bb.version — deploy-time commit info."""
+import subprocess
+import sys
+from unittest.mock import MagicMock, patch
+
+from okx_bb import version
+
+
+class TestCommitInfo:
+    def test_prefers_generated_version_file(self):
+        fake = MagicMock(COMMIT="abc123 msg (2026-01-01 08:00 SGT)")
+        with patch.dict(sys.modules, {"okx_bb._version": fake}), \
+             patch.object(version.subprocess, "run") as run:
+            assert version.commit_info() == "abc123 msg (2026-01-01 08:00 SGT)"
+        run.assert_not_called()
+
+    def test_falls_back_to_git(self):
+        out = MagicMock(stdout="abc123 fix thing|1767225600\n")
+        with patch.dict(sys.modules, {"okx_bb._version": None}), \
+             patch.object(version.subprocess, "run", return_value=out):
+            assert version.commit_info() == "abc123 fix thing (2026-01-01 08:00 SGT)"
+
+    def test_unknown_when_git_unavailable(self):
+        with patch.dict(sys.modules, {"okx_bb._version": None}), \
+             patch.object(version.subprocess, "run",
+                          side_effect=subprocess.TimeoutExpired("git", 5)):
+            assert version.commit_info() == "unknown"
+
+    def test_write_version_file(self, tmp_path):
+        target = tmp_path / "_version.py"
+        with patch.object(version, "VERSION_FILE", target), \
+             patch.object(version, "describe_head", return_value="abc (x)"):
+            version.write_version_file()
+        ns = {}
+        exec(target.read_text(), ns)
+        assert ns["COMMIT"] == "abc (x)"
@@ -1,13 +1,9 @@
 """Tests for WSMonitor — lifecycle scenarios, reconciliation, periodic checks."""
-import sys
-import asyncio
-from pathlib import Path
-from unittest.mock import MagicMock, AsyncMock, patch
+from unittest.mock import MagicMock, patch
 from datetime import datetime, timezone
 
 import pytest
-
-sys.path.insert(0, str(Path(__file__).parent.parent.parent))
+from websockets.protocol import State
 
 from okx_bb.config import OKXConfig, StrategyConfig, RiskConfig, FeeConfig
 
@@ -22,19 +18,18 @@ def make_config():
     )
 
 
-def _run(coro):
-    """Run async coroutine in a fresh event loop."""
-    loop = asyncio.new_event_loop()
-    try:
-        return loop.run_until_complete(coro)
-    finally:
-        loop.close()
+# Static REST responses for "nothing on the exchange" scenarios
+_EMPTY_RESPONSES = {"get_positions": [], "get_algo_orders": []}
+
 
+async def _empty_rest_stub(method, *a, **kw):
+    return _EMPTY_RESPONSES.get(method, [])
 
-def make_monitor():
+
+def make_monitor(loop, config=None):
     from okx_bb.ws_monitor import WSMonitor
-    m = WSMonitor(config=make_config())
-    m._loop = asyncio.new_event_loop()
+    m = WSMonitor(config=config or make_config())
+    m._loop = loop
     m.executor = MagicMock()
     return m
 
@@ -42,24 +37,21 @@ def make_monitor():
 class TestReconciliation:
     """Startup reconciliation scenarios."""
 
-    def test_no_position_clears_stale_pending(self):
+    def test_no_position_clears_stale_pending(self, loop):
         """No position + stale pending IDs → cleared."""
-        m = make_monitor()
+        m = make_monitor(loop)
         m._pending_long_algoId = "stale123"
 
         async def run():
-            m._rest_exchange = AsyncMock(side_effect=lambda method, *a, **kw: {
-                "get_positions": [],
-                "get_algo_orders": [],
-            }.get(method, []))
+            m._rest_exchange = _empty_rest_stub
             await m._reconcile_on_startup()
 
-        _run(run())
+        loop.run_until_complete(run())
         assert m._pending_long_algoId is None
 
-    def test_position_without_sl_resets_sltp(self):
+    def test_position_without_sl_resets_sltp(self, loop):
         """Position exists but no SL → re-set SL/TP."""
-        m = make_monitor()
+        m = make_monitor(loop)
 
         calls = {}
         async def mock_rest(method, *a, **kw):
@@ -78,7 +70,7 @@ class TestReconciliation:
             m._rest_exchange = mock_rest
             await m._reconcile_on_startup()
 
-        _run(run())
+        loop.run_until_complete(run())
         # SL should have been placed
         assert "place_stop_order" in calls
         # Position state saved
@@ -87,9 +79,9 @@ class TestReconciliation:
         assert saved["direction"] == "SHORT"  # pos=-2.54
         assert saved["sl_algo_id"] == "new_sl"
 
-    def test_position_with_sl_syncs_state(self):
+    def test_position_with_sl_syncs_state(self, loop):
         """Position + SL on exchange → reconstruct local state."""
-        m = make_monitor()
+        m = make_monitor(loop)
         m.executor.load_position.return_value = None  # No local state
 
         async def mock_rest(method, *a, **kw):
@@ -105,7 +97,7 @@ class TestReconciliation:
             m._rest_exchange = mock_rest
             await m._reconcile_on_startup()
 
-        _run(run())
+        loop.run_until_complete(run())
         m.executor.save_position.assert_called()
         saved = m.executor.save_position.call_args[0][0]
         assert saved["direction"] == "SHORT"
@@ -113,14 +105,57 @@ class TestReconciliation:
         assert saved["tp_order_id"] == "tp1"
 
 
+    def test_pending_validation_keeps_live_drops_expired(self, loop):
+        m = make_monitor(loop)
+        m._pending_long_algoId = "L_live"
+        m._pending_short_algoId = "S_gone"
+
+        async def mock_rest(method, *a, **kw):
+            if method == "get_algo_orders":
+                if a[1] == "trigger":
+                    return [{"algoId": "x"}, {"algoId": "L_live"}]
+                return [{"algoId": "sl"}]
+            return []
+
+        async def run():
+            m._rest_exchange = mock_rest
+            await m._reconcile_on_startup()
+
+        m.cfg.execution.mode = "intrabar_trigger"
+        loop.run_until_complete(run())
+        assert m._pending_long_algoId == "L_live"
+        assert m._pending_short_algoId is None
+
+    def test_skips_flat_and_empty_position_rows(self, loop):
+        """First non-zero row wins; '' / '0' rows are ignored."""
+        m = make_monitor(loop)
+
+        async def mock_rest(method, *a, **kw):
+            if method == "get_positions":
+                return [{"pos": ""}, {"pos": "0"}, {"pos": "1.5", "avgPx": "2000"}]
+            if method == "get_algo_orders":
+                return [{"algoId": "sl", "slTriggerPx": "1900"}]
+            return []
+
+        async def run():
+            m._rest_exchange = mock_rest
+            await m._reconcile_on_startup()
+
+        loop.run_until_complete(run())
+        saved = m.executor.save_position.call_args[0][0]
+        assert saved["direction"] == "LONG"
+        assert saved["size"] == "1.50"
+
+
 class TestPeriodicOrphan:
     """Periodic check orphan detection uses config values, not hardcoded."""
 
-    def test_orphan_with_sl_uses_config_pct(self):
+    def test_orphan_with_sl_uses_config_pct(self, loop):
         """Orphan reconstruction should use cfg.risk percentages, not magic numbers."""
-        m = make_monitor()
-        m.cfg.risk.stop_loss_pct = 0.05  # Non-default!
-        m.cfg.risk.take_profit_pct = 0.10  # Non-default!
+        cfg = make_config()
+        cfg.risk.stop_loss_pct = 0.05  # Non-default!
+        cfg.risk.take_profit_pct = 0.10  # Non-default!
+        m = make_monitor(loop, cfg)
         m.executor.load_position.return_value = None
         m._entry_in_progress = False
         m._triggered_direction = None
@@ -136,16 +171,12 @@ class TestPeriodicOrphan:
             result.exit_reason = None
             return None  # check_position returns None
 
-        call_count = [0]
+        responses = {
+            "get_positions": [{"pos": "1.00", "avgPx": "2000.0"}],
+            "get_algo_orders": [{"algoId": "sl_existing", "slTriggerPx": "1900"}],
+        }
         async def mock_rest_ex(method, *a, **kw):
-            if method == "get_positions":
-                call_count[0] += 1
-                if call_count[0] == 1:
-                    return [{"pos": "1.00", "avgPx": "2000.0"}]
-                return [{"pos": "1.00", "avgPx": "2000.0"}]
-            if method == "get_algo_orders":
-                return [{"algoId": "sl_existing", "slTriggerPx": "1900"}]
-            return []
+            return responses.get(method, [])
 
         async def run():
             m._rest = mock_rest_fn
@@ -167,17 +198,12 @@ class TestPeriodicOrphan:
             ap = float(pos_info["avgPx"])
 
             # Should use config values
-            if d == "LONG":
-                sl_p = ap * (1 - m.cfg.risk.stop_loss_pct)
-                tp_p = ap * (1 + m.cfg.risk.take_profit_pct)
-            else:
-                sl_p = ap * (1 + m.cfg.risk.stop_loss_pct)
-                tp_p = ap * (1 - m.cfg.risk.take_profit_pct)
+            sl_p, tp_p = m._sl_tp_prices(d, ap)
 
             assert sl_p == 2000.0 * (1 - 0.05)  # 1900, not 1960
             assert tp_p == 2000.0 * (1 + 0.10)  # 2200, not 2060
 
-        _run(run())
+        loop.run_until_complete(run())
 
 
 class TestSetLeverageNotInOpenPosition:
@@ -229,9 +255,9 @@ class TestExitReasonUnknownMapping:
 class TestTriggerTimeout:
     """Trigger fired but limit order didn't fill within timeout."""
 
-    def test_trigger_timeout_no_position_resets(self):
+    def test_trigger_timeout_no_position_resets(self, loop):
         """Trigger timeout + no position → cancel stale orders, reset, re-place."""
-        m = make_monitor()
+        m = make_monitor(loop)
         m._triggered_direction = "LONG"
         m._triggered_sz = "1.00"
         import time as _time
@@ -250,7 +276,10 @@ class TestTriggerTimeout:
                 return {"code": "0"}
             return []
 
-        m._atomic_cancel_and_place = AsyncMock()
+        place_calls = []
+        async def _place_stub():
+            place_calls.append(True)
+        m._atomic_cancel_and_place = _place_stub
 
         async def run():
             m._rest_exchange = mock_rest_ex
@@ -273,7 +302,885 @@ class TestTriggerTimeout:
 
             await m._atomic_cancel_and_place()
 
-        _run(run())
+        loop.run_until_complete(run())
         assert len(cancel_calls) == 1
         assert m._triggered_direction is None
-        m._atomic_cancel_and_place.assert_called_once()
+        assert len(place_calls) == 1
+
+
+class TestIncrementalTrend:
+    """_get_trend reads the EMA history cached once per closed candle."""
+
+    @staticmethod
+    def _windowed_trend(closes, period, lookback):
+        from core.indicators import ema
+        vals = ema(closes[-(period * 3 + 1):], period)
+        if vals[-1] > vals[-1 - lookback]:
+            return "up"
+        if vals[-1] < vals[-1 - lookback]:
+            return "down"
+        return None
+
+    def test_seed_matches_windowed_recompute(self, loop):
+        import math
+        m = make_monitor(loop)
+        s = m.cfg.strategy
+        m.accumulator.closes = [2000 + math.sin(i * 0.05) * 50 for i in range(300)]
+        m._seed_ema()
+        assert len(m._ema_history) == s.trend_lookback + 1
+        assert m._get_trend() == self._windowed_trend(
+            m.accumulator.closes, s.trend_ema_period, s.trend_lookback)
+
+    def test_stream_matches_windowed_recompute_every_bar(self, loop):
+        import math
+        from core.indicators import ema
+        m = make_monitor(loop)
+        s = m.cfg.strategy
+        period = s.trend_ema_period
+        m.accumulator.closes = [2000 + math.sin(i * 0.05) * 50 for i in range(300)]
+        m._seed_ema()
+        for i in range(period * 4):
+            close = 2000 + math.sin(i * 0.07) * 50 - i * 0.1
+            m.accumulator.on_candle_close(close)
+            m._seed_ema()
+            expected = ema(m.accumulator.closes[-(period * 3 + 1):], period)
+            assert m._ema_value == expected[-1]
+            assert list(m._ema_history) == expected[-(s.trend_lookback + 1):]
+            assert m._get_trend() == self._windowed_trend(
+                m.accumulator.closes, period, s.trend_lookback)
+
+    def test_trend_follows_stream(self, loop):
+        m = make_monitor(loop)
+        m.accumulator.closes = [2000.0] * 300
+        m._seed_ema()
+        assert m._get_trend() is None  # flat EMA → no trend
+        for i in range(m.cfg.strategy.trend_lookback + 1):
+            close = 1990.0 - i
+            m.accumulator.on_candle_close(close)
+            m._seed_ema()
+        assert m._get_trend() == "down"
+
+    def test_lazy_seed_when_not_initialized(self, loop):
+        m = make_monitor(loop)
+        m.accumulator.closes = [2000.0 + i for i in range(300)]
+        assert m._ema_value is None
+        assert m._get_trend() == "up"
+
+
+class TestIncrementalBB:
+    """_get_bb slides running sums instead of recomputing the window."""
+
+    @staticmethod
+    def _assert_bb_close(got, expected):
+        assert (got is None) == (expected is None)
+        if got is not None:
+            assert all(abs(a - b) < 1e-6 for a, b in zip(got, expected))
+
+    def test_stream_matches_get_bb_levels(self, loop):
+        import math
+        from okx_bb.strategy import get_bb_levels
+        m = make_monitor(loop)
+        s = m.cfg.strategy
+        m.accumulator.closes = [2000 + math.sin(i * 0.1) * 30 for i in range(300)]
+        m._seed_bb()
+        for i in range(200):
+            close = 2000 + math.sin((300 + i) * 0.1) * 30 + i * 0.5
+            m.accumulator.on_candle_close(close)
+            m._update_bb(close)
+            closes = m.accumulator.closes
+            self._assert_bb_close(
+                m._get_bb(),
+                get_bb_levels(closes, s.bb_period, s.bb_multiplier, len(closes) - 1))
+
+    def test_latest_close_not_in_window(self, loop):
+        """No look-ahead: a spike on the just-closed candle doesn't move the bands."""
+        m = make_monitor(loop)
+        m.accumulator.closes = [2000.0] * 300
+        m._seed_bb()
+        m.accumulator.on_candle_close(2500.0)
+        m._update_bb(2500.0)
+        assert m._get_bb() is None  # window still all 2000 → flat
+
+    def test_cold_start_falls_back_to_get_bb_levels(self, loop):
+        import math
+        from okx_bb.strategy import get_bb_levels
+        m = make_monitor(loop)
+        s = m.cfg.strategy
+        m.accumulator.closes = [2000 + math.sin(i * 0.1) * 30 for i in range(300)]
+        closes = m.accumulator.closes
+        assert m._get_bb() == get_bb_levels(closes, s.bb_period, s.bb_multiplier,
+                                            len(closes) - 1)
+
+
+class TestMessageDecode:
+    """WS frames decode via orjson when available, stdlib json otherwise."""
+
+    def test_malformed_frames_ignored(self, loop):
+        m = make_monitor(loop)
+        loop.run_until_complete(m._handle_business_message("not json"))
+        loop.run_until_complete(m._handle_private_message(b"{broken"))
+
+    def test_keepalive_frames_skip_parse(self, loop):
+        m = make_monitor(loop)
+        with patch("okx_bb.ws_monitor._json_loads") as loads:
+            for frame in ("pong", b"pong", ""):
+                loop.run_until_complete(m._handle_business_message(frame))
+                loop.run_until_complete(m._handle_private_message(frame))
+        loads.assert_not_called()
+
+    def test_private_frame_without_data_keeps_cache(self, loop):
+        m = make_monitor(loop)
+        m._rest_cache[("get_positions", ())] = (0.0, None)
+        loop.run_until_complete(m._handle_private_message('{"arg":{"channel":"orders"}}'))
+        assert m._rest_cache
+
+    def test_candle_close_from_bytes_frame(self, loop):
+        m = make_monitor(loop)
+        m.accumulator.closes = [2000.0] * 300
+        seen = []
+
+        async def _on_close():
+            seen.append(m.accumulator.closes[-1])
+        m._on_candle_close = _on_close
+
+        frame = (b'{"arg":{"channel":"candle30m","instId":"ETH-USDT-SWAP"},'
+                 b'"data":[["1700000000000","2000","2010","1990","2005.5","1","1","1","1"]]}')
+        loop.run_until_complete(m._handle_business_message(frame))
+        assert seen == [2005.5]
+
+
+class TestWSSign:
+    def test_login_signature_matches_fresh_hmac(self, loop):
+        import base64
+        import hashlib
+        import hmac
+        m = make_monitor(loop)
+        for _ in range(2):  # template must not be consumed by the first login
+            args = m._ws_sign()["args"][0]
+            prehash = args["timestamp"] + "GET" + "/users/self/verify"
+            expected = base64.b64encode(hmac.new(
+                m.cfg.secret_key.encode(), prehash.encode(), hashlib.sha256
+            ).digest()).decode()
+            assert args["sign"] == expected
+            assert args["apiKey"] == m.cfg.api_key
+
+
+class TestReconnectBackoff:
+    def test_first_delay_is_jittered(self):
+        from okx_bb.ws_monitor import _Backoff, BACKOFF_INITIAL
+        with patch("okx_bb.ws_monitor.random.random", return_value=0.5):
+            assert _Backoff().next_delay() == 0.5 * BACKOFF_INITIAL
+
+    def test_grows_from_floor_and_caps(self):
+        from okx_bb.ws_monitor import _Backoff, BACKOFF_MIN, BACKOFF_FACTOR, BACKOFF_MAX
+        b = _Backoff()
+        with patch("okx_bb.ws_monitor.random.random", return_value=0.0):
+            assert b.next_delay() == 0.0
+        assert b.next_delay() == BACKOFF_MIN
+        assert b.next_delay() == BACKOFF_MIN * BACKOFF_FACTOR
+        for _ in range(30):
+            b.next_delay()
+        assert b.delay == BACKOFF_MAX
+
+    def test_reset_restarts_with_jitter(self):
+        from okx_bb.ws_monitor import _Backoff, BACKOFF_INITIAL
+        b = _Backoff()
+        for _ in range(5):
+            b.next_delay()
+        b.reset()
+        assert b.next_delay() < BACKOFF_INITIAL
+
+    def test_sleep_applies_jitter(self, loop):
+        from okx_bb.ws_monitor import _Backoff, BACKOFF_JITTER
+        b = _Backoff()
+        b.delay = 10.0
+        slept = []
+
+        async def fake_sleep(d):
+            slept.append(d)
+
+        with patch("okx_bb.ws_monitor.asyncio.sleep", fake_sleep), \
+             patch("okx_bb.ws_monitor.random.uniform", return_value=BACKOFF_JITTER[1]) as uni:
+            loop.run_until_complete(b.sleep())
+        uni.assert_called_once_with(*BACKOFF_JITTER)
+        assert slept == [b.delay * BACKOFF_JITTER[1]]
+
+    def test_first_frame_resets_backoff(self, loop):
+        import asyncio
+        m = make_monitor(loop)
+        m._running = True
+        m._private_backoff.delay = 300.0
+
+        class _WS:
+            state = State.OPEN
+
+            async def recv(self, **kw):
+                return b"{}"
+
+        async def handler(msg):
+            m._running = False
+
+        m._private_ws = _WS()
+        m._handle_private_message = handler
+        loop.run_until_complete(asyncio.wait_for(m._private_loop(), 1))
+        assert m._private_backoff.delay is None
+
+
+class TestRestPool:
+    def test_rest_exchange_uses_shared_client_in_pool(self, loop):
+        import threading
+        m = make_monitor(loop)
+        seen = []
+
+        def _fake_get_positions(instId):
+            seen.append((instId, threading.current_thread().name))
+            return []
+        m.client.get_positions = _fake_get_positions
+
+        assert loop.run_until_complete(
+            m._rest_exchange("get_positions", "ETH-USDT-SWAP")) == []
+        assert seen[0][0] == "ETH-USDT-SWAP"
+        assert seen[0][1].startswith("okx-rest")
+        m._rest_pool.shutdown(wait=True)
+
+
+class TestRestCache:
+    """get_positions / get_algo_orders share one round trip within the TTL."""
+
+    @staticmethod
+    def _counting_monitor(loop):
+        m = make_monitor(loop)
+        calls = []
+
+        async def _call(method, *a, **kw):
+            calls.append((method, a))
+            return [{"n": len(calls)}]
+        m._call_exchange = _call
+        return m, calls
+
+    def test_concurrent_reads_coalesce(self, loop):
+        import asyncio
+        m, calls = self._counting_monitor(loop)
+
+        async def run():
+            return await asyncio.gather(
+                m._rest_exchange("get_positions", "ETH-USDT-SWAP"),
+                m._rest_exchange("get_positions", "ETH-USDT-SWAP"),
+                m._rest_exchange("get_algo_orders", "ETH-USDT-SWAP", "conditional"),
+            )
+
+        a, b, c = loop.run_until_complete(run())
+        assert a == b
+        assert [x[0] for x in calls] == ["get_positions", "get_algo_orders"]
+
+    def test_mutation_invalidates(self, loop):
+        m, calls = self._counting_monitor(loop)
+
+        async def run():
+            await m._rest_exchange("get_positions", "ETH-USDT-SWAP")
+            await m._rest_exchange("cancel_algo_order", "a1", "ETH-USDT-SWAP")
+            await m._rest_exchange("get_positions", "ETH-USDT-SWAP")
+
+        loop.run_until_complete(run())
+        assert [x[0] for x in calls].count("get_positions") == 2
+
+    def test_private_ws_update_invalidates(self, loop):
+        m, calls = self._counting_monitor(loop)
+        loop.run_until_complete(m._rest_exchange("get_positions", "ETH-USDT-SWAP"))
+        loop.run_until_complete(m._handle_private_message(
+            '{"arg":{"channel":"orders"},"data":[]}'))
+        loop.run_until_complete(m._rest_exchange("get_positions", "ETH-USDT-SWAP"))
+        assert len(calls) == 2
+
+    def test_ttl_expiry_refetches(self, loop):
+        m, calls = self._counting_monitor(loop)
+        loop.run_until_complete(m._rest_exchange("get_positions", "ETH-USDT-SWAP"))
+        # Age the entry past the TTL
+        key, (ts, task) = next(iter(m._rest_cache.items()))
+        m._rest_cache[key] = (ts - 1.0, task)
+        loop.run_until_complete(m._rest_exchange("get_positions", "ETH-USDT-SWAP"))
+        assert len(calls) == 2
+
+    def test_failure_not_cached(self, loop):
+        m = make_monitor(loop)
+        attempts = []
+
+        async def _flaky(method, *a, **kw):
+            attempts.append(method)
+            if len(attempts) == 1:
+                raise ConnectionError("boom")
+            return []
+        m._call_exchange = _flaky
+
+        with pytest.raises(ConnectionError):
+            loop.run_until_complete(m._rest_exchange("get_positions", "ETH-USDT-SWAP"))
+        assert loop.run_until_complete(m._rest_exchange("get_positions", "ETH-USDT-SWAP")) == []
+
+
+class TestParallelRest:
+    def test_cancel_both_triggers_concurrently(self, loop):
+        import asyncio
+        m = make_monitor(loop)
+        m._pending_long_algoId = "L1"
+        m._pending_short_algoId = "S1"
+        m.executor.load_position.return_value = {"direction": "LONG"}
+        in_flight, peak, cancelled = [0], [0], []
+
+        async def mock_rest(method, *a, **kw):
+            if method == "cancel_algo_order":
+                in_flight[0] += 1
+                peak[0] = max(peak[0], in_flight[0])
+                await asyncio.sleep(0)
+                in_flight[0] -= 1
+                cancelled.append(a[0])
+                if a[0] == "S1":
+                    raise RuntimeError("already gone")
+                return {"code": "0"}
+            return []
+        m._rest_exchange = mock_rest
+
+        loop.run_until_complete(m._atomic_cancel_and_place())
+        assert sorted(cancelled) == ["L1", "S1"]
+        assert peak[0] == 2
+        assert m._pending_long_algoId is None and m._pending_short_algoId is None
+
+    def test_position_check_waits_for_all_cancels(self, loop):
+        import asyncio
+        m = make_monitor(loop)
+        m._pending_long_algoId = "L1"
+        m._pending_short_algoId = "S1"
+        m.executor.load_position.return_value = {"direction": "LONG"}
+        events = []
+
+        async def mock_rest(method, *a, **kw):
+            if method == "cancel_algo_order":
+                events.append(f"cancel-start {a[0]}")
+                await asyncio.sleep(0)
+                await asyncio.sleep(0)
+                events.append(f"cancel-done {a[0]}")
+                return {"code": "0"}
+            if method == "get_positions":
+                events.append("get_positions")
+            return []
+        m._rest_exchange = mock_rest
+
+        loop.run_until_complete(m._atomic_cancel_and_place())
+        assert events[-1] == "get_positions"
+        assert events.count("get_positions") == 1
+        assert {"cancel-done L1", "cancel-done S1"} <= set(events[:-1])
+
+
+class TestSubscribeFrames:
+    def test_connect_sends_prebuilt_frames(self, loop):
+        import json
+        m = make_monitor(loop)
+        sent = []
+
+        class _FakeWS:
+            async def send(self, frame):
+                sent.append(frame)
+
+            async def recv(self):
+                return '{"event":"login","code":"0"}'
+
+        connect_kw = []
+
+        async def _connect(*a, **kw):
+            connect_kw.append(kw)
+            return _FakeWS()
+
+        with patch("okx_bb.ws_monitor.websockets.connect", _connect):
+            assert loop.run_until_complete(m._connect_business())
+            assert loop.run_until_complete(m._connect_private())
+
+        frames = [json.loads(f) for f in sent]
+        assert frames[0]["args"] == [{"channel": "candle30m", "instId": "ETH-USDT-SWAP"}]
+        assert frames[1]["op"] == "login"
+        assert [f["args"][0]["channel"] for f in frames[2:]] == ["orders", "orders-algo"]
+        assert all(kw["compression"] is None for kw in connect_kw)
+
+
+class TestPendingDebounce:
+    def test_burst_of_clears_coalesces_into_one_write(self, loop):
+        import asyncio
+        m = make_monitor(loop)
+        m._pending_saved = ("L1", "S1")
+        with patch("okx_bb.ws_monitor.PENDING_SAVE_DEBOUNCE", 0.01), \
+             patch("okx_bb.ws_monitor.save_state") as save:
+            async def run():
+                m._pending_long_algoId = None
+                m._save_pending()
+                m._pending_short_algoId = None
+                m._save_pending()
+                assert save.call_count == 0
+                await asyncio.sleep(0.05)
+
+            loop.run_until_complete(run())
+        save.assert_called_once()
+        assert save.call_args[0][1] == {"long_algoId": None, "short_algoId": None}
+
+    def test_new_algo_id_writes_immediately(self, loop):
+        m = make_monitor(loop)
+        with patch("okx_bb.ws_monitor.save_state") as save:
+            async def run():
+                m._pending_long_algoId = "L1"
+                m._save_pending()
+                assert save.call_count == 1
+                m._pending_long_algoId = "L2"  # replaced, still new
+                m._save_pending()
+                assert save.call_count == 2
+                assert m._pending_flush_handle is None
+
+            loop.run_until_complete(run())
+        assert save.call_args[0][1]["long_algoId"] == "L2"
+
+    def test_shutdown_flushes_synchronously(self, loop):
+        m = make_monitor(loop)
+        with patch("okx_bb.ws_monitor.save_state") as save:
+            async def run():
+                m._pending_short_algoId = "S1"
+                m._save_pending()
+                m._shutdown()
+
+            loop.run_until_complete(run())
+        save.assert_called_once()
+        assert m._pending_flush_handle is None
+
+    def test_no_running_loop_writes_immediately(self, loop):
+        m = make_monitor(loop)
+        with patch("okx_bb.ws_monitor.save_state") as save:
+            m._save_pending()
+        save.assert_called_once()
+
+
+class TestCandleAccumulator:
+    def test_ring_buffer_keeps_last_max_bars(self):
+        from okx_bb.ws_monitor import CandleAccumulator
+        acc = CandleAccumulator(MagicMock(), "ETH-USDT-SWAP", max_bars=5)
+        for i in range(8):
+            acc.on_candle_close(float(i))
+        assert list(acc.closes) == [3.0, 4.0, 5.0, 6.0, 7.0]
+        assert acc.closes_snapshot(2) == [6.0, 7.0]
+        assert acc.closes_snapshot() == [3.0, 4.0, 5.0, 6.0, 7.0]
+
+    def test_initialize_replaces_history(self, loop):
+        from okx_bb.ws_monitor import CandleAccumulator
+        client = MagicMock()
+        client.get_candles.return_value = [{"c": float(i)} for i in range(300)]
+        acc = CandleAccumulator(client, "ETH-USDT-SWAP")
+        acc.on_candle_close(9999.0)
+        assert loop.run_until_complete(acc.initialize(loop))
+        assert len(acc.closes) == 300 and acc.closes[-1] == 299.0
+        assert acc.ready
+
+
+class TestEntryFillCancelOverlap:
+    def test_sl_placed_without_waiting_for_opposite_cancel(self, loop):
+        import asyncio
+        m = make_monitor(loop)
+        m._pending_short_algoId = "S1"
+        order = []
+        release = asyncio.Event()
+
+        async def mock_rest(method, *a, **kw):
+            if method == "cancel_algo_order":
+                order.append("cancel-start")
+                await release.wait()
+                order.append("cancel-done")
+                return {"code": "0"}
+            if method == "place_stop_order":
+                order.append("sl")
+                release.set()
+                return {"code": "0", "data": [{"algoId": "sl1"}]}
+            if method == "get_algo_orders":
+                return [{"algoId": "sl1"}]
+            if method == "place_limit_order":
+                return {"code": "0", "data": [{"ordId": "tp1"}]}
+            if method == "get_positions":
+                return [{"pos": "1", "avgPx": "2000"}]
+            return []
+        m._rest_exchange = mock_rest
+        m._call_exchange = mock_rest
+
+        real_sleep = asyncio.sleep
+        with patch("okx_bb.ws_monitor.asyncio.sleep", new=lambda *_: real_sleep(0)):
+            loop.run_until_complete(m._on_entry_filled_inner("LONG", 2000.0, "1.00"))
+        assert order.index("sl") < order.index("cancel-done")
+        assert m._pending_short_algoId is None
+        assert m.executor.save_position.call_args[0][0]["sl_algo_id"] == "sl1"
+
+
+class TestMainLoopSelection:
+    def test_falls_back_to_asyncio_run_without_uvloop(self):
+        import sys
+        from okx_bb import ws_monitor
+        with patch.dict(sys.modules, {"uvloop": None}), \
+             patch.object(ws_monitor, "WSMonitor") as mon, \
+             patch.object(ws_monitor.asyncio, "run") as run:
+            ws_monitor.main()
+        run.assert_called_once_with(mon.return_value.run.return_value)
+
+    def test_uses_uvloop_when_installed(self):
+        import sys
+        from okx_bb import ws_monitor
+        fake_uvloop = MagicMock()
+        with patch.dict(sys.modules, {"uvloop": fake_uvloop}), \
+             patch.object(ws_monitor, "WSMonitor") as mon, \
+             patch.object(ws_monitor.asyncio, "run") as run:
+            ws_monitor.main()
+        fake_uvloop.run.assert_called_once_with(mon.return_value.run.return_value)
+        run.assert_not_called()
+
+    def test_falls_back_to_asyncio_run_on_uvloop_without_run(self):
+        import sys
+        import types
+        from okx_bb import ws_monitor
+        old_uvloop = types.ModuleType("uvloop")  # < 0.18: no uvloop.run
+        with patch.dict(sys.modules, {"uvloop": old_uvloop}), \
+             patch.object(ws_monitor, "WSMonitor") as mon, \
+             patch.object(ws_monitor.asyncio, "run") as run:
+            ws_monitor.main()
+        run.assert_called_once_with(mon.return_value.run.return_value)
+
+
+class TestWaitAlgoLive:
+    """SL verification polls until live instead of one fixed 1s check."""
+
+    @staticmethod
+    def _monitor(loop, responses):
+        m = make_monitor(loop)
+        polls = []
+
+        async def _call(method, *a, **kw):
+            polls.append(method)
+            return responses[min(len(polls), len(responses)) - 1]
+        m._call_exchange = _call
+        return m, polls
+
+    def test_returns_as_soon_as_live(self, loop):
+        m, polls = self._monitor(loop, [[], [{"algoId": "sl1"}]])
+        with patch("okx_bb.ws_monitor.SL_VERIFY_POLL", 0):
+            assert loop.run_until_complete(m._wait_algo_live("sl1"))
+        assert len(polls) == 2
+
+    def test_times_out_when_never_live(self, loop):
+        m, polls = self._monitor(loop, [[{"algoId": "other"}]])
+        with patch("okx_bb.ws_monitor.SL_VERIFY_POLL", 0), \
+             patch("okx_bb.ws_monitor.SL_VERIFY_TIMEOUT", 0.01):
+            assert not loop.run_until_complete(m._wait_algo_live("sl1"))
+        assert len(polls) >= 1
+
+
+class TestWaitPosition:
+    """Fill/close checks poll positions instead of a fixed 2s sleep."""
+
+    def test_returns_once_position_opens(self, loop):
+        m, polls = TestWaitAlgoLive._monitor(loop, [[], [{"pos": "0.5", "avgPx": "2000"}]])
+        with patch("okx_bb.ws_monitor.SL_VERIFY_POLL", 0):
+            pos_info, pv = loop.run_until_complete(m._wait_position(want_open=True))
+        assert (pos_info["avgPx"], pv, len(polls)) == ("2000", 0.5, 2)
+
+    def test_returns_once_flat(self, loop):
+        m, polls = TestWaitAlgoLive._monitor(loop, [[{"pos": "1"}], None, []])
+        with patch("okx_bb.ws_monitor.SL_VERIFY_POLL", 0):
+            assert loop.run_until_complete(m._wait_position(want_open=False)) == (None, 0.0)
+        assert len(polls) == 3  # None (API error) is not "flat"
+
+    def test_times_out_with_last_seen_state(self, loop):
+        m, polls = TestWaitAlgoLive._monitor(loop, [[{"pos": "1"}]])
+        with patch("okx_bb.ws_monitor.SL_VERIFY_POLL", 0), \
+             patch("okx_bb.ws_monitor.SL_VERIFY_TIMEOUT", 0.01):
+            pos_info, pv = loop.run_until_complete(m._wait_position(want_open=False))
+        assert pos_info is not None and pv == 1.0
+
+    def test_check_position_closed_skips_wait_without_local_position(self, loop):
+        m, polls = TestWaitAlgoLive._monitor(loop, [[{"pos": "1"}]])
+        m.executor.load_position.return_value = None
+        m.executor.check_position.return_value = None
+        loop.run_until_complete(m._check_position_closed())
+        assert polls == []
+        m.executor.check_position.assert_called_once()
+
+
+class TestPeriodicInterval:
+    def test_idle_uses_long_interval(self, loop):
+        from okx_bb.ws_monitor import PERIODIC_CHECK_IDLE
+        m = make_monitor(loop)
+        m.executor.load_position.return_value = None
+        assert m._periodic_interval() == PERIODIC_CHECK_IDLE
+
+    def test_position_or_pending_uses_short_interval(self, loop):
+        from okx_bb.ws_monitor import PERIODIC_CHECK_ACTIVE
+        m = make_monitor(loop)
+        m.executor.load_position.return_value = {"direction": "LONG"}
+        assert m._periodic_interval() == PERIODIC_CHECK_ACTIVE
+
+        m.executor.load_position.return_value = None
+        m._pending_short_algoId = "S1"
+        assert m._periodic_interval() == PERIODIC_CHECK_ACTIVE
+
+    def test_idle_interval_not_longer_than_orphan_sweep(self):
+        from okx_bb.ws_monitor import PERIODIC_CHECK_IDLE
+        assert PERIODIC_CHECK_IDLE <= 300
+
+    def test_sleep_shortens_when_state_turns_active(self, loop):
+        from okx_bb import ws_monitor
+        m = make_monitor(loop)
+        m.executor.load_position.return_value = None
+        clock = [0.0]
+        slept = []
+
+        async def fake_sleep(secs):
+            slept.append(secs)
+            clock[0] += secs
+            if clock[0] >= 30:  # a trigger gets placed mid-sleep
+                m._pending_long_algoId = "L1"
+
+        with patch.object(ws_monitor.time, "monotonic", lambda: clock[0]), \
+             patch.object(ws_monitor.asyncio, "sleep", fake_sleep), \
+             patch.object(ws_monitor, "PERIODIC_CHECK_IDLE", 300), \
+             patch.object(ws_monitor, "PERIODIC_CHECK_ACTIVE", 120), \
+             patch.object(ws_monitor, "PERIODIC_CHECK_POLL", 15):
+            loop.run_until_complete(m._periodic_sleep())
+        assert clock[0] == 120
+        assert max(slept) <= 15
+
+
+class TestRecvFrame:
+    def test_returns_frame(self, loop):
+        from okx_bb.ws_monitor import _recv_frame
+
+        class _WS:
+            async def recv(self):
+                return "frame"
+
+        with patch("okx_bb.ws_monitor._RECV_RAW", False):
+            assert loop.run_until_complete(_recv_frame(_WS())) == "frame"
+
+    def test_requests_raw_bytes_on_modern_websockets(self, loop):
+        from okx_bb.ws_monitor import _recv_frame
+        seen = {}
+
+        class _WS:
+            async def recv(self, **kw):
+                seen.update(kw)
+                return b"{}"
+
+        with patch("okx_bb.ws_monitor._RECV_RAW", True):
+            loop.run_until_complete(_recv_frame(_WS()))
+        assert seen == {"decode": False}
+
+    def test_quiet_feed_raises_asyncio_timeout(self, loop):
+        import asyncio
+        from okx_bb.ws_monitor import _recv_frame
+
+        class _WS:
+            async def recv(self, **kw):
+                await asyncio.sleep(10)
+
+        with pytest.raises(asyncio.TimeoutError):
+            loop.run_until_complete(_recv_frame(_WS(), timeout=0.01))
+
+
+class TestOpenPosition:
+    def test_returns_first_nonzero_row_and_size(self):
+        from okx_bb.ws_monitor import _open_position
+        rows = [{"pos": "0"}, {"pos": "", "avgPx": "1"}, {"pos": "-0.3", "avgPx": "2000"}]
+        pos_info, pv = _open_position(rows)
+        assert pos_info is rows[2]
+        assert pv == -0.3
+
+    def test_flat_or_missing(self):
+        from okx_bb.ws_monitor import _open_position
+        assert _open_position([{"pos": "0"}]) == (None, 0.0)
+        assert _open_position([]) == (None, 0.0)
+        assert _open_position(None) == (None, 0.0)
+
+
+class TestShutdownCancelsIdleLoops:
+    class _QuietWS:
+        state = State.OPEN
+
+        def __init__(self):
+            self.closed = False
+
+        async def recv(self, **kw):
+            import asyncio
+            await asyncio.sleep(3600)
+
+        async def close(self):
+            self.closed = True
+
+    def test_parked_recv_exits_promptly(self, loop):
+        import asyncio
+        m = make_monitor(loop)
+        m._private_ws = self._QuietWS()
+        m._running = True
+
+        async def run():
+            task = loop.create_task(m._private_loop())
+            await asyncio.sleep(0.01)
+            m._shutdown()
+            await asyncio.wait_for(task, 1)
+            return task
+
+        task = loop.run_until_complete(run())
+        assert not task.cancelled()
+        assert not m._idle_tasks
+
+    def test_handler_in_flight_is_not_cancelled(self, loop):
+        import asyncio
+        m = make_monitor(loop)
+        m._running = True
+        finished = []
+
+        class _OneFrameWS(self._QuietWS):
+            async def recv(self, **kw):
+                return b"{}"
+
+        async def slow_handler(msg):
+            m._shutdown()  # signal lands while an order is being placed
+            await asyncio.sleep(0.01)
+            finished.append(msg)
+
+        m._private_ws = _OneFrameWS()
+        m._handle_private_message = slow_handler
+        loop.run_until_complete(asyncio.wait_for(m._private_loop(), 1))
+        assert finished == [b"{}"]
+
+
+class TestWSIsOpen:
+    def test_only_open_state_counts(self, loop):
+        from types import SimpleNamespace
+        m = make_monitor(loop)
+        assert m._ws_is_open(SimpleNamespace(state=State.OPEN))
+        assert not m._ws_is_open(SimpleNamespace(state=State.CLOSING))
+        assert not m._ws_is_open(SimpleNamespace())
+        assert not m._ws_is_open(None)
+
+
+class TestDiscordQueue:
+    def test_burst_is_sent_as_one_batch_off_loop(self, loop):
+        import threading
+        m = make_monitor(loop)
+        sent = []
+
+        def fake_send(text, mention=False):
+            sent.append((text, mention, threading.current_thread().name))
+            return True
+
+        async def run():
+            task = loop.create_task(m._discord_flusher())
+            m._notify("a")
+            m._notify("b", mention=True)
+            await m._drain_discord(task)
+
+        with patch("okx_bb.ws_monitor.DISCORD_FLUSH_INTERVAL", 0.01), \
+             patch("okx_bb.ws_monitor.send_discord", fake_send):
+            loop.run_until_complete(run())
+        from okx_bb.ws_monitor import DISCORD_BATCH_SEP
+        assert len(sent) == 1
+        assert sent[0][0] == f"a{DISCORD_BATCH_SEP}b"
+        assert sent[0][1] is True
+        assert sent[0][2].startswith("okx-rest")
+
+    def test_drain_sends_messages_queued_before_shutdown(self, loop):
+        m = make_monitor(loop)
+        sent = []
+
+        async def run():
+            task = loop.create_task(m._discord_flusher())
+            m._notify("stop")
+            await m._drain_discord(task)
+            return task
+
+        with patch("okx_bb.ws_monitor.DISCORD_FLUSH_INTERVAL", 0.01), \
+             patch("okx_bb.ws_monitor.send_discord",
+                   lambda text, mention=False: sent.append(text)):
+            task = loop.run_until_complete(run())
+        assert sent == ["stop"]
+        assert task.done()
+
+    def test_full_queue_drops_instead_of_blocking(self, loop):
+        import asyncio
+        m = make_monitor(loop)
+        m._discord_q = asyncio.Queue(maxsize=1)
+        m._notify("kept")
+        m._notify("dropped")
+        assert m._discord_q.qsize() == 1
+
+
+class TestSlAlgo:
+    def test_picks_the_algo_with_sl_trigger(self):
+        from okx_bb.ws_monitor import _sl_algo
+        algos = [{"algoId": "tp1", "tpTriggerPx": "2200"},
+                 {"algoId": "sl1", "slTriggerPx": "1900"}]
+        assert _sl_algo(algos)["algoId"] == "sl1"
+
+    def test_none_without_sl(self):
+        from okx_bb.ws_monitor import _sl_algo
+        assert _sl_algo([{"algoId": "tp1", "tpTriggerPx": "2200"}]) is None
+        assert _sl_algo([]) is None
+        assert _sl_algo(None) is None
+
+
+class TestPeriodicConcurrentFetch:
+    def test_trigger_timeout_fetches_and_cancels_concurrently(self, loop):
+        import asyncio
+        import time as _time
+        m = make_monitor(loop)
+        m._running = True
+        m._triggered_direction = "LONG"
+        m._triggered_at = _time.time() - m.TRIGGER_FILL_TIMEOUT - 1
+        m._periodic_interval = lambda: 0
+        in_flight = []
+        overlapped = []
+        cancelled = []
+
+        async def rest(method, *a, **kw):
+            in_flight.append(method)
+            await asyncio.sleep(0)
+            if len(in_flight) > 1:
+                overlapped.append(sorted(in_flight))
+            in_flight.remove(method)
+            if method == "get_positions":
+                return []
+            if method == "get_open_orders":
+                return [{"ordId": "o1"}, {"ordId": "o2"}]
+            if method == "cancel_order":
+                cancelled.append(a[1])
+            return {}
+
+        async def place():
+            m._running = False
+
+        m._rest_exchange = rest
+        m._atomic_cancel_and_place = place
+        loop.run_until_complete(asyncio.wait_for(m._periodic_check(), 1))
+        assert ["get_open_orders", "get_positions"] in overlapped
+        assert ["cancel_order", "cancel_order"] in overlapped
+        assert sorted(cancelled) == ["o1", "o2"]
+        assert m._triggered_direction is None
+
+
+class TestUtcNowIso:
+    def test_round_trips_through_fromisoformat(self):
+        from okx_bb.ws_monitor import _utc_now_iso
+        ts = datetime.fromisoformat(_utc_now_iso())
+        assert ts.tzinfo is not None
+        assert ts.microsecond == 0
+        assert abs((datetime.now(timezone.utc) - ts).total_seconds()) < 5
+
+
+class TestMarketClose:
+    def test_reduce_only_market_order_on_instrument(self, loop):
+        m = make_monitor(loop)
+        calls = []
+
+        async def rest(method, *a, **kw):
+            calls.append((method, a, kw))
+            return {"code": "0"}
+
+        m._rest_exchange = rest
+        loop.run_until_complete(m._market_close("sell", "1.50"))
+        assert calls == [("place_market_order", (m.cfg.instId, "sell", "1.50", True), {})]
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Deployed commit info for the startup Discord message.
+
+Resolved once at deploy/start time (systemd ExecStartPre runs this module,
+which writes okx_bb/_version.py) so the monitor itself never forks git.
+Falls back to asking git directly when _version.py hasn't been generated.
+"""
+import subprocess
+import sys
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+_PKG_DIR = Path(__file__).parent
+VERSION_FILE = _PKG_DIR / "_version.py"
+SGT = timezone(timedelta(hours=8))
+
+
+def describe_head() -> str:
+    """'<sha> <subject> (<commit time> SGT)' for HEAD, or 'unknown'."""
+    try:
+        raw = subprocess.run(
+            ["git", "log", "--format=%h %s|%ct", "-1"],
+            capture_output=True, text=True, timeout=5,
+            cwd=str(_PKG_DIR.parent),
+        ).stdout.strip()
+        head, ts = raw.rsplit("|", 1)
+        sgt = datetime.fromtimestamp(int(ts), tz=SGT)
+        return f"{head} ({sgt:%Y-%m-%d %H:%M} SGT)"
+    except Exception:
+        return "unknown"
+
+
+def commit_info() -> str:
+    """Commit recorded by write_version_file(), else a live git lookup."""
+    try:
+        from okx_bb._version import COMMIT
+        return COMMIT
+    except ImportError:
+        return describe_head()
+
+
+def write_version_file() -> str:
+    commit = describe_head()
+    VERSION_FILE.write_text(f"COMMIT = {commit!r}\n")
+    return commit
+
+
+if __name__ == "__main__":
+    sys.path.insert(0, str(_PKG_DIR.parent))
+    print(write_version_file())
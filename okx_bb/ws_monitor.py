@@ -10,7 +10,7 @@ Post-review v2 hardened. Safety guarantees:
 3. _triggered_direction is NEVER cleared by cancel — only by fill handler.
 4. Startup reconciliation before any orders.
 5. Periodic orphan detection with entry-in-progress guard.
-6. Dedicated requests.Session per thread via threading.local.
+6. REST calls run on a bounded thread pool sharing one pooled Session.
 """
 
 import asyncio
@@ -19,16 +19,20 @@ import hmac
 import base64
 import json
 import logging
+import random
 import signal as sig
 import sys
 import time
-import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import deque
+from itertools import chain, islice
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import Optional, List
+from typing import Optional, List, Tuple
 
 import websockets
 from websockets.exceptions import ConnectionClosedError, WebSocketException
+from websockets.protocol import State
 
 _parent = str(Path(__file__).parent.parent)
 if _parent not in sys.path:
@@ -38,10 +42,33 @@ from okx_bb.config import load_config, OKXConfig
 from okx_bb.exchange import OKXClient
 from okx_bb.executor import BBExecutor, STATE_DIR
 from okx_bb.strategy import get_bb_levels
-from core.indicators import ema
+from okx_bb.version import commit_info
+from core.indicators import ema, bollinger_from_sums
 from core.state import load_state, save_state
 from core.notify import send_discord
 
+# orjson is optional: faster decode of every WS frame; stdlib json otherwise.
+# Both decoders raise ValueError subclasses on malformed input.
+try:
+    import orjson
+
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj) -> str:
+        return orjson.dumps(obj).decode()  # OKX expects text frames
+except ImportError:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
+# websockets >= 14 can hand text frames over as raw bytes, skipping the UTF-8
+# decode into str; orjson and stdlib json both parse bytes directly. On 13.x
+# top-level websockets.connect is still the legacy client, whose recv() has
+# no decode argument.
+_RECV_RAW = int(websockets.__version__.split(".")[0]) >= 14
+
+# Every payload frame is a JSON object; anything else skips the parse
+_JSON_OBJECT_START = ("{", b"{")
+
 logging.basicConfig(
     level=logging.INFO,
     format='%(asctime)s %(name)s %(levelname)s %(message)s',
@@ -51,22 +78,129 @@ logger = logging.getLogger(__name__)
 
 WS_BUSINESS_URL = "wss://ws.okx.com:8443/ws/v5/business"
 WS_PRIVATE_URL = "wss://ws.okx.com:8443/ws/v5/private"
+WS_VERIFY_PATH = b"GET/users/self/verify"  # method + path of the WS login prehash
 
 PING_INTERVAL = 25
-MAX_RECONNECT_DELAY = 120
+
+# Shared websockets.connect() options. OKX frames are small uncompressed JSON:
+# skip permessage-deflate negotiation/inflate on every frame.
+WS_CONNECT_OPTS = dict(
+    ping_interval=PING_INTERVAL, ping_timeout=10, close_timeout=5,
+    compression=None, max_size=2 ** 20,
+)
+MAX_RECONNECT_DELAY = 600  # 10 min ceiling — long OKX maintenance windows
+REST_POOL_WORKERS = 8
+WS_RECV_TIMEOUT = 60  # seconds without a frame before re-checking the socket
+
+# Read-only endpoints whose results are shared by back-to-back callers
+CACHED_REST_METHODS = frozenset({"get_positions", "get_algo_orders"})
+REST_CACHE_TTL = 0.5  # seconds
+
+# Reconnect backoff (websockets-style): jittered first retry, then x1.618
+BACKOFF_INITIAL = 5
+BACKOFF_MIN = 1.92
+BACKOFF_FACTOR = 1.618
+BACKOFF_MAX = MAX_RECONNECT_DELAY
+BACKOFF_JITTER = (0.5, 1.5)  # every sleep is scaled by uniform(*BACKOFF_JITTER)
+
+# Discord: messages are queued and sent off-loop by one flusher task
+# (send_discord shells out to the openclaw CLI, up to 30s per call)
+DISCORD_QUEUE_MAX = 1000
+DISCORD_FLUSH_INTERVAL = 0.5  # seconds to let a burst accumulate
+DISCORD_BATCH_MAX = 10
+DISCORD_BATCH_SEP = "\n---\n"
+# Shutdown wait for the last batch. Must stay below TimeoutStopSec=10 in
+# okx-bb-monitor.service, or systemd SIGKILLs us mid-drain; a send slower
+# than this (send_discord allows 30s) is logged as incomplete instead.
+DISCORD_DRAIN_TIMEOUT = 8
 
 PENDING_STATE_FILE = STATE_DIR / "pending_orders.json"
+PENDING_SAVE_DEBOUNCE = 0.5  # seconds; coalesces bursts of clears (new IDs write at once)
+
+# Periodic reconciliation interval (seconds): idle = no position/trigger.
+# Idle must stay <= 300: the idle pass is what finds an exchange position
+# with no SL that local state doesn't know about.
+PERIODIC_CHECK_IDLE = 300
+PERIODIC_CHECK_ACTIVE = 120
+# How often a pending periodic sleep re-reads the interval, so a trigger or
+# position appearing mid-sleep shortens the wait
+PERIODIC_CHECK_POLL = 15
+
+# SL liveness after entry, position open/flat after a fill: poll until the
+# exchange shows it instead of a fixed 1-2s wait
+SL_VERIFY_POLL = 0.25
+SL_VERIFY_TIMEOUT = 3.0
 
 # Prefix for all Discord messages (remove when system proven stable)
 MSG_PREFIX = ""
 
 
+async def _recv_frame(ws, timeout: float = WS_RECV_TIMEOUT):
+    """ws.recv() with a deadline; raises TimeoutError when the feed goes quiet.
+
+    asyncio.timeout() arms a single timer handle, whereas wait_for() wraps
+    every recv() in a new Task — this runs once per WS frame.
+    """
+    async with asyncio.timeout(timeout):
+        if _RECV_RAW:
+            return await ws.recv(decode=False)
+        return await ws.recv()
+
+
+def _utc_now_iso() -> str:
+    """Timestamp for saved position state (whole seconds are plenty)."""
+    return datetime.now(timezone.utc).isoformat(timespec="seconds")
+
+
+def _sl_algo(algos) -> Optional[dict]:
+    """First conditional algo carrying an SL trigger, or None."""
+    return next((a for a in algos or () if a.get("slTriggerPx")), None)
+
+
+def _open_position(positions) -> Tuple[Optional[dict], float]:
+    """First row with a non-zero ``pos`` and that size, parsed once.
+
+    Returns (None, 0.0) when flat (or when positions is None/empty).
+    """
+    for p in positions or ():
+        pv = float(p.get("pos", 0) or 0)
+        if pv != 0:
+            return p, pv
+    return None, 0.0
+
+
+class _Backoff:
+    """Truncated exponential reconnect backoff with jitter.
+
+    Jitter spreads reconnects after an OKX-side outage instead of every
+    client hammering the endpoint at the same instant. Callers reset() on
+    the first frame received, not on connect, so a socket that opens and
+    immediately drops keeps backing off.
+    """
+
+    def __init__(self):
+        self.delay: Optional[float] = None  # None → next failure is the first
+
+    def next_delay(self) -> float:
+        if self.delay is None:
+            self.delay = random.random() * BACKOFF_INITIAL
+        else:
+            self.delay = min(BACKOFF_MAX, max(BACKOFF_MIN, self.delay * BACKOFF_FACTOR))
+        return self.delay
+
+    async def sleep(self):
+        await asyncio.sleep(self.next_delay() * random.uniform(*BACKOFF_JITTER))
+
+    def reset(self):
+        self.delay = None
+
+
 class CandleAccumulator:
     def __init__(self, client: OKXClient, instId: str, max_bars: int = 500):
         self.client = client
         self.instId = instId
         self.max_bars = max_bars
-        self.closes: List[float] = []
+        self.closes: deque = deque(maxlen=max_bars)  # ring buffer, O(1) append
         self._initialized = False
 
     async def initialize(self, loop):
@@ -76,15 +210,20 @@ class CandleAccumulator:
         if not candles:
             logger.error("Failed to load historical candles!")
             return False
-        self.closes = [c["c"] for c in candles]
+        self.closes.clear()
+        self.closes.extend(c["c"] for c in candles)
         self._initialized = True
         logger.info(f"Loaded {len(self.closes)} candles, latest={self.closes[-1]:.2f}")
         return True
 
     def on_candle_close(self, close_price: float):
         self.closes.append(close_price)
-        if len(self.closes) > self.max_bars:
-            self.closes = self.closes[-self.max_bars:]
+
+    def closes_snapshot(self, n: Optional[int] = None) -> List[float]:
+        """Stable list copy of the last `n` closes (all if None) for slicing."""
+        if n is None or n >= len(self.closes):
+            return list(self.closes)
+        return list(islice(self.closes, len(self.closes) - n, None))
 
     @property
     def ready(self):
@@ -101,13 +240,20 @@ class WSMonitor:
         self._running = False
         self._business_ws = None
         self._private_ws = None
-        self._business_reconnect_delay = 1
-        self._private_reconnect_delay = 1
+        self._business_backoff = _Backoff()
+        self._private_backoff = _Backoff()
         self._loop: Optional[asyncio.AbstractEventLoop] = None
+        # Loop tasks currently parked in a recv/sleep — safe for _shutdown
+        # to cancel. A task mid-handler (e.g. placing an SL) is left to finish
+        # and exits at its next `while self._running` check.
+        self._idle_tasks: set = set()
 
         # Pending entry trigger IDs
         self._pending_long_algoId: Optional[str] = None
         self._pending_short_algoId: Optional[str] = None
+        self._pending_dirty = False
+        self._pending_saved: Tuple[Optional[str], Optional[str]] = (None, None)
+        self._pending_flush_handle: Optional[asyncio.TimerHandle] = None
 
         # Triggered-but-not-filled state
         # IMPORTANT: Only cleared by _on_entry_filled, NEVER by cancel
@@ -122,47 +268,168 @@ class WSMonitor:
         # Mutex: covers cancel → check → place atomically
         self._order_lock = asyncio.Lock()
 
-        # Thread-safe REST: each executor thread gets its own Session
-        self._thread_local = threading.local()
+        # REST calls: bounded pool, all threads share self.client's Session
+        self._rest_pool = ThreadPoolExecutor(max_workers=REST_POOL_WORKERS,
+                                             thread_name_prefix="okx-rest")
+        # (method, args) → (started_at, task); see _cached_rest_exchange
+        self._rest_cache: dict = {}
 
-    # === Thread-safe REST ===
+        # Discord: (message, mention) queued here, sent by _discord_flusher
+        self._discord_q: asyncio.Queue = asyncio.Queue(maxsize=DISCORD_QUEUE_MAX)
 
-    def _get_thread_client(self) -> OKXClient:
-        """Get a per-thread OKXClient with its own requests.Session."""
-        if not hasattr(self._thread_local, 'client'):
-            self._thread_local.client = OKXClient(
-                self.cfg.api_key, self.cfg.secret_key, self.cfg.passphrase
-            )
-        return self._thread_local.client
+        # SL/TP price multipliers per direction, computed once from config
+        sl_pct, tp_pct = self.cfg.risk.stop_loss_pct, self.cfg.risk.take_profit_pct
+        self._sl_tp_mult = {"LONG": (1 - sl_pct, 1 + tp_pct),
+                            "SHORT": (1 + sl_pct, 1 - tp_pct)}
+
+        # WS login: keyed HMAC context, copied per login instead of re-keyed
+        self._ws_hmac = hmac.new(self.cfg.secret_key.encode(), digestmod=hashlib.sha256)
+        self._login_args = {"apiKey": self.cfg.api_key, "passphrase": self.cfg.passphrase}
+
+        # Subscribe frames never change — serialize once, resend on reconnect
+        self._sub_candle = _json_dumps({
+            "op": "subscribe",
+            "args": [{"channel": "candle30m", "instId": self.cfg.instId}]
+        })
+        self._sub_private = [
+            _json_dumps({"op": "subscribe", "args": [{"channel": ch, "instType": "SWAP"}]})
+            for ch in ("orders", "orders-algo")
+        ]
+
+        # Incremental trend EMA: latest value + last (lookback+1) values
+        self._ema_value: Optional[float] = None
+        self._ema_history: deque = deque(maxlen=self.cfg.strategy.trend_lookback + 1)
+
+        # Incremental BB: running sums over the bb_period closes BEFORE the
+        # latest one (same no-look-ahead window as bollinger_bands)
+        self._bb_window: deque = deque(maxlen=self.cfg.strategy.bb_period)
+        self._bb_sum = 0.0
+        self._bb_sumsq = 0.0
+        self._bb_last: Optional[float] = None  # latest close, not yet in window
+        self._bb_updates = 0
+
+    # === REST (thread pool) ===
 
     async def _rest(self, fn, *args, **kwargs):
-        """Run REST call in thread pool with per-thread client.
-        
-        If fn is a method on self.client or self.executor.client,
-        we rebind it to the thread-local client.
-        """
-        def _run():
-            # Use thread-local client for exchange calls
-            tc = self._get_thread_client()
-            # If fn is a bound method of OKXClient, rebind
-            if hasattr(fn, '__self__') and isinstance(fn.__self__, OKXClient):
-                method_name = fn.__name__
-                return getattr(tc, method_name)(*args, **kwargs)
-            # For executor methods that internally use self.client
-            # We can't easily rebind, so use a lock instead
-            return fn(*args, **kwargs)
-        return await self._loop.run_in_executor(None, _run)
+        """Run a blocking REST call (e.g. an executor method) in the REST pool."""
+        self._rest_cache.clear()  # executor methods may place/cancel orders
+        return await self._loop.run_in_executor(
+            self._rest_pool, lambda: fn(*args, **kwargs))
+
+    # === Discord (queued) ===
+
+    def _notify(self, message: str, mention: bool = False):
+        """Queue a Discord message; never blocks the event loop."""
+        try:
+            self._discord_q.put_nowait((message, mention))
+        except asyncio.QueueFull:
+            logger.error("Discord queue full, dropping: %s", message)
+
+    async def _discord_flusher(self):
+        """Send queued messages in batches, off-loop, until the None sentinel."""
+        q = self._discord_q
+        stopping = False
+        while not (stopping and q.empty()):
+            batch = [await q.get()]
+            await asyncio.sleep(DISCORD_FLUSH_INTERVAL)
+            while len(batch) < DISCORD_BATCH_MAX and not q.empty():
+                batch.append(q.get_nowait())
+            if None in batch:
+                stopping = True
+                batch = [b for b in batch if b is not None]
+            if not batch:
+                continue
+            text = DISCORD_BATCH_SEP.join(msg for msg, _ in batch)
+            mention = any(m for _, m in batch)
+            try:
+                await self._loop.run_in_executor(
+                    self._rest_pool, lambda: send_discord(text, mention=mention))
+            except Exception as e:
+                logger.error(f"Discord flush failed: {e}")
+
+    async def _drain_discord(self, task):
+        """Stop the flusher after it has sent everything already queued."""
+        try:
+            async with asyncio.timeout(DISCORD_DRAIN_TIMEOUT):
+                await self._discord_q.put(None)
+                await task
+        except Exception as e:
+            logger.error(f"Discord drain incomplete: {e!r}")
+
+    async def _market_close(self, close_side: str, sz: str):
+        """Reduce-only market order on our instrument (emergency close)."""
+        return await self._rest_exchange(
+            "place_market_order", self.cfg.instId, close_side, sz, True)
 
     async def _rest_exchange(self, method_name: str, *args, **kwargs):
-        """Call OKXClient method by name, thread-safe."""
-        def _run():
-            tc = self._get_thread_client()
-            return getattr(tc, method_name)(*args, **kwargs)
-        return await self._loop.run_in_executor(None, _run)
+        """Call OKXClient method by name on the shared client.
+
+        get_positions / get_algo_orders go through the short-TTL cache;
+        any other non-get_* call invalidates it.
+        """
+        if method_name in CACHED_REST_METHODS and not kwargs:
+            return await self._cached_rest_exchange(REST_CACHE_TTL, method_name, *args)
+        if not method_name.startswith("get_"):
+            self._rest_cache.clear()
+        return await self._call_exchange(method_name, *args, **kwargs)
+
+    async def _call_exchange(self, method_name: str, *args, **kwargs):
+        fn = getattr(self.client, method_name)
+        return await self._loop.run_in_executor(
+            self._rest_pool, lambda: fn(*args, **kwargs))
+
+    async def _cached_rest_exchange(self, ttl: float, method_name: str, *args):
+        """Coalesce identical read calls issued within `ttl` seconds.
+
+        Callers share one in-flight request. Failed requests are not cached.
+        """
+        key = (method_name, args)
+        now = time.monotonic()
+        entry = self._rest_cache.get(key)
+        if entry is None or now - entry[0] >= ttl:
+            task = self._loop.create_task(self._call_exchange(method_name, *args))
+            entry = (now, task)
+            self._rest_cache[key] = entry
+
+            def _drop_failed(t, key=key, entry=entry):
+                if (t.cancelled() or t.exception() is not None) \
+                        and self._rest_cache.get(key) is entry:
+                    del self._rest_cache[key]
+            task.add_done_callback(_drop_failed)
+        # shield: one cancelled waiter must not cancel the shared request
+        return await asyncio.shield(entry[1])
+
+    def _sl_tp_prices(self, direction: str, entry_price: float) -> Tuple[float, float]:
+        """(sl_price, tp_price) for a position entered at entry_price."""
+        sl_mult, tp_mult = self._sl_tp_mult[direction]
+        return entry_price * sl_mult, entry_price * tp_mult
 
     # === Pending State ===
 
     def _save_pending(self):
+        """Persist pending IDs: a newly placed algoId at once, clears debounced.
+
+        A crash inside the debounce window must not lose a live trigger's ID
+        (restart would not know to cancel it); a lost clear only leaves a
+        stale ID that startup reconciliation drops.
+        """
+        self._pending_dirty = True
+        ids = (self._pending_long_algoId, self._pending_short_algoId)
+        new_id = any(i and i != saved for i, saved in zip(ids, self._pending_saved))
+        if new_id or self._loop is None or not self._loop.is_running():
+            self._flush_pending()
+        elif self._pending_flush_handle is None:
+            self._pending_flush_handle = self._loop.call_later(
+                PENDING_SAVE_DEBOUNCE, self._flush_pending)
+
+    def _flush_pending(self):
+        if self._pending_flush_handle is not None:
+            self._pending_flush_handle.cancel()
+            self._pending_flush_handle = None
+        if not self._pending_dirty:
+            return
+        self._pending_dirty = False
+        self._pending_saved = (self._pending_long_algoId, self._pending_short_algoId)
         save_state(PENDING_STATE_FILE, {
             "long_algoId": self._pending_long_algoId,
             "short_algoId": self._pending_short_algoId,
@@ -172,6 +439,7 @@ class WSMonitor:
         state = load_state(PENDING_STATE_FILE)
         self._pending_long_algoId = state.get("long_algoId")
         self._pending_short_algoId = state.get("short_algoId")
+        self._pending_saved = (self._pending_long_algoId, self._pending_short_algoId)
 
     # === Startup Reconciliation ===
 
@@ -185,84 +453,74 @@ class WSMonitor:
             logger.error("Cannot check positions (API error)")
             return
 
-        has_position = any(float(p.get("pos", 0)) != 0 for p in positions)
+        pos_info, pos_val = _open_position(positions)
 
-        if has_position:
-            pos_info = next(p for p in positions if float(p.get("pos", 0)) != 0)
-            pos_val = float(pos_info.get("pos", 0))
+        if pos_info is not None:
             direction = "LONG" if pos_val > 0 else "SHORT"
             avg_px = float(pos_info.get("avgPx", 0))
             pos_size = abs(pos_val)
+            size_str = f"{pos_size:.2f}"  # reused for every order + state below
             had_local_state = bool(self.executor.load_position())
 
             logger.info(f"Position found: {direction} {pos_size} @ {avg_px} (local_state={had_local_state})")
 
             # ALWAYS verify SL exists on exchange, regardless of local state
             algos_cond = await self._rest_exchange("get_algo_orders", self.cfg.instId, "conditional")
-            has_sl = any(a.get("slTriggerPx") for a in algos_cond)
+            sl_algo = _sl_algo(algos_cond)
+            has_sl = sl_algo is not None
 
             if not has_sl:
                 logger.error(f"Position has NO SL on exchange! Re-setting SL/TP...")
                 # Re-set SL/TP instead of emergency close (position may be profitable)
                 close_side = "sell" if direction == "LONG" else "buy"
-                if direction == "LONG":
-                    sl_p = avg_px * (1 - self.cfg.risk.stop_loss_pct)
-                    tp_p = avg_px * (1 + self.cfg.risk.take_profit_pct)
-                else:
-                    sl_p = avg_px * (1 + self.cfg.risk.stop_loss_pct)
-                    tp_p = avg_px * (1 - self.cfg.risk.take_profit_pct)
+                sl_p, tp_p = self._sl_tp_prices(direction, avg_px)
+                sl_px, tp_px = f"{sl_p:.2f}", f"{tp_p:.2f}"
 
                 sl_result = await self._rest_exchange(
-                    "place_stop_order", self.cfg.instId, close_side, f"{pos_size:.2f}",
-                    slTriggerPx=f"{sl_p:.2f}")
+                    "place_stop_order", self.cfg.instId, close_side, size_str,
+                    slTriggerPx=sl_px)
 
                 if sl_result.get("code") != "0" or not sl_result.get("data"):
                     logger.error(f"SL re-set FAILED: {sl_result} — EMERGENCY CLOSE!")
-                    await self._rest_exchange("place_market_order",
-                        self.cfg.instId, close_side, f"{pos_size:.2f}", True)
-                    send_discord(f"{MSG_PREFIX}🚨 启动发现裸仓且SL设置失败 → 紧急平仓\n"
+                    await self._market_close(close_side, size_str)
+                    self._notify(f"{MSG_PREFIX}🚨 启动发现裸仓且SL设置失败 → 紧急平仓\n"
                                  f"{direction} {pos_size} @ ${avg_px:.2f}", mention=True)
                     self.executor.save_position(None)
                 else:
                     sl_algo_id = sl_result["data"][0].get("algoId", "")
                     tp_result = await self._rest_exchange(
-                        "place_limit_order", self.cfg.instId, close_side, f"{pos_size:.2f}",
-                        px=f"{tp_p:.2f}", reduceOnly=True)
+                        "place_limit_order", self.cfg.instId, close_side, size_str,
+                        px=tp_px, reduceOnly=True)
                     tp_id = tp_result.get("data", [{}])[0].get("ordId", "") if tp_result.get("code") == "0" else ""
 
                     self.executor.save_position({
                         "direction": direction, "entry_price": avg_px,
-                        "size": f"{pos_size:.2f}", "sl_price": sl_p, "tp_price": tp_p,
+                        "size": size_str, "sl_price": sl_p, "tp_price": tp_p,
                         "sl_algo_id": sl_algo_id, "tp_order_id": tp_id,
-                        "entry_time": datetime.now(timezone.utc).isoformat(),
+                        "entry_time": _utc_now_iso(),
                         "entry_bar_count": 0,
                     })
-                    send_discord(f"{MSG_PREFIX}⚠️ 启动发现裸仓 → 已重设SL/TP\n"
+                    self._notify(f"{MSG_PREFIX}⚠️ 启动发现裸仓 → 已重设SL/TP\n"
                                  f"{direction} {pos_size} @ ${avg_px:.2f}\n"
-                                 f"SL: ${sl_p:.2f} / TP: ${tp_p:.2f}", mention=True)
+                                 f"SL: ${sl_px} / TP: ${tp_px}", mention=True)
             else:
                 # SL exists — reconstruct local state from exchange
-                if direction == "LONG":
-                    sl_p = avg_px * (1 - self.cfg.risk.stop_loss_pct)
-                    tp_p = avg_px * (1 + self.cfg.risk.take_profit_pct)
-                else:
-                    sl_p = avg_px * (1 + self.cfg.risk.stop_loss_pct)
-                    tp_p = avg_px * (1 - self.cfg.risk.take_profit_pct)
+                sl_p, tp_p = self._sl_tp_prices(direction, avg_px)
 
-                sl_id = next((a["algoId"] for a in algos_cond if a.get("slTriggerPx")), "")
+                sl_id = sl_algo.get("algoId", "")
                 open_ords = await self._rest_exchange("get_open_orders", self.cfg.instId)
                 tp_id = next((o["ordId"] for o in open_ords if o.get("reduceOnly") == "true"), "")
 
                 self.executor.save_position({
                     "direction": direction, "entry_price": avg_px,
-                    "size": f"{pos_size:.2f}", "sl_price": sl_p, "tp_price": tp_p,
+                    "size": size_str, "sl_price": sl_p, "tp_price": tp_p,
                     "sl_algo_id": sl_id, "tp_order_id": tp_id,
-                    "entry_time": datetime.now(timezone.utc).isoformat(),
+                    "entry_time": _utc_now_iso(),
                     "entry_bar_count": 0,
                 })
                 logger.info(f"Position has SL — state synced")
                 if not had_local_state:
-                    send_discord(f"{MSG_PREFIX}⚠️ 启动恢复仓位: {direction} @ ${avg_px:.2f}")
+                    self._notify(f"{MSG_PREFIX}⚠️ 启动恢复仓位: {direction} @ ${avg_px:.2f}")
 
         # 2. In close-confirm mode, cancel ALL trigger orders (we don't use them)
         if self.cfg.execution.mode == "close_confirm_buffer":
@@ -279,9 +537,19 @@ class WSMonitor:
 
         # 3. Validate pending orders (intrabar trigger mode only)
         if self._pending_long_algoId or self._pending_short_algoId:
-            algos_trigger = await self._rest_exchange("get_algo_orders", self.cfg.instId, "trigger")
-            algos_cond2 = await self._rest_exchange("get_algo_orders", self.cfg.instId, "conditional")
-            live_ids = {a["algoId"] for a in (algos_trigger + algos_cond2)}
+            algos_trigger, algos_cond2 = await asyncio.gather(
+                self._rest_exchange("get_algo_orders", self.cfg.instId, "trigger"),
+                self._rest_exchange("get_algo_orders", self.cfg.instId, "conditional"),
+            )
+            # Only the (at most two) pending IDs matter — no full set of live IDs
+            pending = {self._pending_long_algoId, self._pending_short_algoId} - {None}
+            live_ids = set()
+            for a in chain(algos_trigger, algos_cond2):
+                aid = a["algoId"]
+                if aid in pending:
+                    live_ids.add(aid)
+                    if len(live_ids) == len(pending):
+                        break
 
             if self._pending_long_algoId and self._pending_long_algoId not in live_ids:
                 logger.info(f"Cleared expired LONG trigger {self._pending_long_algoId}")
@@ -295,18 +563,86 @@ class WSMonitor:
 
     # === BB Order Placement ===
 
-    def _get_trend(self) -> Optional[str]:
-        closes = self.accumulator.closes
-        idx = len(closes) - 1
+    def _seed_ema(self):
+        """EMA over the last period*3+1 closes, recomputed once per closed candle.
+
+        Deliberately not stepped with ema_step(): the strategy's trend EMA is
+        seeded at the start of this window (backtest.get_trend), and a
+        full-history EMA drifts away from it. _get_trend reads the cache.
+        """
         period = self.cfg.strategy.trend_ema_period
-        lookback = self.cfg.strategy.trend_lookback
-        ema_start = max(0, idx - period * 3)
-        ema_vals = ema(closes[ema_start:idx + 1], period)
-        if len(ema_vals) < lookback + 1:
+        closes = self.accumulator.closes_snapshot(period * 3 + 1)
+        self._ema_history.clear()
+        if not closes:
+            self._ema_value = None
+            return
+        ema_vals = ema(closes, period)
+        self._ema_value = ema_vals[-1]
+        self._ema_history.extend(ema_vals[-self._ema_history.maxlen:])
+
+    def _resync_bb_sums(self):
+        self._bb_sum = sum(self._bb_window)
+        self._bb_sumsq = sum(x * x for x in self._bb_window)
+        self._bb_updates = 0
+
+    def _seed_bb(self):
+        """Fill the BB window from history (cold start / reload)."""
+        period = self.cfg.strategy.bb_period
+        closes = self.accumulator.closes_snapshot(period + 1)
+        self._bb_window.clear()
+        self._bb_last = closes[-1] if closes else None
+        self._bb_window.extend(closes[:-1])
+        self._resync_bb_sums()
+
+    def _update_bb(self, close: float):
+        """Slide the BB window by one closed candle — O(1)."""
+        if self._bb_last is None:
+            self._seed_bb()
+            return
+        new = self._bb_last
+        if len(self._bb_window) == self._bb_window.maxlen:
+            old = self._bb_window[0]
+            self._bb_sum -= old
+            self._bb_sumsq -= old * old
+        self._bb_window.append(new)
+        self._bb_sum += new
+        self._bb_sumsq += new * new
+        self._bb_last = close
+        # Periodic exact resum so float error can't accumulate
+        self._bb_updates += 1
+        if self._bb_updates >= self._bb_window.maxlen:
+            self._resync_bb_sums()
+
+    def _get_bb(self):
+        """Current (mid, upper, lower) or None — same contract as get_bb_levels."""
+        if self._bb_last is None:
+            closes = self.accumulator.closes_snapshot()
+            return get_bb_levels(closes, self.cfg.strategy.bb_period,
+                                 self.cfg.strategy.bb_multiplier, len(closes) - 1)
+        if len(self._bb_window) < self._bb_window.maxlen:
+            return None
+        return bollinger_from_sums(self._bb_sum, self._bb_sumsq,
+                                   self.cfg.strategy.bb_period,
+                                   self.cfg.strategy.bb_multiplier,
+                                   self._bb_window)
+
+    async def _init_candles(self) -> bool:
+        """Load candle history and reseed the incremental EMA/BB from it."""
+        if not await self.accumulator.initialize(self._loop):
+            return False
+        self._seed_ema()
+        self._seed_bb()
+        return True
+
+    def _get_trend(self) -> Optional[str]:
+        if self._ema_value is None:
+            self._seed_ema()
+        hist = self._ema_history
+        if len(hist) < hist.maxlen:
             return None
-        if ema_vals[-1] > ema_vals[-1 - lookback]:
+        if hist[-1] > hist[0]:
             return "up"
-        elif ema_vals[-1] < ema_vals[-1 - lookback]:
+        elif hist[-1] < hist[0]:
             return "down"
         return None
 
@@ -322,22 +658,19 @@ class WSMonitor:
                 logger.info("Entry in progress, skipping cancel+place")
                 return
 
-            # Cancel existing triggers
-            if self._pending_long_algoId:
-                try:
-                    await self._rest_exchange("cancel_algo_order",
-                        self._pending_long_algoId, self.cfg.instId)
-                except Exception as e:
-                    logger.debug(f"Cancel LONG trigger {self._pending_long_algoId}: {e}")
-                self._pending_long_algoId = None
-
-            if self._pending_short_algoId:
-                try:
-                    await self._rest_exchange("cancel_algo_order",
-                        self._pending_short_algoId, self.cfg.instId)
-                except Exception as e:
-                    logger.debug(f"Cancel SHORT trigger {self._pending_short_algoId}: {e}")
-                self._pending_short_algoId = None
+            # Cancel existing triggers (both in one round trip)
+            pending = [(side, algo_id) for side, algo_id in
+                       (("LONG", self._pending_long_algoId),
+                        ("SHORT", self._pending_short_algoId)) if algo_id]
+            results = await asyncio.gather(
+                *(self._rest_exchange("cancel_algo_order", algo_id, self.cfg.instId)
+                  for _, algo_id in pending),
+                return_exceptions=True)
+            for (side, algo_id), res in zip(pending, results):
+                if isinstance(res, Exception):
+                    logger.debug(f"Cancel {side} trigger {algo_id}: {res}")
+            self._pending_long_algoId = None
+            self._pending_short_algoId = None
 
             self._save_pending()
 
@@ -346,12 +679,13 @@ class WSMonitor:
                 logger.info("Trigger fired during cancel, aborting place")
                 return
 
-            # Check position (exchange-verified)
+            # Check position (exchange-verified) only after every cancel has
+            # landed, so a trigger that fired mid-cancel shows up here
             positions = await self._rest_exchange("get_positions", self.cfg.instId)
             if positions is None:
                 logger.warning("Can't verify positions, skipping")
                 return
-            if any(float(p.get("pos", 0)) != 0 for p in positions):
+            if _open_position(positions)[0] is not None:
                 return
             if self.executor.load_position():
                 return
@@ -369,9 +703,7 @@ class WSMonitor:
             return
 
         closes = self.accumulator.closes
-        idx = len(closes) - 1
-        bb = get_bb_levels(closes, self.cfg.strategy.bb_period,
-                           self.cfg.strategy.bb_multiplier, idx)
+        bb = self._get_bb()
         if bb is None:
             logger.info("BB=None (flat market)")
             return
@@ -391,27 +723,31 @@ class WSMonitor:
         if not sz:
             return
 
+        # Price strings are formatted once and reused for the order and the log,
+        # so the log always shows exactly what was sent
         if trend == "up" and upper > current_price * 1.001:
+            trigger_px, order_px = f"{upper:.2f}", f"{upper * 1.001:.2f}"
             result = await self._rest_exchange(
                 "place_trigger_order", self.cfg.instId, "buy", sz,
-                triggerPx=f"{upper:.2f}",
-                orderPx=f"{upper * 1.001:.2f}",  # limit +0.1% buffer for fill certainty
+                triggerPx=trigger_px,
+                orderPx=order_px,  # limit +0.1% buffer for fill certainty
                 triggerPxType="last")
             if result.get("code") == "0" and result.get("data"):
                 self._pending_long_algoId = result["data"][0].get("algoId", "")
-                logger.info(f"📈 LONG trigger at ${upper:.2f} sz={sz} orderPx=${upper*1.001:.2f} algoId={self._pending_long_algoId}")
+                logger.info(f"📈 LONG trigger at ${trigger_px} sz={sz} orderPx=${order_px} algoId={self._pending_long_algoId}")
             else:
                 logger.error(f"LONG trigger failed: {result}")
 
         elif trend == "down" and lower < current_price * 0.999:
+            trigger_px, order_px = f"{lower:.2f}", f"{lower * 0.999:.2f}"
             result = await self._rest_exchange(
                 "place_trigger_order", self.cfg.instId, "sell", sz,
-                triggerPx=f"{lower:.2f}",
-                orderPx=f"{lower * 0.999:.2f}",  # limit -0.1% buffer for fill certainty
+                triggerPx=trigger_px,
+                orderPx=order_px,  # limit -0.1% buffer for fill certainty
                 triggerPxType="last")
             if result.get("code") == "0" and result.get("data"):
                 self._pending_short_algoId = result["data"][0].get("algoId", "")
-                logger.info(f"📉 SHORT trigger at ${lower:.2f} sz={sz} orderPx=${lower*0.999:.2f} algoId={self._pending_short_algoId}")
+                logger.info(f"📉 SHORT trigger at ${trigger_px} sz={sz} orderPx=${order_px} algoId={self._pending_short_algoId}")
             else:
                 logger.error(f"SHORT trigger failed: {result}")
 
@@ -429,23 +765,21 @@ class WSMonitor:
             # Position may exist without SL — check and emergency close
             try:
                 positions = await self._rest_exchange("get_positions", self.cfg.instId)
-                if positions and any(float(p.get("pos", 0)) != 0 for p in positions):
-                    pos_info = next(p for p in positions if float(p.get("pos", 0)) != 0)
-                    pv = float(pos_info.get("pos", 0))
+                pos_info, pv = _open_position(positions)
+                if pos_info is not None:
                     close_side = "sell" if pv > 0 else "buy"
                     # Check if SL exists
                     algos = await self._rest_exchange("get_algo_orders", self.cfg.instId, "conditional")
-                    if not any(a.get("slTriggerPx") for a in algos):
+                    if _sl_algo(algos) is None:
                         logger.error("No SL after exception — emergency close!")
-                        await self._rest_exchange("place_market_order",
-                            self.cfg.instId, close_side, f"{abs(pv):.2f}", True)
+                        await self._market_close(close_side, f"{abs(pv):.2f}")
                         self.executor.save_position(None)
-                        send_discord(f"{MSG_PREFIX}🚨 入场处理异常且无SL → 紧急平仓\n{e}", mention=True)
+                        self._notify(f"{MSG_PREFIX}🚨 入场处理异常且无SL → 紧急平仓\n{e}", mention=True)
                     else:
                         logger.info("SL exists despite exception — position safe")
             except Exception as e2:
                 logger.error(f"Exception during exception handling: {e2}", exc_info=True)
-                send_discord(f"{MSG_PREFIX}🚨🚨 入场处理双重异常！需要手动检查！\n{e}\n{e2}", mention=True)
+                self._notify(f"{MSG_PREFIX}🚨🚨 入场处理双重异常！需要手动检查！\n{e}\n{e2}", mention=True)
         finally:
             self._entry_in_progress = False
 
@@ -456,139 +790,161 @@ class WSMonitor:
         if fill_price <= 0:
             logger.error("fill_price invalid, querying exchange...")
             positions = await self._rest_exchange("get_positions", self.cfg.instId)
-            if positions:
-                for p in positions:
-                    if float(p.get("pos", 0)) != 0:
-                        fill_price = float(p.get("avgPx", 0))
-                        break
+            pos_info, _ = _open_position(positions)
+            if pos_info is not None:
+                fill_price = float(pos_info.get("avgPx", 0))
             if fill_price <= 0:
                 logger.error("CRITICAL: No valid price — emergency close!")
                 close_side = "sell" if direction == "LONG" else "buy"
-                await self._rest_exchange("place_market_order",
-                    self.cfg.instId, close_side, fill_sz, True)
-                send_discord(f"{MSG_PREFIX}🚨 入场价格无效，紧急平仓", mention=True)
+                await self._market_close(close_side, fill_sz)
+                self._notify(f"{MSG_PREFIX}🚨 入场价格无效，紧急平仓", mention=True)
                 return
 
         # Get actual position size from exchange (handles partial fills)
         positions = await self._rest_exchange("get_positions", self.cfg.instId)
         actual_sz = fill_sz
-        if positions:
-            for p in positions:
-                pv = abs(float(p.get("pos", 0)))
-                if pv > 0:
-                    actual_sz = f"{pv:.2f}"
-                    if actual_sz != fill_sz:
-                        logger.warning(f"Size mismatch: WS={fill_sz} exchange={actual_sz}")
-                    break
-
-        # Cancel other side (under lock)
+        pos_info, pv = _open_position(positions)
+        if pos_info is not None:
+            actual_sz = f"{abs(pv):.2f}"
+            if actual_sz != fill_sz:
+                logger.warning(f"Size mismatch: WS={fill_sz} exchange={actual_sz}")
+
+        # Cancel other side (under lock) — dispatched in the background so
+        # the SL below goes out without waiting on the cancel round trip
+        cancel_task = None
         async with self._order_lock:
             if direction == "LONG" and self._pending_short_algoId:
-                try:
-                    await self._rest_exchange("cancel_algo_order",
-                        self._pending_short_algoId, self.cfg.instId)
-                except Exception as e:
-                    logger.warning(f"Cancel opposite SHORT trigger failed: {e}")
+                cancel_task = self._loop.create_task(self._rest_exchange(
+                    "cancel_algo_order", self._pending_short_algoId, self.cfg.instId))
+                cancel_label = f"SHORT trigger {self._pending_short_algoId}"
                 self._pending_short_algoId = None
             elif direction == "SHORT" and self._pending_long_algoId:
-                try:
-                    await self._rest_exchange("cancel_algo_order",
-                        self._pending_long_algoId, self.cfg.instId)
-                except Exception as e:
-                    logger.warning(f"Cancel opposite LONG trigger failed: {e}")
+                cancel_task = self._loop.create_task(self._rest_exchange(
+                    "cancel_algo_order", self._pending_long_algoId, self.cfg.instId))
+                cancel_label = f"LONG trigger {self._pending_long_algoId}"
                 self._pending_long_algoId = None
             self._save_pending()
 
+        try:
+            await self._place_protection(direction, fill_price, actual_sz)
+        finally:
+            if cancel_task is not None:
+                try:
+                    await cancel_task
+                except Exception as e:
+                    logger.warning(f"Cancel opposite {cancel_label} failed: {e}")
+
+    async def _place_protection(self, direction: str, fill_price: float, actual_sz: str):
+        """Place SL (critical, verified live) + TP for a fresh entry and save state."""
+
         close_side = "sell" if direction == "LONG" else "buy"
 
         # SL/TP prices
-        if direction == "LONG":
-            sl_price = fill_price * (1 - self.cfg.risk.stop_loss_pct)
-            tp_price = fill_price * (1 + self.cfg.risk.take_profit_pct)
-        else:
-            sl_price = fill_price * (1 + self.cfg.risk.stop_loss_pct)
-            tp_price = fill_price * (1 - self.cfg.risk.take_profit_pct)
+        sl_price, tp_price = self._sl_tp_prices(direction, fill_price)
+        sl_px, tp_px = f"{sl_price:.2f}", f"{tp_price:.2f}"  # reused below
 
         # SET SL — CRITICAL
         sl_result = await self._rest_exchange(
             "place_stop_order", self.cfg.instId, close_side, actual_sz,
-            slTriggerPx=f"{sl_price:.2f}")
+            slTriggerPx=sl_px)
 
         if sl_result.get("code") != "0" or not sl_result.get("data"):
             logger.error(f"SL FAILED: {sl_result} — EMERGENCY CLOSE!")
-            await self._rest_exchange("place_market_order",
-                self.cfg.instId, close_side, actual_sz, True)
-            send_discord(f"{MSG_PREFIX}🚨 止损设置失败，紧急平仓", mention=True)
+            await self._market_close(close_side, actual_sz)
+            self._notify(f"{MSG_PREFIX}🚨 止损设置失败，紧急平仓", mention=True)
             self.executor.save_position(None)
             return
 
         sl_algo_id = sl_result["data"][0].get("algoId", "")
-        logger.info(f"✅ SL placed: algoId={sl_algo_id} triggerPx=${sl_price:.2f} side={close_side} sz={actual_sz}")
+        logger.info(f"✅ SL placed: algoId={sl_algo_id} triggerPx=${sl_px} side={close_side} sz={actual_sz}")
 
         # Verify SL is actually live on exchange
-        await asyncio.sleep(1)
-        algos = await self._rest_exchange("get_algo_orders", self.cfg.instId, "conditional")
-        sl_live = any(a.get("algoId") == sl_algo_id for a in algos)
+        sl_live = await self._wait_algo_live(sl_algo_id)
         if not sl_live:
             logger.error(f"SL {sl_algo_id} not live after placement — emergency close!")
-            await self._rest_exchange("place_market_order",
-                self.cfg.instId, close_side, actual_sz, True)
-            send_discord(f"{MSG_PREFIX}🚨 止损未激活，紧急平仓", mention=True)
+            await self._market_close(close_side, actual_sz)
+            self._notify(f"{MSG_PREFIX}🚨 止损未激活，紧急平仓", mention=True)
             self.executor.save_position(None)
             return
 
         # SET TP (non-critical, SL already active)
         tp_result = await self._rest_exchange(
             "place_limit_order", self.cfg.instId, close_side, actual_sz,
-            px=f"{tp_price:.2f}", reduceOnly=True)
+            px=tp_px, reduceOnly=True)
         tp_ord_id = ""
         if tp_result.get("code") == "0" and tp_result.get("data"):
             tp_ord_id = tp_result["data"][0].get("ordId", "")
-            logger.info(f"✅ TP placed: ordId={tp_ord_id} px=${tp_price:.2f} side={close_side} sz={actual_sz}")
+            logger.info(f"✅ TP placed: ordId={tp_ord_id} px=${tp_px} side={close_side} sz={actual_sz}")
         else:
             logger.error(f"TP failed (SL active): {tp_result}")
-            send_discord(f"{MSG_PREFIX}⚠️ TP设置失败，仅有SL保护")
+            self._notify(f"{MSG_PREFIX}⚠️ TP设置失败，仅有SL保护")
 
         # Save position state
         self.executor.save_position({
             "direction": direction, "entry_price": fill_price,
             "size": actual_sz, "sl_price": sl_price, "tp_price": tp_price,
             "sl_algo_id": sl_algo_id, "tp_order_id": tp_ord_id,
-            "entry_time": datetime.now(timezone.utc).isoformat(),
+            "entry_time": _utc_now_iso(),
             "entry_bar_count": 0,
         })
 
-        send_discord(
+        self._notify(
             f"{MSG_PREFIX}📊 OKX BB: {direction} {self.cfg.coin}\n"
             f"入场: ${fill_price:.2f}\n"
-            f"止损: ${sl_price:.2f} ({self.cfg.risk.stop_loss_pct*100:.1f}%)\n"
-            f"止盈: ${tp_price:.2f} ({self.cfg.risk.take_profit_pct*100:.1f}%)\n"
+            f"止损: ${sl_px} ({self.cfg.risk.stop_loss_pct*100:.1f}%)\n"
+            f"止盈: ${tp_px} ({self.cfg.risk.take_profit_pct*100:.1f}%)\n"
             f"合约: {actual_sz}",
             mention=True,
         )
 
+    async def _wait_algo_live(self, algo_id: str) -> bool:
+        """Poll conditional algos until `algo_id` shows up, up to SL_VERIFY_TIMEOUT.
+
+        Polled rather than awaited from the orders-algo WS channel: entry fills
+        are handled inside the private WS handler, so that channel is not read
+        while we wait here. Bypasses the read cache — each poll must be fresh.
+        """
+        deadline = time.monotonic() + SL_VERIFY_TIMEOUT
+        while True:
+            await asyncio.sleep(SL_VERIFY_POLL)
+            algos = await self._call_exchange("get_algo_orders", self.cfg.instId, "conditional")
+            if any(a.get("algoId") == algo_id for a in (algos or [])):
+                return True
+            if time.monotonic() >= deadline:
+                return False
+
+    async def _wait_position(self, want_open: bool) -> Tuple[Optional[dict], float]:
+        """Poll positions until open (or flat), up to SL_VERIFY_TIMEOUT.
+
+        Returns the last _open_position() result; the caller decides what a
+        timeout means. Bypasses the read cache like _wait_algo_live.
+        """
+        deadline = time.monotonic() + SL_VERIFY_TIMEOUT
+        while True:
+            await asyncio.sleep(SL_VERIFY_POLL)
+            positions = await self._call_exchange("get_positions", self.cfg.instId)
+            pos_info, pv = _open_position(positions)
+            if positions is not None and (pos_info is not None) == want_open:
+                return pos_info, pv
+            if time.monotonic() >= deadline:
+                return pos_info, pv
+
     # === WebSocket Connection ===
 
     def _ws_sign(self):
         ts = str(int(time.time()))
-        msg = ts + "GET" + "/users/self/verify"
-        mac = hmac.new(self.cfg.secret_key.encode(), msg.encode(), hashlib.sha256)
+        mac = self._ws_hmac.copy()
+        mac.update(ts.encode() + WS_VERIFY_PATH)
         return {"op": "login", "args": [{
-            "apiKey": self.cfg.api_key, "passphrase": self.cfg.passphrase,
+            **self._login_args,
             "timestamp": ts, "sign": base64.b64encode(mac.digest()).decode(),
         }]}
 
     async def _connect_business(self):
         try:
-            self._business_ws = await websockets.connect(
-                WS_BUSINESS_URL, ping_interval=PING_INTERVAL,
-                ping_timeout=10, close_timeout=5)
-            await self._business_ws.send(json.dumps({
-                "op": "subscribe",
-                "args": [{"channel": "candle30m", "instId": self.cfg.instId}]
-            }))
+            self._business_ws = await websockets.connect(WS_BUSINESS_URL, **WS_CONNECT_OPTS)
+            await self._business_ws.send(self._sub_candle)
             logger.info(f"Business WS connected, candle30m {self.cfg.instId}")
-            self._business_reconnect_delay = 1
             return True
         except Exception as e:
             logger.error(f"Business WS failed: {e}")
@@ -596,22 +952,16 @@ class WSMonitor:
 
     async def _connect_private(self):
         try:
-            self._private_ws = await websockets.connect(
-                WS_PRIVATE_URL, ping_interval=PING_INTERVAL,
-                ping_timeout=10, close_timeout=5)
-            await self._private_ws.send(json.dumps(self._ws_sign()))
+            self._private_ws = await websockets.connect(WS_PRIVATE_URL, **WS_CONNECT_OPTS)
+            await self._private_ws.send(_json_dumps(self._ws_sign()))
             resp = await asyncio.wait_for(self._private_ws.recv(), timeout=10)
-            data = json.loads(resp)
+            data = _json_loads(resp)
             if not (data.get("event") == "login" and data.get("code") == "0"):
                 logger.error(f"Private WS login failed: {data}")
                 return False
-            for ch in ["orders", "orders-algo"]:
-                await self._private_ws.send(json.dumps({
-                    "op": "subscribe",
-                    "args": [{"channel": ch, "instType": "SWAP"}]
-                }))
+            for sub in self._sub_private:
+                await self._private_ws.send(sub)
             logger.info("Private WS connected, orders + orders-algo")
-            self._private_reconnect_delay = 1
             return True
         except Exception as e:
             logger.error(f"Private WS failed: {e}")
@@ -620,9 +970,11 @@ class WSMonitor:
     # === Message Handlers ===
 
     async def _handle_business_message(self, msg: str):
+        if msg[:1] not in _JSON_OBJECT_START:  # "pong" / keepalive noise
+            return
         try:
-            data = json.loads(msg)
-        except json.JSONDecodeError:
+            data = _json_loads(msg)
+        except ValueError:
             return
         if data.get("event") == "subscribe":
             logger.info(f"Sub confirmed: {data.get('arg', {}).get('channel')}")
@@ -632,32 +984,37 @@ class WSMonitor:
             for candle in data["data"]:
                 if len(candle) >= 9 and candle[8] == "1":
                     close = float(candle[4])
-                    ts = int(candle[0])
-                    logger.info(f"Candle closed: {close:.2f} at "
-                                f"{datetime.fromtimestamp(ts/1000, tz=timezone.utc)}")
+                    if logger.isEnabledFor(logging.INFO):  # skip datetime work when muted
+                        logger.info("Candle closed: %.2f at %s", close,
+                                    datetime.fromtimestamp(int(candle[0]) / 1000, tz=timezone.utc))
                     self.accumulator.on_candle_close(close)
+                    self._seed_ema()
+                    self._update_bb(close)
                     await self._on_candle_close()
 
     async def _handle_private_message(self, msg: str):
+        if msg[:1] not in _JSON_OBJECT_START:  # "pong" / keepalive noise
+            return
         try:
-            data = json.loads(msg)
-        except json.JSONDecodeError:
+            data = _json_loads(msg)
+        except ValueError:
             return
-        if data.get("event"):
+        if data.get("event") or "data" not in data:
             return
 
+        # Order/algo update → cached positions/algos may be stale
+        self._rest_cache.clear()
         channel = data.get("arg", {}).get("channel", "")
 
         if channel == "orders-algo" and "data" in data:
             for order in data["data"]:
                 algo_id = order.get("algoId", "")
                 state = order.get("state", "")
-                side = order.get("side", "")
-                sz = order.get("sz", "0")
 
-                logger.info(f"Algo: {algo_id} state={state} side={side}")
+                logger.info("Algo: %s state=%s side=%s", algo_id, state, order.get("side", ""))
 
                 if state == "effective":
+                    sz = order.get("sz", "0")
                     if algo_id == self._pending_long_algoId:
                         logger.info("🎯 LONG trigger fired")
                         self._pending_long_algoId = None
@@ -688,7 +1045,7 @@ class WSMonitor:
                 except (ValueError, TypeError):
                     avg_px = 0.0
 
-                logger.info(f"Filled: {side} {acc_fill} @ {avg_px}")
+                logger.info("Filled: %s %s @ %s", side, acc_fill, avg_px)
 
                 triggered_dir = self._triggered_direction
                 if triggered_dir:
@@ -701,7 +1058,7 @@ class WSMonitor:
                     # Race: orders arrived before orders-algo
                     if self._pending_long_algoId or self._pending_short_algoId:
                         inferred = "LONG" if side == "buy" else "SHORT"
-                        logger.warning(f"Race: infer {inferred} from side={side}")
+                        logger.warning("Race: infer %s from side=%s", inferred, side)
                         if inferred == "LONG":
                             self._pending_long_algoId = None
                         else:
@@ -722,7 +1079,7 @@ class WSMonitor:
             result = await self._rest(self.executor.check_position)
             if result:
                 logger.info(f"Position closed: {result.exit_reason.value}")
-                send_discord(
+                self._notify(
                     f"{MSG_PREFIX}📊 OKX BB 平仓: {result.exit_reason.value}\n"
                     f"{result.direction.value} {result.coin}\n"
                     f"入场: ${result.entry_price:.2f} → 出场: ${result.exit_price:.2f}\n"
@@ -750,9 +1107,7 @@ class WSMonitor:
                 return
 
             closes = self.accumulator.closes
-            idx = len(closes) - 1
-            bb = get_bb_levels(closes, self.cfg.strategy.bb_period,
-                               self.cfg.strategy.bb_multiplier, idx)
+            bb = self._get_bb()
             if bb is None:
                 return
 
@@ -778,7 +1133,7 @@ class WSMonitor:
             if positions is None:
                 logger.warning("Can't verify positions, skipping entry")
                 return
-            if any(float(p.get("pos", 0)) != 0 for p in positions):
+            if _open_position(positions)[0] is not None:
                 return
 
             sz = await self._rest(self.executor.calculate_size)
@@ -795,30 +1150,27 @@ class WSMonitor:
             if result.get("code") == "0" and result.get("data"):
                 ord_id = result["data"][0].get("ordId", "")
                 logger.info(f"Market order placed: {direction} sz={sz} ordId={ord_id}")
-                # Wait for fill then process
-                await asyncio.sleep(2)
-                # Check fill
-                positions = await self._rest_exchange("get_positions", self.cfg.instId)
-                if positions and any(float(p.get("pos", 0)) != 0 for p in positions):
-                    pos_info = next(p for p in positions if float(p.get("pos", 0)) != 0)
+                pos_info, pv = await self._wait_position(want_open=True)
+                if pos_info is not None:
                     fill_price = float(pos_info.get("avgPx", prev_close))
-                    fill_sz = f"{abs(float(pos_info.get('pos', 0))):.2f}"
+                    fill_sz = f"{abs(pv):.2f}"
                     await self._on_entry_filled(dir_label, fill_price, fill_sz)
                 else:
                     logger.error(f"Market order sent but no position found! ordId={ord_id}")
-                    send_discord(f"{MSG_PREFIX}⚠️ 市价单发出但未检测到持仓 ordId={ord_id}", mention=True)
+                    self._notify(f"{MSG_PREFIX}⚠️ 市价单发出但未检测到持仓 ordId={ord_id}", mention=True)
             else:
                 logger.error(f"Market order failed: {result}")
-                send_discord(f"{MSG_PREFIX}⚠️ 市价开仓失败: {result}", mention=True)
+                self._notify(f"{MSG_PREFIX}⚠️ 市价开仓失败: {result}", mention=True)
 
     async def _check_position_closed(self):
         """Check if SL/TP hit. If position closed, place new triggers."""
-        await asyncio.sleep(2)
         try:
+            if self.executor.load_position():
+                await self._wait_position(want_open=False)
             result = await self._rest(self.executor.check_position)
             if result:
                 logger.info(f"Position closed: {result.exit_reason.value}")
-                send_discord(
+                self._notify(
                     f"{MSG_PREFIX}📊 OKX BB 平仓: {result.exit_reason.value}\n"
                     f"{result.direction.value} {result.coin}\n"
                     f"入场: ${result.entry_price:.2f} → 出场: ${result.exit_price:.2f}\n"
@@ -831,26 +1183,81 @@ class WSMonitor:
 
     # === Periodic Reconciliation ===
 
+    def _periodic_interval(self) -> int:
+        """Seconds until the next periodic check: slow when idle, fast when active."""
+        if (self._triggered_direction or self._entry_in_progress
+                or self._pending_long_algoId or self._pending_short_algoId
+                or self.executor.load_position()):
+            return PERIODIC_CHECK_ACTIVE
+        return PERIODIC_CHECK_IDLE
+
+    async def _periodic_sleep(self):
+        """Sleep until the next periodic check is due.
+
+        The interval is recomputed every PERIODIC_CHECK_POLL seconds rather
+        than fixed up front, so state that turns active mid-sleep doesn't
+        wait out an idle interval chosen before it.
+        """
+        start = time.monotonic()
+        while True:
+            remaining = self._periodic_interval() - (time.monotonic() - start)
+            if remaining <= 0:
+                return
+            await asyncio.sleep(min(remaining, PERIODIC_CHECK_POLL))
+
+    async def _idle(self, aw):
+        """Await *aw* with the current task marked cancellable by _shutdown."""
+        task = asyncio.current_task()
+        self._idle_tasks.add(task)
+        try:
+            return await aw
+        finally:
+            self._idle_tasks.discard(task)
+
+    async def _idle_sleep(self, aw):
+        """Error-path backoff sleep; a shutdown cancel just ends the sleep."""
+        try:
+            await self._idle(aw)
+        except asyncio.CancelledError:
+            if self._running:
+                raise
+
     async def _periodic_check(self):
+        # Safety net for WS events we missed (e.g. an SL cancelled outside the
+        # monitor). Deliberately no "unchanged since last tick" short-circuit:
+        # the exchange fetch IS the drift check, and what follows it is cheap.
+        # Quiet accounts are handled by the longer idle interval instead.
         while self._running:
-            await asyncio.sleep(300)
+            try:
+                await self._idle(self._periodic_sleep())
+            except asyncio.CancelledError:
+                if self._running:
+                    raise
+                break
             try:
                 # Check for stale triggered state (limit order didn't fill)
                 if self._triggered_direction and self._triggered_at:
                     elapsed = time.time() - self._triggered_at
                     if elapsed > self.TRIGGER_FILL_TIMEOUT:
                         logger.warning(f"Trigger fired {elapsed:.0f}s ago but no fill — checking exchange")
-                        positions = await self._rest_exchange("get_positions", self.cfg.instId)
+                        # Open orders are only needed on the no-fill branch, but
+                        # fetching them alongside costs max() not sum() of RTTs
+                        positions, open_orders = await asyncio.gather(
+                            self._rest_exchange("get_positions", self.cfg.instId),
+                            self._rest_exchange("get_open_orders", self.cfg.instId),
+                            return_exceptions=True)
+                        if isinstance(positions, Exception):
+                            logger.warning(f"get_positions failed: {positions}")
+                            positions = None
                         if positions is None:
                             logger.warning("API error during trigger timeout check, will retry next cycle")
                             continue
-                        has_pos = any(float(p.get("pos", 0)) != 0 for p in positions)
-                        if has_pos:
+                        pos_info, pv = _open_position(positions)
+                        if pos_info is not None:
                             # Position exists — fill happened but WS missed it
                             logger.info("Position found, processing as late fill")
-                            pos_info = next(p for p in positions if float(p.get("pos", 0)) != 0)
                             avg_px = float(pos_info.get("avgPx", 0))
-                            pos_sz = f"{abs(float(pos_info.get('pos', 0))):.2f}"
+                            pos_sz = f"{abs(pv):.2f}"
                             direction = self._triggered_direction
                             self._triggered_direction = None
                             self._triggered_sz = None
@@ -859,17 +1266,22 @@ class WSMonitor:
                         else:
                             # No position — limit order expired or was rejected
                             logger.warning("No position after trigger timeout — cancelling stale orders and resetting")
-                            # Cancel any unfilled limit orders
-                            open_orders = await self._rest_exchange("get_open_orders", self.cfg.instId)
-                            for o in (open_orders or []):
-                                try:
-                                    await self._rest_exchange("cancel_order", self.cfg.instId, o["ordId"])
-                                except Exception as e:
-                                    logger.warning(f"Cancel stale order {o['ordId']}: {e}")
+                            # Cancel any unfilled limit orders (concurrently)
+                            if isinstance(open_orders, Exception):
+                                logger.warning(f"get_open_orders failed: {open_orders}")
+                                open_orders = None
+                            stale = [o["ordId"] for o in (open_orders or [])]
+                            results = await asyncio.gather(
+                                *(self._rest_exchange("cancel_order", self.cfg.instId, oid)
+                                  for oid in stale),
+                                return_exceptions=True)
+                            for oid, res in zip(stale, results):
+                                if isinstance(res, Exception):
+                                    logger.warning(f"Cancel stale order {oid}: {res}")
                             self._triggered_direction = None
                             self._triggered_sz = None
                             self._triggered_at = None
-                            send_discord(f"{MSG_PREFIX}⚠️ Trigger 触发但限价单未成交（{elapsed:.0f}s），已重置", mention=True)
+                            self._notify(f"{MSG_PREFIX}⚠️ Trigger 触发但限价单未成交（{elapsed:.0f}s），已重置", mention=True)
                             await self._atomic_cancel_and_place()
                         continue
 
@@ -882,7 +1294,7 @@ class WSMonitor:
                 result = await self._rest(self.executor.check_position)
                 if result:
                     logger.info(f"Periodic: closed {result.exit_reason.value}")
-                    send_discord(
+                    self._notify(
                         f"{MSG_PREFIX}📊 平仓 (periodic): {result.exit_reason.value}\n"
                         f"{result.direction.value} {result.coin}\n"
                         f"入场: ${result.entry_price:.2f} → 出场: ${result.exit_price:.2f}\n"
@@ -896,19 +1308,14 @@ class WSMonitor:
                 local_pos = self.executor.load_position()
                 if local_pos and not self._entry_in_progress:
                     algos = await self._rest_exchange("get_algo_orders", self.cfg.instId, "conditional")
-                    has_sl = any(a.get("slTriggerPx") for a in (algos or []))
+                    has_sl = _sl_algo(algos) is not None
                     if not has_sl:
                         logger.error("PERIODIC: Position has NO SL on exchange! Re-setting...")
                         d = local_pos.get("direction", "SHORT")
                         ap = local_pos.get("entry_price", 0)
                         sz = local_pos.get("size", "0")
                         close_side = "sell" if d == "LONG" else "buy"
-                        if d == "LONG":
-                            sl_p = ap * (1 - self.cfg.risk.stop_loss_pct)
-                            tp_p = ap * (1 + self.cfg.risk.take_profit_pct)
-                        else:
-                            sl_p = ap * (1 + self.cfg.risk.stop_loss_pct)
-                            tp_p = ap * (1 - self.cfg.risk.take_profit_pct)
+                        sl_p, tp_p = self._sl_tp_prices(d, ap)
 
                         sl_result = await self._rest_exchange(
                             "place_stop_order", self.cfg.instId, close_side, sz,
@@ -919,13 +1326,12 @@ class WSMonitor:
                             local_pos["sl_algo_id"] = sl_algo_id
                             self.executor.save_position(local_pos)
                             logger.info(f"SL re-set OK: algoId={sl_algo_id} triggerPx={sl_p:.2f}")
-                            send_discord(f"{MSG_PREFIX}⚠️ 定期检查发现 SL 丢失 → 已重设\n"
+                            self._notify(f"{MSG_PREFIX}⚠️ 定期检查发现 SL 丢失 → 已重设\n"
                                          f"SL: ${sl_p:.2f}", mention=True)
                         else:
                             logger.error(f"SL re-set FAILED: {sl_result} — EMERGENCY CLOSE!")
-                            await self._rest_exchange("place_market_order",
-                                self.cfg.instId, close_side, sz, True)
-                            send_discord(f"{MSG_PREFIX}🚨 SL 丢失且重设失败 → 紧急平仓", mention=True)
+                            await self._market_close(close_side, sz)
+                            self._notify(f"{MSG_PREFIX}🚨 SL 丢失且重设失败 → 紧急平仓", mention=True)
                             self.executor.save_position(None)
                             if self.cfg.execution.mode != "close_confirm_buffer":
                                 await self._atomic_cancel_and_place()
@@ -933,79 +1339,74 @@ class WSMonitor:
 
                 # Orphan detection (only if no local position AND no entry in progress)
                 if not local_pos and not self._entry_in_progress:
-                    positions = await self._rest_exchange("get_positions", self.cfg.instId)
-                    if positions and any(float(p.get("pos", 0)) != 0 for p in positions):
+                    positions, algos = await asyncio.gather(
+                        self._rest_exchange("get_positions", self.cfg.instId),
+                        self._rest_exchange("get_algo_orders", self.cfg.instId, "conditional"),
+                        return_exceptions=True)
+                    if isinstance(positions, Exception):
+                        raise positions
+                    pos_info, pv = _open_position(positions)
+                    if pos_info is not None:
                         # Double-check entry_in_progress (could have changed)
                         if self._entry_in_progress or self._triggered_direction:
                             logger.info("Periodic: entry started during check, skip orphan")
                             continue
                         logger.error("PERIODIC: Orphan detected!")
-                        algos = await self._rest_exchange("get_algo_orders", self.cfg.instId, "conditional")
-                        has_sl = any(a.get("slTriggerPx") for a in algos)
+                        if isinstance(algos, Exception):
+                            raise algos
+                        sl_algo = _sl_algo(algos)
+                        has_sl = sl_algo is not None
                         if not has_sl:
-                            pos_info = next(p for p in positions if float(p.get("pos", 0)) != 0)
-                            pv = float(pos_info.get("pos", 0))
                             d = "LONG" if pv > 0 else "SHORT"
                             ap = float(pos_info.get("avgPx", 0))
                             close_side = "sell" if pv > 0 else "buy"
                             pos_size = abs(pv)
+                            size_str = f"{pos_size:.2f}"
 
                             # Try to re-set SL/TP first (position may be profitable)
-                            if d == "LONG":
-                                sl_p = ap * (1 - self.cfg.risk.stop_loss_pct)
-                                tp_p = ap * (1 + self.cfg.risk.take_profit_pct)
-                            else:
-                                sl_p = ap * (1 + self.cfg.risk.stop_loss_pct)
-                                tp_p = ap * (1 - self.cfg.risk.take_profit_pct)
+                            sl_p, tp_p = self._sl_tp_prices(d, ap)
+                            sl_px, tp_px = f"{sl_p:.2f}", f"{tp_p:.2f}"
 
                             sl_result = await self._rest_exchange(
-                                "place_stop_order", self.cfg.instId, close_side, f"{pos_size:.2f}",
-                                slTriggerPx=f"{sl_p:.2f}")
+                                "place_stop_order", self.cfg.instId, close_side, size_str,
+                                slTriggerPx=sl_px)
 
                             if sl_result.get("code") != "0" or not sl_result.get("data"):
                                 logger.error(f"Periodic: SL re-set FAILED — emergency close!")
-                                await self._rest_exchange("place_market_order",
-                                    self.cfg.instId, close_side, f"{pos_size:.2f}", True)
-                                send_discord(f"{MSG_PREFIX}🚨 发现无保护仓位且SL设置失败，紧急平仓", mention=True)
+                                await self._market_close(close_side, size_str)
+                                self._notify(f"{MSG_PREFIX}🚨 发现无保护仓位且SL设置失败，紧急平仓", mention=True)
                                 self.executor.save_position(None)
                             else:
                                 sl_algo_id = sl_result["data"][0].get("algoId", "")
                                 tp_result = await self._rest_exchange(
-                                    "place_limit_order", self.cfg.instId, close_side, f"{pos_size:.2f}",
-                                    px=f"{tp_p:.2f}", reduceOnly=True)
+                                    "place_limit_order", self.cfg.instId, close_side, size_str,
+                                    px=tp_px, reduceOnly=True)
                                 tp_id = tp_result.get("data", [{}])[0].get("ordId", "") if tp_result.get("code") == "0" else ""
 
                                 self.executor.save_position({
                                     "direction": d, "entry_price": ap,
-                                    "size": f"{pos_size:.2f}", "sl_price": sl_p, "tp_price": tp_p,
+                                    "size": size_str, "sl_price": sl_p, "tp_price": tp_p,
                                     "sl_algo_id": sl_algo_id, "tp_order_id": tp_id,
-                                    "entry_time": datetime.now(timezone.utc).isoformat(),
+                                    "entry_time": _utc_now_iso(),
                                     "entry_bar_count": 0,
                                 })
-                                send_discord(f"{MSG_PREFIX}⚠️ 发现无保护仓位 → 已重设SL/TP\n"
+                                self._notify(f"{MSG_PREFIX}⚠️ 发现无保护仓位 → 已重设SL/TP\n"
                                              f"{d} {pos_size} @ ${ap:.2f}\n"
-                                             f"SL: ${sl_p:.2f} / TP: ${tp_p:.2f}", mention=True)
+                                             f"SL: ${sl_px} / TP: ${tp_px}", mention=True)
                         else:
                             logger.info("Orphan has SL, reconstructing state")
                             # Similar to startup reconciliation
-                            pos_info = next(p for p in positions if float(p.get("pos", 0)) != 0)
-                            pv = float(pos_info.get("pos", 0))
                             d = "LONG" if pv > 0 else "SHORT"
                             ap = float(pos_info.get("avgPx", 0))
-                            if d == "LONG":
-                                sl_p_est = ap * (1 - self.cfg.risk.stop_loss_pct)
-                                tp_p_est = ap * (1 + self.cfg.risk.take_profit_pct)
-                            else:
-                                sl_p_est = ap * (1 + self.cfg.risk.stop_loss_pct)
-                                tp_p_est = ap * (1 - self.cfg.risk.take_profit_pct)
+                            sl_p_est, tp_p_est = self._sl_tp_prices(d, ap)
                             self.executor.save_position({
                                 "direction": d, "entry_price": ap,
                                 "size": f"{abs(pv):.2f}",
                                 "sl_price": sl_p_est,
                                 "tp_price": tp_p_est,
-                                "sl_algo_id": next((a["algoId"] for a in algos), ""),
+                                "sl_algo_id": sl_algo.get("algoId", ""),
                                 "tp_order_id": "",
-                                "entry_time": datetime.now(timezone.utc).isoformat(),
+                                "entry_time": _utc_now_iso(),
                                 "entry_bar_count": 0,
                             })
 
@@ -1021,64 +1422,65 @@ class WSMonitor:
     # === Main Loops ===
 
     def _ws_is_open(self, ws):
-        if ws is None:
-            return False
-        try:
-            return ws.state.name == "OPEN"
-        except Exception:
-            return False
+        # Called every loop iteration: enum identity, no try/except
+        return ws is not None and getattr(ws, "state", None) is State.OPEN
 
     async def _business_loop(self):
         while self._running:
             try:
                 if not self._ws_is_open(self._business_ws):
                     if not await self._connect_business():
-                        await asyncio.sleep(self._business_reconnect_delay)
-                        self._business_reconnect_delay = min(
-                            self._business_reconnect_delay * 2, MAX_RECONNECT_DELAY)
+                        await self._idle(self._business_backoff.sleep())
                         continue
-                    await self.accumulator.initialize(self._loop)
+                    await self._init_candles()
 
-                msg = await asyncio.wait_for(self._business_ws.recv(), timeout=60)
+                msg = await self._idle(_recv_frame(self._business_ws))
+                self._business_backoff.reset()
                 await self._handle_business_message(msg)
 
             except asyncio.TimeoutError:
                 pass
+            except asyncio.CancelledError:
+                if self._running:
+                    raise
+                break  # cancelled by _shutdown; run() closes the socket
             except (ConnectionClosedError, WebSocketException) as e:
                 logger.warning(f"Business WS disconnected: {e}")
                 self._business_ws = None
-                await asyncio.sleep(self._business_reconnect_delay)
-                self._business_reconnect_delay = min(
-                    self._business_reconnect_delay * 2, MAX_RECONNECT_DELAY)
+                await self._idle_sleep(self._business_backoff.sleep())
             except Exception as e:
                 logger.error(f"Business WS error: {e}", exc_info=True)
-                await asyncio.sleep(5)
+                await self._idle_sleep(asyncio.sleep(5))
 
     async def _private_loop(self):
         while self._running:
             try:
                 if not self._ws_is_open(self._private_ws):
                     if not await self._connect_private():
-                        await asyncio.sleep(self._private_reconnect_delay)
-                        self._private_reconnect_delay = min(
-                            self._private_reconnect_delay * 2, MAX_RECONNECT_DELAY)
+                        await self._idle(self._private_backoff.sleep())
                         continue
 
-                msg = await asyncio.wait_for(self._private_ws.recv(), timeout=60)
+                msg = await self._idle(_recv_frame(self._private_ws))
+                self._private_backoff.reset()
                 await self._handle_private_message(msg)
 
             except asyncio.TimeoutError:
                 pass
+            except asyncio.CancelledError:
+                if self._running:
+                    raise
+                break  # cancelled by _shutdown; run() closes the socket
             except (ConnectionClosedError, WebSocketException) as e:
                 logger.warning(f"Private WS disconnected: {e}")
                 self._private_ws = None
-                await asyncio.sleep(self._private_reconnect_delay)
+                await self._idle_sleep(self._private_backoff.sleep())
             except Exception as e:
                 logger.error(f"Private WS error: {e}", exc_info=True)
-                await asyncio.sleep(5)
+                await self._idle_sleep(asyncio.sleep(5))
 
     async def run(self):
-        self._loop = asyncio.get_event_loop()
+        self._loop = asyncio.get_running_loop()
+        discord_task = self._loop.create_task(self._discord_flusher())
 
         logger.info("=" * 60)
         logger.info("OKX BB Monitor v2.3 — Hardened")
@@ -1088,10 +1490,11 @@ class WSMonitor:
                      f"SL={self.cfg.risk.stop_loss_pct*100}%")
         logger.info("=" * 60)
 
-        if not await self.accumulator.initialize(self._loop):
+        if not await self._init_candles():
             await asyncio.sleep(30)
-            if not await self.accumulator.initialize(self._loop):
+            if not await self._init_candles():
                 logger.error("Candle init failed. Exiting.")
+                await self._drain_discord(discord_task)
                 return
 
         self._load_pending()
@@ -1119,22 +1522,11 @@ class WSMonitor:
             elif not self._pending_long_algoId and not self._pending_short_algoId:
                 await self._atomic_cancel_and_place()
 
-        # Get last commit info for version tracking
-        import subprocess as _sp
-        from datetime import timezone, timedelta
-        try:
-            _raw = _sp.run(
-                ["git", "log", "--format=%h %s|%ct", "-1"],
-                capture_output=True, text=True, timeout=5,
-                cwd=str(Path(__file__).parent.parent),
-            ).stdout.strip()
-            _parts = _raw.rsplit("|", 1)
-            _sgt = datetime.fromtimestamp(int(_parts[1]), tz=timezone(timedelta(hours=8)))
-            _commit = f"{_parts[0]} ({_sgt:%Y-%m-%d %H:%M} SGT)"
-        except Exception:
-            _commit = "unknown"
-
-        send_discord(
+        # Commit info is resolved at deploy time (okx_bb/_version.py); the git
+        # fallback runs off-loop so it can't stall startup
+        _commit = await self._loop.run_in_executor(self._rest_pool, commit_info)
+
+        self._notify(
             f"🟢 OKX BB 启动\n"
             f"{self.cfg.instId} BB({self.cfg.strategy.bb_period}, "
             f"{self.cfg.strategy.bb_multiplier})\n"
@@ -1145,18 +1537,39 @@ class WSMonitor:
             self._private_loop(),
             self._periodic_check(),
         )
+        for ws in (self._business_ws, self._private_ws):
+            if ws is not None:
+                try:
+                    await ws.close()
+                except Exception as e:
+                    logger.debug("WS close on shutdown: %s", e)
+        self._flush_pending()
+        await self._drain_discord(discord_task)
+        self._rest_pool.shutdown(wait=False)
+        self.client.close()
 
     def _shutdown(self):
         """Signal handler — set flag only. Cleanup via ExecStop."""
         logger.info("Shutdown signal received")
         self._running = False
+        # Wake loops parked in recv()/sleep instead of waiting out WS_RECV_TIMEOUT
+        for task in list(self._idle_tasks):
+            task.cancel()
+        self._flush_pending()  # persist any debounced pending-ID change now
         # Don't do blocking REST here — ExecStop cleanup.py handles it
-        send_discord(f"🔴 OKX BB Monitor 停止")
+        self._notify(f"🔴 OKX BB Monitor 停止")
 
 
 def main():
     monitor = WSMonitor()
-    asyncio.run(monitor.run())
+    # uvloop (optional): libuv-backed loop, faster socket I/O for the WS feeds.
+    # uvloop.run() only exists from 0.18; older installs use plain asyncio.
+    try:
+        import uvloop
+    except ImportError:
+        uvloop = None
+    run = getattr(uvloop, "run", None) or asyncio.run
+    run(monitor.run())
 
 
 if __name__ == "__main__":
@@ -2,9 +2,12 @@
 Shared fixtures for Lucky Trading System tests.
 All exchange/network calls are mocked — no real money touched.
 """
+import ast
+import inspect
 import os
 import sys
 import types
+from collections import defaultdict
 from pathlib import Path
 from unittest.mock import MagicMock, patch
 
@@ -18,6 +21,11 @@ if _REAL_CONFIG_DIR.exists():
 # ---------------------------------------------------------------------------
 # We need to import our scripts, but hl_trade.py loads secrets at module level.
 # Patch that out BEFORE any script is imported.
+#
+# This must stay at conftest import time, not in a session fixture: several
+# test modules import luckytrader at module level, which happens during
+# collection — before any fixture (even session/autouse) runs. It executes
+# once per xdist worker and costs a few module objects.
 # ---------------------------------------------------------------------------
 
 # Create a fake hl_trade module so other modules can import from it
@@ -78,6 +86,71 @@ sys.path.insert(0, str(SCRIPTS_DIR))
 # The real config module at scripts/config/ should work since scripts/ is in path
 
 
+@pytest.fixture(scope="session")
+def source_of():
+    """inspect.getsource() memoized per function for the whole session.
+
+    Keyed on the function object: backtest.run_backtest and
+    optimize.run_backtest share a __qualname__.
+    """
+    cache = {}
+
+    def _get(fn):
+        if fn not in cache:
+            cache[fn] = inspect.getsource(fn)
+        return cache[fn]
+    return _get
+
+
+@pytest.fixture(scope="session")
+def luckytrader_py_files():
+    """Every luckytrader/**/*.py (minus __pycache__), listed once per session."""
+    pkg_dir = SCRIPTS_DIR / "luckytrader"
+    return tuple(sorted(p for p in pkg_dir.rglob("*.py")
+                        if "__pycache__" not in p.parts))
+
+
+@pytest.fixture(scope="session")
+def parsed_source():
+    """(source, ast.Module) for a .py path, read and parsed once per session.
+
+    Keyed on (absolute path, st_mtime_ns) so an edited file is re-parsed.
+    SyntaxError propagates to the caller, located via the filename. Default
+    ast.parse flags are already the cheap ones (type_comments off, grammar
+    of the running interpreter), so none are passed.
+    """
+    cache = {}
+
+    def _get(path):
+        path = os.path.abspath(path)
+        key = (path, os.stat(path).st_mtime_ns)
+        if key not in cache:
+            raw = Path(path).read_bytes()
+            cache[key] = (raw.decode(), ast.parse(raw, path))
+        return cache[key]
+    return _get
+
+
+@pytest.fixture(scope="session")
+def nodes_of(parsed_source):
+    """AST nodes of a .py path bucketed by node type, from one walk per file.
+
+    ``nodes_of(path)[ast.Call]`` — every check reads its bucket instead of
+    re-walking the whole tree. Missing types give an empty list.
+    """
+    cache = {}
+
+    def _get(path):
+        _, tree = parsed_source(path)
+        if tree not in cache:
+            buckets = defaultdict(list)
+            for node in ast.walk(tree):
+                buckets[type(node)].append(node)
+            cache[tree] = buckets
+        return cache[tree]
+    return _get
+
+
 @pytest.fixture
 def mock_hl():
     """Reset all hl_trade mocks between tests."""
@@ -104,11 +177,58 @@ def mock_hl():
     _fake_hl.place_stop_loss.return_value = {"status": "ok"}
     _fake_hl.place_take_profit.return_value = {"status": "ok"}
     _fake_hl.cancel_order.return_value = {"status": "ok"}
-    return _fake_hl
+    yield _fake_hl
+    # Tests that skip this fixture still import the same fake module, so
+    # don't let a leftover side_effect leak into them.
+    _fake_hl.get_open_orders_detailed.side_effect = None
+    _fake_hl.place_market_order.side_effect = None
+    _fake_hl.place_stop_loss.side_effect = None
+    _fake_hl.place_take_profit.side_effect = None
+
+
+# luckytrader.execute attributes replaced by exchange_mocks → default kwargs
+_EXCHANGE_MOCK_DEFAULTS = {
+    "place_market_order": {"return_value": {"status": "ok"}},
+    "get_position": {"return_value": None},
+    "get_open_orders_detailed": {"return_value": []},
+    "get_market_price": {"return_value": 67000.0},
+    "cancel_order": {"return_value": {"status": "ok"}},
+    "notify_discord": {},
+    "log_trade": {},
+    "record_trade_result": {},
+    "save_state": {},
+}
+
+
+@pytest.fixture
+def exchange_mocks(monkeypatch):
+    """Fresh MagicMocks for execute's exchange/bookkeeping calls.
+
+    monkeypatch.setattr on the module object — one fixture instead of a
+    stack of @patch("luckytrader.execute.…") decorators per test. Tweak
+    return values per test, e.g. ``exchange_mocks.get_market_price.return_value = …``.
+    ``sleep`` records retry backoff without waiting.
+    """
+    import luckytrader.execute as ex
+    mocks = types.SimpleNamespace()
+    for attr, kw in _EXCHANGE_MOCK_DEFAULTS.items():
+        m = MagicMock(**kw)
+        monkeypatch.setattr(ex, attr, m)
+        setattr(mocks, attr, m)
+    mocks.sleep = MagicMock()
+    monkeypatch.setattr(ex.time, "sleep", mocks.sleep)
+    return mocks
+
+
+@pytest.fixture(scope="session")
+def _default_config():
+    """Parse the default config.toml once per session (per xdist worker)."""
+    import luckytrader.config as _cfg_mod
+    return _cfg_mod.reload_config()
 
 
 @pytest.fixture(autouse=True)
-def _block_real_side_effects():
+def _block_real_side_effects(_default_config):
     """Global safety net: 全局禁止测试中的真实副作用。
 
     三层防护：
@@ -127,9 +247,11 @@ def _block_real_side_effects():
             f"Add @patch to mock the network call."
         )
 
-    # Reset config cache so tests pick up real config.toml
+    # Reset config cache to the session-parsed real config.toml, so a test
+    # that called reload_config() with a patched env can't leak into the next
+    # one and nobody re-parses the TOML (the config object is frozen).
     import luckytrader.config as _cfg_mod
-    _cfg_mod._CONFIG = None
+    _cfg_mod._CONFIG = _default_config
     _cfg_mod._COIN_CONFIGS = {}
 
     # Isolate ALL state files to prevent production pollution
@@ -137,15 +259,21 @@ def _block_real_side_effects():
     _test_state_dir = Path(tempfile.mkdtemp())
     _test_state_dir.mkdir(exist_ok=True)
 
-    with patch('luckytrader.execute.notify_discord') as _mock_nd, \
-         patch('luckytrader.execute.trigger_optimization') as _mock_to, \
-         patch('luckytrader.execute.STATE_FILE', _test_state_dir / "position_state.json"), \
-         patch('luckytrader.execute.TRADE_LOG_FILE', _test_state_dir / "trade_results.json"), \
-         patch('luckytrader.execute.TRADES_FILE', _test_state_dir / "TRADES.md"), \
-         patch('luckytrader.execute._LOCK_DIR', _test_state_dir), \
-         patch('luckytrader.trailing.STATE_FILE', _test_state_dir / "trailing_state.json"), \
-         patch('luckytrader.ws_monitor.get_workspace_dir', return_value=_test_state_dir), \
-         patch('time.sleep') as _mock_sleep, \
+    # patch.object on the already-imported modules: this runs before every
+    # test, so skip re-resolving the dotted target strings each time.
+    import time as _time
+    import luckytrader.execute as _ex
+    import luckytrader.trailing as _tr
+    import luckytrader.ws_monitor as _wsm
+    with patch.object(_ex, 'notify_discord') as _mock_nd, \
+         patch.object(_ex, 'trigger_optimization') as _mock_to, \
+         patch.object(_ex, 'STATE_FILE', _test_state_dir / "position_state.json"), \
+         patch.object(_ex, 'TRADE_LOG_FILE', _test_state_dir / "trade_results.json"), \
+         patch.object(_ex, 'TRADES_FILE', _test_state_dir / "TRADES.md"), \
+         patch.object(_ex, '_LOCK_DIR', _test_state_dir), \
+         patch.object(_tr, 'STATE_FILE', _test_state_dir / "trailing_state.json"), \
+         patch.object(_wsm, 'get_workspace_dir', return_value=_test_state_dir), \
+         patch.object(_time, 'sleep') as _mock_sleep, \
          patch.object(_socket.socket, 'connect', _blocked_connect):
         yield {"notify_discord": _mock_nd, "trigger_optimization": _mock_to,
                "time_sleep": _mock_sleep}
@@ -95,11 +95,10 @@ class TestSimulateTrade:
 class TestBacktestVolThreshold:
     """Volume threshold in backtest must use strategy.detect_signal()."""
 
-    def test_backtest_uses_detect_signal(self):
+    def test_backtest_uses_detect_signal(self, source_of):
         """backtest.run_backtest must call strategy.detect_signal(), not hand-write signals."""
-        import inspect
         from luckytrader.backtest import run_backtest
-        source = inspect.getsource(run_backtest)
+        source = source_of(run_backtest)
         assert 'detect_signal(' in source, \
             "run_backtest must use detect_signal() from strategy.py"
 
@@ -107,19 +106,17 @@ class TestBacktestVolThreshold:
 class TestBacktestEntryPrice:
     """Entry must use next candle's open (no look-ahead bias)."""
 
-    def test_entry_uses_next_open(self):
+    def test_entry_uses_next_open(self, source_of):
         """Entry price should be opens[i+1], not closes[i]."""
-        import inspect
         from luckytrader.backtest import run_backtest
-        source = inspect.getsource(run_backtest)
+        source = source_of(run_backtest)
         assert 'opens[i + 1]' in source or 'opens[i+1]' in source, \
             "Must use next candle open for entry (no look-ahead bias)"
     
-    def test_optimizer_entry_uses_next_open(self):
+    def test_optimizer_entry_uses_next_open(self, source_of):
         """monthly_optimize must also use next_open."""
-        import inspect
         from luckytrader.optimize import run_backtest
-        source = inspect.getsource(run_backtest)
+        source = source_of(run_backtest)
         assert 'opens[i + 1]' in source or 'opens[i+1]' in source, \
             "Optimizer must use next candle open for entry"
 
@@ -136,11 +133,10 @@ class TestMonthlyOptimizer:
         assert CURRENT["tp"] == TAKE_PROFIT_PCT
         assert CURRENT["hold"] == MAX_HOLD_HOURS * 2  # 30m bars
     
-    def test_optimizer_uses_detect_signal(self):
+    def test_optimizer_uses_detect_signal(self, source_of):
         """optimizer run_backtest must use strategy.detect_signal()."""
-        import inspect
         from luckytrader.optimize import run_backtest
-        source = inspect.getsource(run_backtest)
+        source = source_of(run_backtest)
         assert 'detect_signal(' in source,             "optimizer must use detect_signal() from strategy.py"
 
     def test_run_backtest_accepts_candles_4h(self):
@@ -1,61 +1,81 @@
 #!/usr/bin/env python3
 """Tests for close_and_cleanup() — the unified close function."""
 import json
+import shutil
+from unittest.mock import call
+
 import pytest
-from unittest.mock import patch, MagicMock, call
-from pathlib import Path
+
+from luckytrader.execute import close_and_cleanup
+
+
+_INITIAL_STATE_BYTES = json.dumps({
+    "position": {"coin": "BTC", "entry_price": 65000, "size": 0.001,
+                  "direction": "SHORT", "regime": "trend"}
+}).encode()
+
+
+@pytest.fixture(scope="module")
+def workspace_dir(tmp_path_factory):
+    """Workspace tree, built once per module and removed when it finishes.
+
+    pytest only prunes old basetemp dirs lazily, so drop ours straight away.
+    The name is fixed (numbered=False): --dist=loadfile keeps this module on
+    a single worker, and each worker has its own basetemp.
+    """
+    d = tmp_path_factory.mktemp("close_and_cleanup_ws", numbered=False)
+    (d / "memory" / "trading").mkdir(parents=True)
+    yield d
+    shutil.rmtree(d, ignore_errors=True)
 
 
 @pytest.fixture(autouse=True)
-def mock_workspace(tmp_path, monkeypatch):
-    """Set up workspace so state files don't conflict."""
-    state_dir = tmp_path / "memory" / "trading"
-    state_dir.mkdir(parents=True)
-    state_file = state_dir / "position_state.json"
-    state_file.write_text(json.dumps({
-        "position": {"coin": "BTC", "entry_price": 65000, "size": 0.001,
-                      "direction": "SHORT", "regime": "trend"}
-    }))
-    monkeypatch.setattr("luckytrader.execute._WORKSPACE_DIR", tmp_path)
+def mock_workspace(workspace_dir, monkeypatch):
+    """Set up workspace so state files don't conflict.
+
+    close_and_cleanup() clears the position, so the state file is reset
+    for every test; only the directory tree is shared.
+    """
+    state_file = workspace_dir / "memory" / "trading" / "position_state.json"
+    state_file.write_bytes(_INITIAL_STATE_BYTES)
+    monkeypatch.setattr("luckytrader.execute._WORKSPACE_DIR", workspace_dir)
     monkeypatch.setattr("luckytrader.execute.STATE_FILE", state_file)
 
 
-@patch("luckytrader.execute.notify_discord")
-@patch("luckytrader.execute.log_trade")
-@patch("luckytrader.execute.record_trade_result")
-@patch("luckytrader.execute.cancel_order")
-@patch("luckytrader.execute.get_open_orders_detailed", return_value=[
-    {"coin": "BTC", "isTrigger": True, "oid": 123},
-    {"coin": "BTC", "isTrigger": True, "oid": 456},
-])
-@patch("luckytrader.execute.get_market_price", return_value=64000.0)
-@patch("luckytrader.execute.place_market_order", return_value={"status": "ok"})
-def test_close_and_cleanup_basic(mock_order, mock_price, mock_orders, mock_cancel,
-                                  mock_record, mock_log, mock_notify):
-    from luckytrader.execute import close_and_cleanup
-    
+def test_close_and_cleanup_basic(exchange_mocks):
+    exchange_mocks.get_open_orders_detailed.return_value = [
+        {"coin": "BTC", "isTrigger": True, "oid": 123},
+        {"coin": "BTC", "isTrigger": True, "oid": 456},
+    ]
+    exchange_mocks.get_market_price.return_value = 64000.0
+
     result = close_and_cleanup(
         coin="BTC", is_long=False, size=0.001,
         reason="EARLY_EXIT", pnl_pct=1.5,
         extra_msg="MFE too low"
     )
-    
-    # Market order placed (buy to close short)
-    mock_order.assert_called_once_with("BTC", True, 0.001)
-    
-    # Orders cancelled
-    assert mock_cancel.call_count == 2
-    
-    # Trade recorded
-    mock_record.assert_called_once_with(1.5, "SHORT", "BTC", "EARLY_EXIT")
-    
-    # Log written
-    mock_log.assert_called_once()
-    
-    # Discord notified
-    mock_notify.assert_called_once()
-    assert "EARLY_EXIT" in mock_notify.call_args[0][0]
-    assert "MFE too low" in mock_notify.call_args[0][0]
+
+    # One snapshot of the call side effects: market buy closes the short,
+    # both trigger orders cancelled, trade recorded and logged, Discord
+    # notified once.
+    notify = exchange_mocks.notify_discord
+    actual = (
+        exchange_mocks.place_market_order.call_args_list,
+        exchange_mocks.cancel_order.call_count,
+        exchange_mocks.record_trade_result.call_args_list,
+        exchange_mocks.log_trade.call_count,
+        notify.call_count,
+    )
+    assert actual == (
+        [call("BTC", True, 0.001)],
+        2,
+        [call(1.5, "SHORT", "BTC", "EARLY_EXIT")],
+        1,
+        1,
+    )
+    msg = notify.call_args.args[0]
+    assert "EARLY_EXIT" in msg
+    assert "MFE too low" in msg
     
     # Return value
     assert result["close_price"] == 64000.0
@@ -63,17 +83,10 @@ def test_close_and_cleanup_basic(mock_order, mock_price, mock_orders, mock_cance
     assert result["reason"] == "EARLY_EXIT"
 
 
-@patch("luckytrader.execute.notify_discord")
-@patch("luckytrader.execute.log_trade")
-@patch("luckytrader.execute.record_trade_result")
-@patch("luckytrader.execute.get_open_orders_detailed", return_value=[])
-@patch("luckytrader.execute.get_market_price", return_value=66000.0)
-@patch("luckytrader.execute.place_market_order", return_value={"status": "ok"})
-def test_close_and_cleanup_auto_pnl(mock_order, mock_price, mock_orders,
-                                     mock_record, mock_log, mock_notify):
+def test_close_and_cleanup_auto_pnl(exchange_mocks):
     """When pnl_pct is None, it should compute from state."""
-    from luckytrader.execute import close_and_cleanup
-    
+    exchange_mocks.get_market_price.return_value = 66000.0
+
     result = close_and_cleanup(
         coin="BTC", is_long=False, size=0.001,
         reason="REGIME_TP"
@@ -83,31 +96,23 @@ def test_close_and_cleanup_auto_pnl(mock_order, mock_price, mock_orders,
     assert result["pnl_pct"] < 0, f"SHORT close at higher price should lose money, got {result['pnl_pct']}"
 
 
-@patch("luckytrader.execute.place_market_order", return_value={"status": "err", "msg": "insufficient"})
-def test_close_and_cleanup_order_failure(mock_order):
+def test_close_and_cleanup_order_failure(exchange_mocks):
     """Should raise if market order fails."""
-    from luckytrader.execute import close_and_cleanup
-    
+    exchange_mocks.place_market_order.return_value = {"status": "err", "msg": "insufficient"}
     with pytest.raises(Exception, match="close_and_cleanup order error"):
         close_and_cleanup("BTC", False, 0.001, "TEST")
 
 
-@patch("luckytrader.execute.notify_discord")
-@patch("luckytrader.execute.log_trade")
-@patch("luckytrader.execute.record_trade_result")
-@patch("luckytrader.execute.cancel_order", side_effect=Exception("API timeout"))
-@patch("luckytrader.execute.get_open_orders_detailed", return_value=[
-    {"coin": "BTC", "isTrigger": True, "oid": 789},
-])
-@patch("luckytrader.execute.get_market_price", return_value=64000.0)
-@patch("luckytrader.execute.place_market_order", return_value={"status": "ok"})
-def test_close_and_cleanup_cancel_failure_nonfatal(mock_order, mock_price, mock_orders,
-                                                    mock_cancel, mock_record, mock_log, mock_notify):
+def test_close_and_cleanup_cancel_failure_nonfatal(exchange_mocks):
     """Cancel order failure should NOT prevent the rest of cleanup."""
-    from luckytrader.execute import close_and_cleanup
-    
+    exchange_mocks.cancel_order.side_effect = Exception("API timeout")
+    exchange_mocks.get_open_orders_detailed.return_value = [
+        {"coin": "BTC", "isTrigger": True, "oid": 789},
+    ]
+    exchange_mocks.get_market_price.return_value = 64000.0
+
     # Should not raise
     result = close_and_cleanup("BTC", False, 0.001, "EARLY_EXIT", pnl_pct=0.5)
     assert result["reason"] == "EARLY_EXIT"
     # Trade still recorded despite cancel failure
-    mock_record.assert_called_once()
+    exchange_mocks.record_trade_result.assert_called_once()
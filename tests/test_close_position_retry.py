@@ -11,182 +11,136 @@ Root cause: 2026-02-22 16:35 UTC，交易所短暂 down，close_position 无重
 - 成功时 save_state 和 log_trade 各执行一次
 - 失败时不得清除 state（仓位还在）
 """
+from types import MappingProxyType
+
 import pytest
-from unittest.mock import patch, MagicMock, call
+
+from luckytrader.execute import close_position
 
 # close_position 使用的仓位对象（来自 load_state）
-POSITION = {
+# 只读视图：若 close_position 改写传入的仓位，这里直接 TypeError，
+# 而不是悄悄污染后面的测试
+POSITION = MappingProxyType({
     "coin": "BTC",
     "direction": "SHORT",
     "size": 0.00096,
     "entry_price": 67615.0,
     "unrealized_pnl": 0.05,
-}
+})
 
 # get_position 返回的链上仓位
-CHAIN_POSITION = {
+CHAIN_POSITION = MappingProxyType({
     "coin": "BTC",
     "size": -0.00096,
     "direction": "SHORT",
     "entry_price": 67615.0,
-}
+})
+
+# place_market_order 的两种响应，所有测试共用同一对象。
+# 不能用 MappingProxyType：close_position 会 json.dumps 打印响应
+ORDER_OK = {"status": "ok"}
+ORDER_ERR = {"status": "err", "response": "down"}
+
+
+@pytest.fixture
+def close_mocks(exchange_mocks):
+    """conftest 的 exchange_mocks，链上默认有 CHAIN_POSITION 这笔仓位"""
+    exchange_mocks.get_position.return_value = CHAIN_POSITION
+    exchange_mocks.get_market_price.return_value = 67500.0
+    return exchange_mocks
 
 
 class TestClosePositionRetryOnErrStatus:
     """place_market_order 返回 {'status': 'err'} 时触发重试"""
 
-    @patch('luckytrader.execute.log_trade')
-    @patch('luckytrader.execute.save_state')
-    @patch('luckytrader.execute.get_market_price', return_value=67500.0)
-    @patch('luckytrader.execute.get_open_orders_detailed', return_value=[])
-    @patch('luckytrader.execute.notify_discord')
-    @patch('luckytrader.execute.get_position', return_value=CHAIN_POSITION)
-    def test_succeeds_on_second_attempt(self, mock_gp, mock_notify, mock_orders,
-                                        mock_price, mock_save, mock_log, mock_hl):
+    def test_succeeds_on_second_attempt(self, close_mocks):
         """第一次返回 err，第二次成功 → 平仓完成"""
-        from luckytrader.execute import close_position
+        close_mocks.place_market_order.side_effect = (ORDER_ERR, ORDER_OK)
 
-        mock_hl.place_market_order.side_effect = [
-            {"status": "err", "response": "exchange temporarily unavailable"},
-            {"status": "ok"},
-        ]
-
-        result = close_position(POSITION, max_retries=3, backoff_seconds=0)
+        result = close_position(POSITION, max_retries=3)
 
         assert result is True
-        assert mock_hl.place_market_order.call_count == 2
-        mock_save.assert_called_once_with({"position": None}, "BTC")
-        mock_log.assert_called_once()
-        mock_hl.place_market_order.side_effect = None
-
-    @patch('luckytrader.execute.log_trade')
-    @patch('luckytrader.execute.save_state')
-    @patch('luckytrader.execute.get_market_price', return_value=67500.0)
-    @patch('luckytrader.execute.get_open_orders_detailed', return_value=[])
-    @patch('luckytrader.execute.notify_discord')
-    @patch('luckytrader.execute.get_position', return_value=CHAIN_POSITION)
-    def test_succeeds_on_first_attempt(self, mock_gp, mock_notify, mock_orders,
-                                       mock_price, mock_save, mock_log, mock_hl):
-        """正常情况：第一次成功，不重试"""
-        from luckytrader.execute import close_position
+        assert close_mocks.place_market_order.call_count == 2
+        close_mocks.save_state.assert_called_once_with({"position": None}, "BTC")
+        close_mocks.log_trade.assert_called_once()
 
-        mock_hl.place_market_order.return_value = {"status": "ok"}
+    def test_succeeds_on_first_attempt(self, close_mocks):
+        """正常情况：第一次成功，不重试"""
+        close_mocks.place_market_order.return_value = ORDER_OK
 
-        result = close_position(POSITION, max_retries=3, backoff_seconds=0)
+        result = close_position(POSITION, max_retries=3)
 
         assert result is True
-        assert mock_hl.place_market_order.call_count == 1
-        mock_save.assert_called_once_with({"position": None}, "BTC")
+        assert close_mocks.place_market_order.call_count == 1
+        close_mocks.save_state.assert_called_once_with({"position": None}, "BTC")
 
 
 class TestClosePositionRetryOnException:
     """place_market_order 抛出异常（网络错误）时触发重试"""
 
-    @patch('luckytrader.execute.log_trade')
-    @patch('luckytrader.execute.save_state')
-    @patch('luckytrader.execute.get_market_price', return_value=67500.0)
-    @patch('luckytrader.execute.get_open_orders_detailed', return_value=[])
-    @patch('luckytrader.execute.notify_discord')
-    @patch('luckytrader.execute.get_position', return_value=CHAIN_POSITION)
-    def test_recovers_after_exception(self, mock_gp, mock_notify, mock_orders,
-                                      mock_price, mock_save, mock_log, mock_hl):
+    def test_recovers_after_exception(self, close_mocks):
         """API 抛异常两次，第三次成功"""
-        from luckytrader.execute import close_position
-
-        mock_hl.place_market_order.side_effect = [
+        close_mocks.place_market_order.side_effect = [
             ConnectionError("exchange down"),
             TimeoutError("timeout"),
-            {"status": "ok"},
+            ORDER_OK,
         ]
 
-        result = close_position(POSITION, max_retries=3, backoff_seconds=0)
+        result = close_position(POSITION, max_retries=3)
 
         assert result is True
-        assert mock_hl.place_market_order.call_count == 3
-        mock_hl.place_market_order.side_effect = None
+        assert close_mocks.place_market_order.call_count == 3
 
 
 class TestClosePositionAllRetriesFail:
     """全部重试失败 → 通知 Discord + raise RuntimeError"""
 
-    @patch('luckytrader.execute.get_open_orders_detailed', return_value=[])
-    @patch('luckytrader.execute.notify_discord')
-    @patch('luckytrader.execute.get_position', return_value=CHAIN_POSITION)
-    def test_raises_after_all_retries(self, mock_gp, mock_notify, mock_orders, mock_hl):
-        """max_retries=3 → 总共尝试 4 次（1 initial + 3 retries）"""
-        from luckytrader.execute import close_position
-
-        mock_hl.place_market_order.return_value = {"status": "err", "response": "down"}
-
+    @pytest.fixture
+    def failed_close(self, close_mocks):
+        close_mocks.place_market_order.return_value = ORDER_ERR
         with pytest.raises(RuntimeError, match="平仓失败"):
-            close_position(POSITION, max_retries=3, backoff_seconds=0)
+            close_position(POSITION, max_retries=3)
+        return close_mocks
 
-        assert mock_hl.place_market_order.call_count == 4  # 1 + 3 retries
+    def test_tries_max_retries_plus_one(self, failed_close):
+        """max_retries=3 → 总共尝试 4 次（1 initial + 3 retries）"""
+        assert failed_close.place_market_order.call_count == 4
 
-    @patch('luckytrader.execute.get_open_orders_detailed', return_value=[])
-    @patch('luckytrader.execute.notify_discord')
-    @patch('luckytrader.execute.get_position', return_value=CHAIN_POSITION)
-    def test_notifies_discord_on_failure(self, mock_gp, mock_notify, mock_orders, mock_hl):
+    def test_notifies_discord(self, failed_close):
         """全部失败时必须通知 Discord"""
-        from luckytrader.execute import close_position
-
-        mock_hl.place_market_order.return_value = {"status": "err", "response": "down"}
-
-        with pytest.raises(RuntimeError):
-            close_position(POSITION, max_retries=2, backoff_seconds=0)
-
-        assert mock_notify.called
-        alert_text = " ".join(str(c) for c in mock_notify.call_args_list)
+        assert failed_close.notify_discord.called
+        alert_text = " ".join(str(c) for c in failed_close.notify_discord.call_args_list)
         assert "失败" in alert_text
 
-    @patch('luckytrader.execute.get_open_orders_detailed', return_value=[])
-    @patch('luckytrader.execute.notify_discord')
-    @patch('luckytrader.execute.get_position', return_value=CHAIN_POSITION)
-    def test_save_state_not_called_on_failure(self, mock_gp, mock_notify, mock_orders, mock_hl):
+    def test_keeps_state(self, failed_close):
         """平仓失败时不得清除 state（仓位仍存在）"""
-        from luckytrader.execute import close_position
-
-        mock_hl.place_market_order.return_value = {"status": "err", "response": "down"}
-
-        with patch('luckytrader.execute.save_state') as mock_save:
-            with pytest.raises(RuntimeError):
-                close_position(POSITION, max_retries=2, backoff_seconds=0)
-            mock_save.assert_not_called()
+        failed_close.save_state.assert_not_called()
 
 
 class TestClosePositionBackoff:
     """指数退避：重试间隔正确"""
 
-    @patch('luckytrader.execute.get_open_orders_detailed', return_value=[])
-    @patch('luckytrader.execute.notify_discord')
-    @patch('luckytrader.execute.get_position', return_value=CHAIN_POSITION)
-    def test_exponential_backoff_called(self, mock_gp, mock_notify, mock_orders, mock_hl):
+    def test_exponential_backoff_called(self, close_mocks):
         """重试之间应调用 time.sleep，且时间递增"""
-        from luckytrader.execute import close_position
+        close_mocks.place_market_order.return_value = ORDER_ERR
 
-        mock_hl.place_market_order.return_value = {"status": "err", "response": "down"}
-
-        with patch('luckytrader.execute.time') as mock_time:
-            with pytest.raises(RuntimeError):
-                close_position(POSITION, max_retries=3, backoff_seconds=2)
+        with pytest.raises(RuntimeError):
+            close_position(POSITION, max_retries=3, backoff_seconds=2)
 
-        sleep_calls = [c[0][0] for c in mock_time.sleep.call_args_list]
-        assert len(sleep_calls) >= 2, f"应有至少2次sleep，实际: {sleep_calls}"
-        assert sleep_calls[1] >= sleep_calls[0], f"退避应递增: {sleep_calls}"
+        # 只 patch 了 sleep（不是整个 time 模块），参数就是真实的等待秒数
+        sleep_calls = [c.args[0] for c in close_mocks.sleep.call_args_list]
+        assert sleep_calls == [2, 4, 8]
 
 
 class TestClosePositionNoPositionOnChain:
     """链上已无仓位 → 直接清理 state，不尝试平仓"""
 
-    @patch('luckytrader.execute.save_state')
-    @patch('luckytrader.execute.notify_discord')
-    @patch('luckytrader.execute.get_position', return_value=None)
-    def test_cleans_stale_state(self, mock_gp, mock_notify, mock_save, mock_hl):
+    def test_cleans_stale_state(self, close_mocks):
         """链上无仓位时不调用 place_market_order"""
-        from luckytrader.execute import close_position
+        close_mocks.get_position.return_value = None
 
-        result = close_position(POSITION, max_retries=3, backoff_seconds=0)
+        result = close_position(POSITION, max_retries=3)
 
         assert result is None
-        mock_hl.place_market_order.assert_not_called()
-        mock_save.assert_called_once_with({"position": None}, "BTC")
+        close_mocks.place_market_order.assert_not_called()
+        close_mocks.save_state.assert_called_once_with({"position": None}, "BTC")
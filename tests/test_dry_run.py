@@ -1,21 +1,35 @@
 """
 Tests for dry run mode — full pipeline without touching real money.
 """
+import types
+
 import pytest
 from unittest.mock import patch, MagicMock
 from datetime import datetime, timezone
 
 
+@pytest.fixture(scope="class")
+def patched_execute():
+    """analyze / get_position / get_coin_info patched once for the whole class.
+
+    Tests set ``analyze.return_value`` themselves; nobody asserts on call
+    history, so sharing the mocks across tests is safe.
+    """
+    with patch('luckytrader.execute.analyze') as analyze, \
+         patch('luckytrader.execute.get_position', return_value=None) as get_position, \
+         patch('luckytrader.execute.get_coin_info', return_value={"szDecimals": 5}) as get_coin_info:
+        yield types.SimpleNamespace(analyze=analyze, get_position=get_position,
+                                    get_coin_info=get_coin_info)
+
+
 class TestDryRunExecute:
     """execute(dry_run=True) must NEVER place real orders."""
     
-    @patch('luckytrader.execute.analyze')
-    @patch('luckytrader.execute.get_position', return_value=None)
-    def test_dry_run_hold_signal(self, mock_pos, mock_analyze, mock_hl):
+    def test_dry_run_hold_signal(self, patched_execute, mock_hl):
         """Dry run with HOLD signal → shows analysis, no orders."""
         from luckytrader.execute import execute
         
-        mock_analyze.return_value = {
+        patched_execute.analyze.return_value = {
             "signal": "HOLD", "price": 67000,
             "signal_reasons": [],
             "breakout": {"up": False, "down": False, "vol_ratio_30m": 0.8, "vol_confirm": False},
@@ -28,15 +42,12 @@ class TestDryRunExecute:
         assert result.get("dry_run") == True
         mock_hl.place_market_order.assert_not_called()
     
-    @patch('luckytrader.execute.analyze')
-    @patch('luckytrader.execute.get_position', return_value=None)
-    @patch('luckytrader.execute.get_coin_info', return_value={"szDecimals": 5})
-    def test_dry_run_long_signal_no_real_order(self, mock_coin, mock_pos, mock_analyze, mock_hl):
+    def test_dry_run_long_signal_no_real_order(self, patched_execute, mock_hl):
         """Dry run with LONG signal → shows what WOULD happen, NO real order."""
         from luckytrader.execute import execute
         
         mock_hl.get_account_info.return_value = {"account_value": "217.76"}
-        mock_analyze.return_value = {
+        patched_execute.analyze.return_value = {
             "signal": "LONG", "price": 67000,
             "signal_reasons": ["突破24h高点$68,000", "30m放量1.5x"],
         }
@@ -54,15 +65,12 @@ class TestDryRunExecute:
         mock_hl.place_stop_loss.assert_not_called()
         mock_hl.place_take_profit.assert_not_called()
     
-    @patch('luckytrader.execute.analyze')
-    @patch('luckytrader.execute.get_position', return_value=None)
-    @patch('luckytrader.execute.get_coin_info', return_value={"szDecimals": 5})
-    def test_dry_run_short_signal(self, mock_coin, mock_pos, mock_analyze, mock_hl):
+    def test_dry_run_short_signal(self, patched_execute, mock_hl):
         """Dry run SHORT signal."""
         from luckytrader.execute import execute
         
         mock_hl.get_account_info.return_value = {"account_value": "217.76"}
-        mock_analyze.return_value = {
+        patched_execute.analyze.return_value = {
             "signal": "SHORT", "price": 67000,
             "signal_reasons": ["跌破24h低点$66,000", "30m放量2.0x"],
         }
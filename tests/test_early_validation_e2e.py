@@ -67,9 +67,10 @@ def test_early_validation_finds_position_per_coin(mock_state_with_position):
     from luckytrader.config import TRADING_COINS
     
     # This is the EXACT logic from ws_monitor._trailing_loop (after fix)
+    all_state = load_state()
     found_positions = []
     for ev_coin in TRADING_COINS:
-        coin_state = load_state(ev_coin)
+        coin_state = all_state.get(ev_coin)
         pos = coin_state.get("position") if coin_state else None
         if pos and pos.get("entry_time"):
             found_positions.append((ev_coin, pos))
@@ -45,7 +45,6 @@ class TestEmergencyCloseRetry:
             emergency_close("BTC", 0.001, True)
         
         assert mock_hl.place_market_order.call_count == 2
-        mock_hl.place_market_order.side_effect = None
     
     @patch('luckytrader.execute.log_trade')
     @patch('luckytrader.execute.notify_discord')
@@ -63,7 +62,6 @@ class TestEmergencyCloseRetry:
         # Only 1 attempt — the retry saw position gone and stopped
         assert mock_hl.place_market_order.call_count == 1
         mock_save.assert_called()
-        mock_hl.place_market_order.side_effect = None
     
     @patch('luckytrader.execute.notify_discord')
     def test_all_retries_fail_persists_danger(self, mock_notify, mock_hl, tmp_path):
@@ -92,7 +90,6 @@ class TestEmergencyCloseRetry:
             assert "紧急平仓失败" in mock_notify.call_args[0][0]
         finally:
             execute_signal._WORKSPACE_DIR = orig_workspace
-            mock_hl.place_market_order.side_effect = None
     
     @patch('luckytrader.execute.notify_discord')
     def test_position_check_all_fail_aborts(self, mock_notify, mock_hl):
@@ -111,7 +108,6 @@ class TestEmergencyCloseRetry:
 
         # Only 1 market order attempt — the retry was aborted because position check failed
         assert mock_hl.place_market_order.call_count == 1
-        mock_hl.place_market_order.side_effect = None
 
     @patch('luckytrader.execute.log_trade')
     @patch('luckytrader.execute.notify_discord')
@@ -132,4 +128,3 @@ class TestEmergencyCloseRetry:
             emergency_close("BTC", 0.001, False)
         
         assert mock_hl.place_market_order.call_count == 2
-        mock_hl.place_market_order.side_effect = None
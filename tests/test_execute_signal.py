@@ -4,7 +4,7 @@ This touches REAL MONEY if bugs slip through.
 """
 import json
 import pytest
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, DEFAULT
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
@@ -21,11 +21,10 @@ class TestParameterConsistency:
         assert TAKE_PROFIT_PCT == cfg.risk.take_profit_pct
         assert MAX_HOLD_HOURS == cfg.risk.max_hold_hours
     
-    def test_notification_text_matches_params(self):
+    def test_notification_text_matches_params(self, source_of):
         """Discord notification must show correct TP% and hold hours."""
-        import inspect
         from luckytrader.execute import open_position
-        source = inspect.getsource(open_position)
+        source = source_of(open_position)
         # The notify_discord call should NOT contain old params
         assert '+5%' not in source or '+7%' in source, \
             "Notification text still says +5% but TP is 7%"
@@ -195,13 +194,13 @@ class TestEmergencyClose:
         mock_hl.place_market_order.assert_called_once_with("BTC", True, 0.001)
 
 
+@patch.multiple('luckytrader.execute',
+                notify_discord=DEFAULT, log_trade=DEFAULT,
+                get_coin_info=MagicMock(return_value={"szDecimals": 5}))
 class TestAtomicOpen:
     """Opening position must be atomic: open + SL + TP or rollback."""
     
-    @patch('luckytrader.execute.notify_discord')
-    @patch('luckytrader.execute.get_coin_info', return_value={"szDecimals": 5})
-    @patch('luckytrader.execute.log_trade')
-    def test_sl_failure_triggers_emergency_close(self, mock_log, mock_coin, mock_notify, mock_hl):
+    def test_sl_failure_triggers_emergency_close(self, mock_hl, **_patched):
         """If SL placement fails after opening, must emergency close."""
         from luckytrader.execute import open_position
         
@@ -222,10 +221,7 @@ class TestAtomicOpen:
         assert result["action"] == "SL_FAILED_CLOSED"
         mock_emg.assert_called_once()
     
-    @patch('luckytrader.execute.notify_discord')
-    @patch('luckytrader.execute.get_coin_info', return_value={"szDecimals": 5})
-    @patch('luckytrader.execute.log_trade')
-    def test_tp_failure_triggers_emergency_close(self, mock_log, mock_coin, mock_notify, mock_hl):
+    def test_tp_failure_triggers_emergency_close(self, mock_hl, **_patched):
         """If TP placement fails after opening + SL, must emergency close."""
         from luckytrader.execute import open_position
         
@@ -270,9 +270,6 @@ class TestFixSlTp:
                 with patch('luckytrader.execute.log_trade'):
                     fix_sl_tp(position)
             mock_emg.assert_called_once()
-        
-        # Reset side_effect
-        mock_hl.place_stop_loss.side_effect = None
     
     def test_fix_tp_only_missing(self, mock_hl):
         """Only TP missing, SL exists."""
@@ -154,6 +154,19 @@ class TestOptimizeRunBacktest:
         assert 'avg' in result
         assert 'winrate' in result
 
+    def test_precomputed_signals_match_inline_detection(self):
+        from luckytrader.optimize import run_backtest, scan_signals
+        candles = self._make_flat(200)
+        fake = lambda c, c4h, i, cfg: ('LONG', 'SHORT')[i % 2] if i % 7 == 0 else None
+        with patch('luckytrader.optimize.detect_signal', side_effect=fake) as det:
+            inline = run_backtest(candles, 0.04, 0.07, 10)
+            signals = scan_signals(candles)
+            det.reset_mock()
+            reused = run_backtest(candles, 0.04, 0.07, 10, signals=signals)
+        assert reused == inline
+        assert inline['count'] > 0
+        det.assert_not_called()
+
 
 # ============================================================
 # monitor.py — get_account_status, append_check, check_alerts
@@ -1,26 +1,26 @@
 #!/usr/bin/env python3
 """Tests that optimize.py never writes to production config."""
 import ast
+from pathlib import Path
+
 import pytest
 
+OPTIMIZE_PY = Path(__file__).parent.parent / "luckytrader" / "optimize.py"
+
 
-def test_optimize_never_writes_config():
+def test_optimize_never_writes_config(parsed_source, nodes_of):
     """Verify optimize.py does not open any config file for writing."""
-    with open("luckytrader/optimize.py") as f:
-        source = f.read()
-    
-    tree = ast.parse(source)
+    source, _ = parsed_source(OPTIMIZE_PY)
     
     # Check for any file write operations on config files
-    for node in ast.walk(tree):
-        if isinstance(node, ast.Call):
-            func = node.func
-            # Check for open(..., 'w')
-            if isinstance(func, ast.Name) and func.id == 'open':
-                for arg in node.args[1:]:
-                    if isinstance(arg, ast.Constant) and 'w' in str(arg.value):
-                        # Check if it's a config file
-                        assert False, f"optimize.py opens a file for writing at line {node.lineno}"
+    for node in nodes_of(OPTIMIZE_PY)[ast.Call]:
+        func = node.func
+        # Check for open(..., 'w')
+        if isinstance(func, ast.Name) and func.id == 'open':
+            for arg in node.args[1:]:
+                if isinstance(arg, ast.Constant) and 'w' in str(arg.value):
+                    # Check if it's a config file
+                    assert False, f"optimize.py opens a file for writing at line {node.lineno}"
     
     # Verify it writes to suggestions dir, not production config
     assert "optimization_suggestions" in source, \
@@ -33,10 +33,9 @@ def test_optimize_never_writes_config():
     assert "config.toml" not in source or source.count("config.toml") == source.count("config.toml") == source.lower().count("config.toml")
 
 
-def test_optimize_output_is_suggestion_only():
+def test_optimize_output_is_suggestion_only(parsed_source):
     """Verify the output JSON includes SUGGESTION_ONLY status."""
-    with open("luckytrader/optimize.py") as f:
-        source = f.read()
+    source, _ = parsed_source(OPTIMIZE_PY)
     
     assert "SUGGESTION_ONLY" in source
     assert "人工评估" in source
@@ -74,7 +74,6 @@ class TestMain:
             assert "NO STOP ORDER" in captured.out
         finally:
             trailing_stop.STATE_FILE = orig
-            mock_hl.get_open_orders_detailed.side_effect = None
 
 
 class TestVerificationAfterPlacement: